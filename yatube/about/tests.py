@@ -1,5 +1,6 @@
 from http import HTTPStatus
 
+from django.core.cache import cache
 from django.test import TestCase, Client
 
 
@@ -8,6 +9,7 @@ class StaticURLTests(TestCase):
     def setUp(self):
         """Устанавливаем данные для тестирования."""
         self.guest_client = Client()
+        cache.clear()
 
     def test_author_url_exists_at_desired_location(self):
         """Страница /author/ доступна всем пользователям."""
@@ -28,3 +30,10 @@ class StaticURLTests(TestCase):
         """URL-адрес /tech/ использует соответствующий шаблон."""
         response = self.guest_client.get('/about/tech/')
         self.assertTemplateUsed(response, 'about/tech.html')
+
+    def test_author_page_is_cached(self):
+        """Страница /author/ кешируется и отдается без рендера шаблона."""
+        self.guest_client.get('/about/author/')
+        response = self.guest_client.get('/about/author/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTemplateNotUsed(response, 'about/author.html')
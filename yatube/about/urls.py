@@ -1,11 +1,19 @@
 from django.urls import path
 
 from about.views import AboutAuthorView, AboutTechView
+from core.cache import cache_shell
+from yatube.settings import PAGE_CACHE_SECONDS
 
 app_name = 'about'
 
 urlpatterns = [
-    path('author/', AboutAuthorView.as_view(), name='author'),
-    path('tech/', AboutTechView.as_view(), name='tech'),
+    path('author/',
+         cache_shell(PAGE_CACHE_SECONDS)(AboutAuthorView.as_view()),
+         name='author'
+         ),
+    path('tech/',
+         cache_shell(PAGE_CACHE_SECONDS)(AboutTechView.as_view()),
+         name='tech'
+         ),
 
 ]
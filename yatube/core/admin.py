@@ -0,0 +1,34 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from core.models import Job, OutboxEmail
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'priority', 'attempts',
+                    'run_at', 'created')
+    list_filter = ('status', 'name')
+    actions = ('requeue',)
+
+    def requeue(self, request, queryset):
+        """Возвращает задачи в очередь с новыми попытками."""
+        queryset.update(status=Job.QUEUED, attempts=0,
+                        run_at=timezone.now(), locked_by='', locked_at=None)
+    requeue.short_description = 'Вернуть в очередь'
+
+
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'recipients', 'attempts', 'next_try', 'failed',
+                    'created')
+    list_filter = ('failed',)
+    exclude = ('message',)
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        """Возвращает письма в очередь с новыми попытками."""
+        queryset.update(failed=False, attempts=0, next_try=timezone.now())
+    retry.short_description = 'Отправить еще раз'
+
+
+admin.site.register(Job, JobAdmin)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
@@ -0,0 +1,64 @@
+import hashlib
+from functools import wraps
+from typing import Callable, Optional, Sequence
+
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+
+SHELL_KEY = 'shell:{digest}'
+
+SHELL_PARAMS = ('page',)
+
+KeyFunc = Callable[..., Optional[str]]
+
+
+def shell_path(request: HttpRequest, params: Sequence[str]) -> str:
+    """Путь страницы для ключа кеша. Из строки запроса берутся только
+    параметры params: остальные страницу не меняют, и с ними каждый
+    новый адрес создавал бы новую запись в кеше.
+    """
+    query = '&'.join(
+        f'{name}={request.GET[name]}' for name in params
+        if name in request.GET
+    )
+    return f'{request.path}?{query}'
+
+
+def cache_shell(timeout: int, key_func: Optional[KeyFunc] = None,
+                params: Sequence[str] = SHELL_PARAMS) -> Callable:
+    """Кеширует страницу, общую для всех пользователей.
+    Все, что зависит от пользователя, выводится в шаблоне тегом
+    fragment и подставляется FragmentMiddleware уже после кеша.
+    key_func возвращает дополнительную часть ключа, например версии
+    данных на странице. Если она вернула None, страница не кешируется.
+    В ключ входят только параметры запроса из params.
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            extra = '' if key_func is None else key_func(request, **kwargs)
+            if extra is None:
+                return view(request, *args, **kwargs)
+            digest = hashlib.md5(
+                f'{shell_path(request, params)}|{extra}'.encode()).hexdigest()
+            key = SHELL_KEY.format(digest=digest)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            if callable(getattr(response, 'render', None)):
+                response.add_post_render_callback(
+                    lambda r: cache.set(
+                        key, (r.content, r['Content-Type']), timeout)
+                )
+            else:
+                cache.set(
+                    key, (response.content, response['Content-Type']), timeout)
+            return response
+        return wrapper
+    return decorator
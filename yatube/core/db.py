@@ -0,0 +1,83 @@
+import fcntl
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, Sequence, Tuple, Type
+
+from django.db import connections, router
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import Model
+from django.http import HttpRequest, HttpResponse
+
+from yatube.settings import (SQLITE_PRAGMAS, SQLITE_PRODUCTION,
+                             SQLITE_WRITE_LOCK)
+
+ADD_COUNTS_ROWS = 300
+
+
+def apply_pragmas(sender, connection: BaseDatabaseWrapper, **kwargs) -> None:
+    """Настраивает каждое новое соединение с SQLite в рабочем режиме:
+    WAL, synchronous, mmap, размер кеша страниц и ожидание блокировки.
+    """
+    if not SQLITE_PRODUCTION or connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def write_lock() -> Iterator[None]:
+    """Блокировка единственного писателя, общая для всех потоков
+    и процессов сервера.
+    """
+    with open(SQLITE_WRITE_LOCK, 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        yield
+
+
+def serialized_write(*methods: str) -> Callable:
+    """Декоратор для представлений, которые пишут в базу. В рабочем
+    режиме SQLite запросы с указанными методами выполняются по одному,
+    поэтому писатели ждут своей очереди на блокировке файла, а не
+    падают с database is locked.
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            if not SQLITE_PRODUCTION or request.method not in methods:
+                return view(request, *args, **kwargs)
+            with write_lock():
+                return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_counts(model: Type[Model], keys: Sequence[str], field: str,
+               counts: Dict[Tuple, int]) -> None:
+    """Прибавляет числа к счетчикам в строках model, найденных
+    по уникальным полям keys, и создает недостающие строки. Пишет
+    одним запросом INSERT ... ON CONFLICT DO UPDATE на ADD_COUNTS_ROWS
+    строк; прибавление идет в базе, так что одновременные писатели
+    не теряют чужие числа.
+    """
+    connection = connections[router.db_for_write(model)]
+    table = model._meta.db_table
+    key_fields = [model._meta.get_field(name) for name in keys]
+    key_columns = ', '.join(item.column for item in key_fields)
+    column = model._meta.get_field(field).column
+    row = '(' + ', '.join(['%s'] * (len(keys) + 1)) + ')'
+    items = list(counts.items())
+    for start in range(0, len(items), ADD_COUNTS_ROWS):
+        chunk = items[start:start + ADD_COUNTS_ROWS]
+        params = []
+        for key, count in chunk:
+            params.extend(item.get_db_prep_value(value, connection)
+                          for item, value in zip(key_fields, key))
+            params.append(count)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({key_columns}, {column}) '
+                f'VALUES {", ".join([row] * len(chunk))} '
+                f'ON CONFLICT ({key_columns}) '
+                f'DO UPDATE SET {column} = {column} + excluded.{column}',
+                params)
@@ -0,0 +1,44 @@
+import re
+from typing import Callable, Dict
+from urllib.parse import parse_qsl, urlencode
+
+from django.http import HttpRequest
+from django.template.loader import render_to_string
+
+FRAGMENT_MARKER = '<!--fragment {name}?{params}-->'
+FRAGMENT_RE = re.compile(rb'<!--fragment (?P<name>[\w-]+)\?(?P<params>\S*)-->')
+
+FragmentRenderer = Callable[..., str]
+
+_renderers: Dict[str, FragmentRenderer] = {}
+
+
+def register(name: str) -> Callable[[FragmentRenderer], FragmentRenderer]:
+    """Регистрирует функцию, которая рендерит фрагмент страницы,
+    зависящий от пользователя.
+    """
+    def decorator(renderer: FragmentRenderer) -> FragmentRenderer:
+        _renderers[name] = renderer
+        return renderer
+    return decorator
+
+
+def fragment_marker(name: str, **params) -> str:
+    """Возвращает метку, на место которой будет вставлен фрагмент."""
+    return FRAGMENT_MARKER.format(name=name, params=urlencode(params))
+
+
+def render_fragments(request: HttpRequest, content: bytes) -> bytes:
+    """Заменяет метки в странице фрагментами для текущего пользователя."""
+    def replace(match: re.Match) -> bytes:
+        renderer = _renderers[match.group('name').decode()]
+        params = dict(parse_qsl(match.group('params').decode()))
+        return renderer(request, **params).encode()
+    return FRAGMENT_RE.sub(replace, content)
+
+
+@register('user_nav')
+def user_nav(request: HttpRequest, view_name: str = '') -> str:
+    """Пункты меню, которые зависят от авторизации пользователя."""
+    return render_to_string('includes/user_nav.html',
+                            {'view_name': view_name}, request)
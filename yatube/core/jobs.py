@@ -0,0 +1,200 @@
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.db import (IntegrityError, close_old_connections, connections,
+                       transaction)
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Job
+from yatube.settings import (JOB_MAX_ATTEMPTS, JOB_POLL_SECONDS,
+                             JOB_QUEUE_ENABLED, JOB_RETRY_SECONDS,
+                             JOB_TIMEOUT_SECONDS)
+
+CLAIM_CANDIDATES = 10
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[..., None]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def register(name: str) -> Callable[[JobHandler], JobHandler]:
+    """Регистрирует функцию, которая выполняет задачу очереди.
+    Аргументы задачи передаются ей именованными параметрами.
+    """
+    def decorator(handler: JobHandler) -> JobHandler:
+        _handlers[name] = handler
+        return handler
+    return decorator
+
+
+def queue_enabled() -> bool:
+    """Признак того, что задачи выполняются фоновыми обработчиками,
+    а не сразу в запросе.
+    """
+    return JOB_QUEUE_ENABLED
+
+
+def enqueue(name: str, priority: int = 0, delay: float = 0,
+            optional: bool = False, unique_key: Optional[str] = None,
+            **payload) -> Optional[Job]:
+    """Ставит задачу в очередь. Аргументы должны сериализоваться
+    в JSON. Задача записывается в той же транзакции, что и запрос,
+    поэтому не выполнится, если транзакция откатится. Если очередь
+    выключена, задача выполняется сразу, а необязательная задача
+    (например, заблаговременная подготовка кеша) пропускается.
+    Задача с unique_key не ставится, пока в очереди ждет задача
+    с тем же ключом; тогда возвращается None.
+    """
+    if not queue_enabled():
+        if not optional:
+            _handlers[name](**payload)
+        return None
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                payload=json.dumps(payload),
+                priority=priority,
+                run_at=timezone.now() + timedelta(seconds=delay),
+                max_attempts=JOB_MAX_ATTEMPTS,
+                unique_key=unique_key,
+            )
+    except IntegrityError:
+        if unique_key is None:
+            raise
+        return None
+
+
+def claim(worker: str) -> Optional[Job]:
+    """Берет в работу самую приоритетную готовую задачу. Задача
+    захватывается условным UPDATE, который проходит только у одного
+    обработчика. Задача, зависшая у упавшего обработчика дольше
+    JOB_TIMEOUT_SECONDS, считается готовой. Попытка засчитывается
+    при захвате, так что задача, которая роняет обработчик, попадает
+    в dead: зависшая задача, исчерпавшая попытки, не перезапускается.
+    Захваченная задача освобождает свой unique_key, чтобы новую такую
+    же задачу можно было поставить.
+    """
+    now = timezone.now()
+    ready = Q(status=Job.QUEUED, run_at__lte=now) | Q(
+        status=Job.RUNNING,
+        locked_at__lt=now - timedelta(seconds=JOB_TIMEOUT_SECONDS))
+    candidates = Job.objects.filter(ready).order_by(
+        '-priority', 'run_at', 'pk').values_list(
+        'pk', 'status', 'attempts', 'max_attempts')[:CLAIM_CANDIDATES]
+    for pk, status, attempts, max_attempts in candidates:
+        rows = Job.objects.filter(pk=pk, status=status, attempts=attempts)
+        if status == Job.RUNNING and attempts >= max_attempts:
+            if rows.update(status=Job.DEAD, locked_by='', locked_at=None,
+                           last_error='Обработчик не завершил задачу.'):
+                logger.warning('Job %s abandoned %s times, marked dead',
+                               pk, attempts)
+            continue
+        claimed = rows.update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now,
+            attempts=attempts + 1, unique_key=None)
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run_job(job: Job) -> bool:
+    """Выполняет задачу. Выполненная задача удаляется. Упавшая
+    возвращается в очередь с экспоненциальной задержкой, а после
+    max_attempts попыток или для неизвестного имени получает статус
+    dead. Возвращает признак успеха.
+    """
+    handler = _handlers.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f'Неизвестная задача {job.name}')
+        handler(**json.loads(job.payload))
+    except Exception:
+        dead = handler is None or job.attempts >= job.max_attempts
+        delay = JOB_RETRY_SECONDS * 2 ** (job.attempts - 1)
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            status=Job.DEAD if dead else Job.QUEUED,
+            run_at=timezone.now() + timedelta(seconds=delay),
+            locked_by='', locked_at=None,
+            last_error=traceback.format_exc())
+        return False
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()
+    return True
+
+
+def work(worker: str, stop: threading.Event, burst: bool = False) -> None:
+    """Выполняет задачи, пока не установлен stop. В режиме burst
+    возвращается, как только очередь опустела. Ошибка самой очереди,
+    например недоступная база, записывается в лог, и обработчик
+    продолжает работу через JOB_RETRY_SECONDS.
+    """
+    while not stop.is_set():
+        job = None
+        try:
+            job = claim(worker)
+            if job is not None:
+                run_job(job)
+        except Exception:
+            logger.exception('Job worker %s failed', worker)
+            stop.wait(JOB_RETRY_SECONDS)
+            continue
+        finally:
+            close_old_connections()
+        if job is None:
+            if burst:
+                return
+            stop.wait(JOB_POLL_SECONDS)
+
+
+def run_threads(threads: int, burst: bool = False) -> None:
+    """Запускает threads потоков-обработчиков и ждет их завершения.
+    По Ctrl+C потоки доделывают текущие задачи и останавливаются.
+    """
+    stop = threading.Event()
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+    pool: List[threading.Thread] = [
+        threading.Thread(target=work, args=(f'{prefix}:{number}', stop, burst),
+                         name=f'job-worker-{number}')
+        for number in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    try:
+        for thread in pool:
+            thread.join()
+    except KeyboardInterrupt:
+        stop.set()
+        for thread in pool:
+            thread.join()
+
+
+def run_pool(processes: int, threads: int, burst: bool = False) -> None:
+    """Запускает processes процессов по threads потоков в каждом.
+    Соединения с базой закрываются до запуска процессов, чтобы
+    процессы не делили их.
+    """
+    if processes <= 1:
+        run_threads(threads, burst)
+        return
+    connections.close_all()
+    pool = [multiprocessing.Process(target=run_threads,
+                                    args=(threads, burst))
+            for _ in range(processes)]
+    for process in pool:
+        process.start()
+    try:
+        for process in pool:
+            process.join()
+    except KeyboardInterrupt:
+        for process in pool:
+            process.join()
@@ -0,0 +1,120 @@
+import email
+import json
+import traceback
+from datetime import timedelta
+from email.message import Message
+from typing import List, Optional
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import MIMEMixin
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import OutboxEmail
+from yatube.settings import (EMAIL_DELIVERY_BACKEND, OUTBOX_BATCH_SIZE,
+                             OUTBOX_LEASE_SECONDS, OUTBOX_MAX_ATTEMPTS,
+                             OUTBOX_RETRY_SECONDS)
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Бэкенд, который не отправляет письма, а записывает их в исходящую
+    очередь в базе. Запрос не ждет почтовый сервер: письма отправляет
+    send_outbox через EMAIL_DELIVERY_BACKEND.
+    """
+
+    def send_messages(self, email_messages: List[EmailMessage]) -> int:
+        now = timezone.now()
+        rows = [
+            OutboxEmail(from_email=message.from_email,
+                        recipients=json.dumps(message.recipients()),
+                        message=message.message().as_bytes(),
+                        next_try=now)
+            for message in email_messages if message.recipients()
+        ]
+        OutboxEmail.objects.bulk_create(rows)
+        return len(rows)
+
+
+class StoredMIMEMessage(MIMEMixin, Message):
+    """Письмо, разобранное из очереди, с методами вывода как у писем
+    Django.
+    """
+
+
+class QueuedEmail(EmailMessage):
+    """Письмо из очереди. Бэкенд доставки получает его в том виде,
+    в котором оно было сохранено.
+    """
+
+    def __init__(self, row: OutboxEmail) -> None:
+        super().__init__(from_email=row.from_email,
+                         to=json.loads(row.recipients))
+        self.raw = bytes(row.message)
+
+    def message(self) -> StoredMIMEMessage:
+        return email.message_from_bytes(self.raw, _class=StoredMIMEMessage)
+
+
+def _claim(batch_size: int) -> List[OutboxEmail]:
+    """Берет пачку готовых писем: их следующая попытка сдвигается
+    на OUTBOX_LEASE_SECONDS, так что другой отправитель их не возьмет,
+    а если этот упадет, письма будут отправлены после истечения срока.
+    """
+    now = timezone.now()
+    ids = list(OutboxEmail.objects.filter(
+        failed=False, next_try__lte=now).values_list(
+        'pk', flat=True)[:batch_size])
+    if not ids:
+        return []
+    lease = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+    OutboxEmail.objects.filter(
+        pk__in=ids, failed=False, next_try__lte=now).update(
+        next_try=lease, attempts=F('attempts') + 1)
+    return list(OutboxEmail.objects.filter(pk__in=ids, next_try=lease))
+
+
+def _retry_later(row: OutboxEmail, error: str) -> None:
+    """Откладывает письмо с экспоненциальной задержкой, а после
+    OUTBOX_MAX_ATTEMPTS попыток помечает его неотправленным.
+    """
+    delay = OUTBOX_RETRY_SECONDS * 2 ** (row.attempts - 1)
+    OutboxEmail.objects.filter(pk=row.pk).update(
+        failed=row.attempts >= OUTBOX_MAX_ATTEMPTS,
+        next_try=timezone.now() + timedelta(seconds=delay),
+        last_error=error)
+
+
+def send_outbox(connection: Optional[BaseEmailBackend] = None,
+                batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """Отправляет готовые письма пачками через одно открытое соединение
+    бэкенда доставки. Если письмо не ушло, соединение переоткрывается,
+    а письмо повторяется позже. Переданное соединение остается
+    открытым, чтобы отправитель мог использовать его дальше.
+    Письмо может уйти повторно, если процесс упадет между отправкой
+    и удалением пачки. Возвращает число отправленных писем.
+    """
+    own_connection = connection is None
+    if own_connection:
+        connection = get_connection(EMAIL_DELIVERY_BACKEND)
+    sent = 0
+    try:
+        while True:
+            rows = _claim(batch_size)
+            if not rows:
+                return sent
+            sent_ids = []
+            for row in rows:
+                try:
+                    connection.open()
+                    connection.send_messages([QueuedEmail(row)])
+                except Exception:
+                    connection.close()
+                    _retry_later(row, traceback.format_exc())
+                else:
+                    sent_ids.append(row.pk)
+            OutboxEmail.objects.filter(pk__in=sent_ids).delete()
+            sent += len(sent_ids)
+    finally:
+        if own_connection:
+            connection.close()
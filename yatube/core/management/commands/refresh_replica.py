@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from core.routers import mark_replica_synced
+from yatube.settings import DATABASES, READ_REPLICAS, REPLICA_REFRESH_SECONDS
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в реплики для чтения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Обновлять реплики каждые '
+                                 'REPLICA_REFRESH_SECONDS секунд.')
+
+    def handle(self, *args, **options):
+        if not READ_REPLICAS:
+            raise CommandError('Реплики не настроены, '
+                               'включите READ_REPLICAS_ENABLED.')
+        while True:
+            for alias in READ_REPLICAS:
+                self._refresh(alias)
+            if not options['loop']:
+                return
+            time.sleep(REPLICA_REFRESH_SECONDS)
+
+    def _refresh(self, alias: str) -> None:
+        """Копирует базу через backup API SQLite: копия согласована,
+        даже если в основную базу в это время пишут. Время метки
+        берется до начала копирования, поэтому реплика никогда
+        не считается свежее, чем она есть.
+        """
+        started = time.time()
+        source = sqlite3.connect(DATABASES[DEFAULT_DB_ALIAS]['NAME'])
+        target = sqlite3.connect(DATABASES[alias]['NAME'])
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        mark_replica_synced(alias, started)
+        self.stdout.write(
+            f'Реплика {alias} обновлена за {time.time() - started:.2f} с')
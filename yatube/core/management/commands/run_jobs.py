@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.jobs import run_pool
+from yatube.settings import JOB_WORKER_PROCESSES, JOB_WORKER_THREADS
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи фоновой очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            default=JOB_WORKER_PROCESSES,
+                            help='Число процессов-обработчиков.')
+        parser.add_argument('--threads', type=int,
+                            default=JOB_WORKER_THREADS,
+                            help='Число потоков в каждом процессе.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Остановиться, когда очередь опустеет.')
+
+    def handle(self, *args, **options):
+        run_pool(options['processes'], options['threads'], options['burst'])
@@ -0,0 +1,36 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from core.mail import send_outbox
+from yatube.settings import (EMAIL_DELIVERY_BACKEND, OUTBOX_BATCH_SIZE,
+                             OUTBOX_POLL_SECONDS)
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из исходящей очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=OUTBOX_BATCH_SIZE,
+                            help='Число писем в одной пачке.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Разбирать очередь, пока процесс '
+                                 'не остановлен. Соединение с почтовым '
+                                 'сервером держится, пока идут письма.')
+
+    def handle(self, *args, **options):
+        connection = get_connection(EMAIL_DELIVERY_BACKEND)
+        try:
+            while True:
+                sent = send_outbox(connection, options['batch_size'])
+                if sent:
+                    self.stdout.write(f'Отправлено писем: {sent}')
+                else:
+                    connection.close()
+                if not options['loop']:
+                    return
+                time.sleep(OUTBOX_POLL_SECONDS)
+        finally:
+            connection.close()
@@ -0,0 +1,27 @@
+from typing import Callable
+
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from core.fragments import FRAGMENT_RE, render_fragments
+
+
+class FragmentMiddleware:
+    """Вставляет в html страницы фрагменты, зависящие от пользователя.
+    Благодаря этому сама страница одинакова для всех и может храниться
+    в общем кеше.
+    """
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        response = self.get_response(request)
+        if (response.streaming
+                or not response.get('Content-Type', '').startswith(
+                    'text/html')
+                or not FRAGMENT_RE.search(response.content)):
+            return response
+        response.content = render_fragments(request, response.content)
+        patch_vary_headers(response, ('Cookie',))
+        return response
@@ -9,3 +9,76 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Job(CreatedModel):
+    """Задача фоновой очереди. Выполненные задачи удаляются, а задачи,
+    исчерпавшие попытки, остаются со статусом dead. Ключ unique_key
+    не дает поставить вторую такую же задачу, пока первая ждет
+    в очереди.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DEAD = 'dead'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DEAD, 'Не выполнена'),
+    )
+
+    name = models.CharField(max_length=100, verbose_name='Задача')
+    payload = models.TextField(default='{}', verbose_name='Аргументы')
+    priority = models.SmallIntegerField(default=0,
+                                        verbose_name='Приоритет')
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=QUEUED, verbose_name='Статус')
+    run_at = models.DateTimeField(verbose_name='Выполнить после')
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Попытки')
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток')
+    locked_by = models.CharField(max_length=100, blank=True,
+                                 verbose_name='Обработчик')
+    locked_at = models.DateTimeField(null=True, blank=True,
+                                     verbose_name='Взята в работу')
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+    unique_key = models.CharField(max_length=100, null=True, blank=True,
+                                  unique=True, verbose_name='Ключ')
+
+    class Meta:
+        ordering = ['-priority', 'run_at']
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'],
+                         name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+
+class OutboxEmail(CreatedModel):
+    """Письмо в исходящей очереди. Отправленные письма удаляются,
+    а письма, исчерпавшие попытки, остаются с признаком failed.
+    """
+    from_email = models.CharField(max_length=254, verbose_name='От кого')
+    recipients = models.TextField(verbose_name='Получатели')
+    message = models.BinaryField(verbose_name='Письмо')
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Попытки')
+    next_try = models.DateTimeField(verbose_name='Следующая попытка')
+    failed = models.BooleanField(default=False, verbose_name='Не отправлено')
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+
+    class Meta:
+        ordering = ['next_try']
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(fields=['failed', 'next_try'],
+                         name='outbox_next_try_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipients} #{self.pk}'
@@ -0,0 +1,111 @@
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, ContextManager, Iterator, List, Optional
+
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpRequest, HttpResponse
+
+from yatube.settings import DATABASES, READ_REPLICAS, REPLICA_STICKY_SECONDS
+
+SYNCED_SUFFIX = '.synced'
+PRIMARY_UNTIL_SESSION_KEY = 'primary_until'
+
+_read_alias: ContextVar[Optional[str]] = ContextVar('read_alias', default=None)
+
+
+class ReplicaRouter:
+    """Направляет чтение в реплику, выбранную для текущего запроса,
+    а все остальное - в основную базу.
+    """
+
+    def db_for_read(self, model, **hints) -> str:
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> bool:
+        return db == DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_database(alias: Optional[str]) -> Iterator[None]:
+    """Читает из указанной базы внутри блока."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def _synced_path(alias: str) -> str:
+    """Файл-метка рядом с репликой. Время его изменения - момент,
+    по состоянию на который скопирована реплика. Метка видна всем
+    процессам сервера без общего кеша.
+    """
+    return DATABASES[alias]['NAME'] + SYNCED_SUFFIX
+
+
+def mark_replica_synced(alias: str, synced_at: float) -> None:
+    """Запоминает время, по состоянию на которое скопирована реплика."""
+    path = _synced_path(alias)
+    with open(path, 'a'):
+        pass
+    os.utime(path, (synced_at, synced_at))
+
+
+def replica_synced_at(alias: str) -> float:
+    """Время, по состоянию на которое скопирована реплика, или 0."""
+    try:
+        return os.stat(_synced_path(alias)).st_mtime
+    except FileNotFoundError:
+        return 0
+
+
+def fresh_replicas(since: float) -> List[str]:
+    """Реплики, скопированные не раньше момента since."""
+    return [alias for alias in READ_REPLICAS
+            if replica_synced_at(alias) >= since]
+
+
+def pinned_to_primary(request: HttpRequest) -> bool:
+    """Пользователь недавно писал в базу и должен видеть свои записи."""
+    session = getattr(request, 'session', None)
+    return bool(session) and session.get(
+        PRIMARY_UNTIL_SESSION_KEY, 0) > time.time()
+
+
+def replica_reads(request: HttpRequest,
+                  since: float) -> ContextManager[None]:
+    """Возвращает контекст чтения для запроса: случайную реплику,
+    в которую уже попали все изменения до момента since, или
+    основную базу, если таких нет или пользователь закреплен за ней.
+    """
+    if pinned_to_primary(request):
+        return use_database(None)
+    replicas = fresh_replicas(since)
+    return use_database(random.choice(replicas) if replicas else None)
+
+
+def stick_to_primary(*methods: str) -> Callable:
+    """Декоратор для представлений, которые пишут в базу: после
+    запроса с указанным методом пользователь на REPLICA_STICKY_SECONDS
+    читает только из основной базы.
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            response = view(request, *args, **kwargs)
+            if READ_REPLICAS and request.method in methods:
+                request.session[PRIMARY_UNTIL_SESSION_KEY] = (
+                    time.time() + REPLICA_STICKY_SECONDS)
+            return response
+        return wrapper
+    return decorator
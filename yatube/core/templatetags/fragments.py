@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.fragments import fragment_marker
+
+register = template.Library()
+
+
+@register.simple_tag
+def fragment(name: str, **params) -> str:
+    """Выводит метку фрагмента, зависящего от пользователя."""
+    return mark_safe(fragment_marker(name, **params))
@@ -1,9 +1,28 @@
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+from datetime import timedelta
 from http import HTTPStatus
+from unittest import mock
 
-from django.test import Client, TestCase
+from django.core import mail
+from django.core.mail import EmailMessage, get_connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase
 from django.urls import reverse
+from django.utils import timezone
 
+from core.db import apply_pragmas, serialized_write
+from core.jobs import claim, enqueue, register, run_job, work
+from core.mail import send_outbox
+from core.models import Job, OutboxEmail
+from core.routers import (PRIMARY_UNTIL_SESSION_KEY, ReplicaRouter,
+                          replica_reads, stick_to_primary, use_database)
 from posts.models import User, Post
+from yatube.settings import SQLITE_PRAGMAS
 
 
 class ViewTestClass(TestCase):
@@ -49,3 +68,268 @@ class ViewTestClass(TestCase):
             data={'text': 'Измененный текст'}
         )
         self.assertTemplateUsed(response, 'core/403csrf.html')
+
+
+class SqliteProductionTests(TestCase):
+
+    @mock.patch('core.db.SQLITE_PRODUCTION', True)
+    def test_pragmas_applied(self):
+        """В рабочем режиме новое соединение получает настройки SQLite."""
+        new_connection = mock.MagicMock(vendor='sqlite')
+        apply_pragmas(sender=None, connection=new_connection)
+        cursor = new_connection.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_any_call('PRAGMA journal_mode = wal')
+        self.assertEqual(cursor.execute.call_count, len(SQLITE_PRAGMAS))
+
+    def test_serialized_write(self):
+        """Запись выполняется под блокировкой единственного писателя."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            lock_path = os.path.join(tmp_dir, 'write.lock')
+            view = serialized_write('POST')(lambda request: HttpResponse())
+            with mock.patch('core.db.SQLITE_PRODUCTION', True), \
+                    mock.patch('core.db.SQLITE_WRITE_LOCK', lock_path):
+                view(RequestFactory().get('/'))
+                self.assertFalse(os.path.exists(lock_path))
+                view(RequestFactory().post('/'))
+                self.assertTrue(os.path.exists(lock_path))
+
+
+class ReplicaRouterTests(TestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.request = RequestFactory().get('/')
+        self.request.session = {}
+
+    def test_reads_default_outside_replica_block(self):
+        """Вне блока реплики чтение и запись идут в основную базу."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        with use_database('replica'):
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    @mock.patch('core.routers.READ_REPLICAS', ['replica'])
+    @mock.patch('core.routers.replica_synced_at', return_value=100)
+    def test_fresh_replica_chosen(self, synced_at):
+        """Реплика используется, только если скопирована после
+        изменения данных страницы и пользователь не писал недавно.
+        """
+        cases = (
+            (50, {}, 'replica'),
+            (150, {}, 'default'),
+            (50, {PRIMARY_UNTIL_SESSION_KEY: time.time() + 60}, 'default'),
+        )
+        for since, session, alias in cases:
+            with self.subTest(since=since, session=session):
+                self.request.session = session
+                with replica_reads(self.request, since):
+                    self.assertEqual(self.router.db_for_read(Post), alias)
+
+    @mock.patch('core.routers.READ_REPLICAS', ['replica'])
+    def test_write_sticks_to_primary(self):
+        """После записи пользователь закреплен за основной базой."""
+        view = stick_to_primary('POST')(lambda request: HttpResponse())
+        view(self.request)
+        self.assertNotIn(PRIMARY_UNTIL_SESSION_KEY, self.request.session)
+        request = RequestFactory().post('/')
+        request.session = {}
+        view(request)
+        self.assertGreater(
+            request.session[PRIMARY_UNTIL_SESSION_KEY], time.time())
+
+
+@register('tests.fail')
+def failing_job(**kwargs):
+    raise RuntimeError('Ошибка задачи')
+
+
+@mock.patch('core.jobs.JOB_QUEUE_ENABLED', True)
+class JobQueueTests(TestCase):
+
+    def test_claim_by_priority_once(self):
+        """Задача с большим приоритетом берется первой, и одну задачу
+        нельзя захватить дважды.
+        """
+        low = enqueue('tests.fail', payload=1)
+        high = enqueue('tests.fail', priority=5, payload=2)
+        self.assertEqual(claim('first'), high)
+        self.assertEqual(claim('second'), low)
+        self.assertIsNone(claim('third'))
+
+    def test_failed_job_retried_then_dead(self):
+        """Упавшая задача откладывается с растущей задержкой, а после
+        последней попытки остается со статусом dead.
+        """
+        job = enqueue('tests.fail')
+        delays = []
+        for _ in range(job.max_attempts):
+            Job.objects.filter(pk=job.pk).update(run_at=job.created)
+            claimed = claim('worker')
+            self.assertFalse(run_job(claimed))
+            job.refresh_from_db()
+            delays.append((job.run_at - claimed.locked_at).total_seconds())
+        self.assertEqual(job.status, Job.DEAD)
+        self.assertIn('Ошибка задачи', job.last_error)
+        self.assertLess(delays[0], delays[1])
+
+    def test_abandoned_job_dead(self):
+        """Задачу, которую обработчик бросает при каждом захвате,
+        после последней попытки не перезапускают, а помечают dead.
+        """
+        job = enqueue('tests.fail')
+        for _ in range(job.max_attempts):
+            claimed = claim('worker')
+            self.assertEqual(claimed, job)
+            Job.objects.filter(pk=job.pk).update(
+                locked_at=timezone.now() - timedelta(days=1))
+        self.assertIsNone(claim('worker'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DEAD)
+        self.assertEqual(job.attempts, job.max_attempts)
+        self.assertEqual(job.locked_by, '')
+
+    def test_password_reset_mail_queued(self):
+        """Письмо сброса пароля ставится в очередь без токена
+        и отправляется обработчиком со ссылкой сброса.
+        """
+        User.objects.create_user(username='reset', email='reset@test.ru',
+                                 password='password')
+        self.client.post(reverse('users:password_reset'),
+                         {'email': 'reset@test.ru'})
+        self.assertEqual(len(mail.outbox), 0)
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'users.send_password_reset')
+        self.assertNotIn('/reset/', job.payload)
+        work('worker', threading.Event(), burst=True)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reset@test.ru'])
+        self.assertIn('/reset/', mail.outbox[0].body)
+        self.assertFalse(Job.objects.exists())
+
+    def test_worker_survives_queue_error(self):
+        """Ошибка при захвате задачи записывается в лог, а обработчик
+        продолжает работу.
+        """
+        stop = threading.Event()
+        calls = []
+
+        def failing_claim(worker):
+            calls.append(worker)
+            if len(calls) > 1:
+                stop.set()
+                return None
+            raise RuntimeError('database is locked')
+
+        with mock.patch('core.jobs.claim', failing_claim), \
+                mock.patch('core.jobs.JOB_RETRY_SECONDS', 0), \
+                self.assertLogs('core.jobs', 'ERROR'):
+            work('worker', stop)
+        self.assertEqual(len(calls), 2)
+
+
+class SMTPStandIn(socketserver.StreamRequestHandler):
+    """Минимальный SMTP-сервер: принимает любые письма и запоминает их
+    и число соединений.
+    """
+
+    def reply(self, line: bytes) -> None:
+        self.wfile.write(line + b'\r\n')
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply(b'220 localhost')
+        data = None
+        for line in self.rfile:
+            if data is not None:
+                if line.rstrip(b'\r\n') == b'.':
+                    self.server.messages.append(b''.join(data))
+                    data = None
+                    self.reply(b'250 OK')
+                else:
+                    data.append(line)
+                continue
+            command = line[:4].upper()
+            if command == b'QUIT':
+                self.reply(b'221 Bye')
+                return
+            if command == b'DATA':
+                data = []
+                self.reply(b'354 End data with <CR><LF>.<CR><LF>')
+            else:
+                self.reply(b'250 OK')
+
+
+class OutboxTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Запускаем SMTP-сервер в отдельном потоке."""
+        super().setUpClass()
+        cls.server = socketserver.ThreadingTCPServer(
+            ('127.0.0.1', 0), SMTPStandIn)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever,
+                         daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.connections = 0
+        self.server.messages = []
+        outbox = get_connection('core.mail.OutboxEmailBackend')
+        self.assertEqual(outbox.send_messages([
+            EmailMessage(f'Тема {number}', 'Текст', 'from@test.ru',
+                         [f'to{number}@test.ru'])
+            for number in range(3)
+        ]), 3)
+
+    def _smtp(self, port=None):
+        return get_connection('django.core.mail.backends.smtp.EmailBackend',
+                              host='127.0.0.1',
+                              port=port or self.server.server_address[1])
+
+    def test_backend_only_queues(self):
+        """Бэкенд очереди ничего не отправляет, а сохраняет письма."""
+        self.assertEqual(OutboxEmail.objects.count(), 3)
+        self.assertEqual(self.server.connections, 0)
+
+    def test_sent_over_one_connection(self):
+        """Пачка писем уходит через одно соединение с сервером."""
+        self.assertEqual(send_outbox(self._smtp(), batch_size=2), 3)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertIn(b'to0@test.ru', self.server.messages[0])
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_failed_delivery_retried(self):
+        """Недоставленное письмо откладывается, а после последней
+        попытки помечается неотправленным.
+        """
+        with socketserver.TCPServer(('127.0.0.1', 0), SMTPStandIn) as closed:
+            port = closed.server_address[1]
+        self.assertEqual(send_outbox(self._smtp(port)), 0)
+        row = OutboxEmail.objects.first()
+        self.assertEqual(row.attempts, 1)
+        self.assertFalse(row.failed)
+        self.assertGreater(row.next_try, row.created)
+        with mock.patch('core.mail.OUTBOX_MAX_ATTEMPTS', 2):
+            OutboxEmail.objects.update(next_try=row.created)
+            send_outbox(self._smtp(port))
+        self.assertEqual(OutboxEmail.objects.filter(failed=True).count(), 3)
+
+    def test_filebased_delivery(self):
+        """Письма из очереди можно доставлять и файловым бэкендом."""
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        send_outbox(get_connection(
+            'django.core.mail.backends.filebased.EmailBackend',
+            file_path=path))
+        name, = os.listdir(path)
+        with open(os.path.join(path, name), 'rb') as file:
+            content = file.read()
+        self.assertEqual(content.count(b'from@test.ru'), 3)
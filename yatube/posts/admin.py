@@ -1,7 +1,59 @@
+from typing import Set, Type
+
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.db.models import CASCADE, Model
 
+from posts.deletion import schedule_deletions
 from posts.models import Group, Post
 
+User = get_user_model()
+
+
+def cascaded_models(model: Type[Model]) -> Set[Type[Model]]:
+    """Модели, строки которых удаляются каскадом вместе с объектом
+    модели, по схеме, без чтения строк.
+    """
+    found: Set[Type[Model]] = set()
+    pending = [model]
+    while pending:
+        for relation in pending.pop()._meta.related_objects:
+            related = relation.related_model
+            if relation.on_delete is CASCADE and related not in found:
+                found.add(related)
+                pending.append(related)
+    return found
+
+
+class BackgroundDeleteMixin:
+    """Удаление из админки скрывает объекты и ставит их в очередь
+    удаления в фоне, не загружая связанные строки ни для страницы
+    подтверждения, ни для самого удаления.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        """Как и стандартная страница подтверждения, требует права
+        на удаление всех зарегистрированных в админке моделей, строки
+        которых удалятся вместе с объектами. Права проверяются
+        по моделям, а не по строкам.
+        """
+        opts = self.model._meta
+        perms_needed = set()
+        for model in cascaded_models(self.model):
+            model_admin = self.admin_site._registry.get(model)
+            if model_admin is not None and (
+                    not model_admin.has_delete_permission(request)):
+                perms_needed.add(model._meta.verbose_name)
+        return ([str(obj) for obj in objs],
+                {opts.verbose_name_plural: len(objs)}, perms_needed, [])
+
+    def delete_model(self, request, obj):
+        schedule_deletions([obj])
+
+    def delete_queryset(self, request, queryset):
+        schedule_deletions(list(queryset))
+
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'created', 'author', 'group')
@@ -11,11 +63,17 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(BackgroundDeleteMixin, admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
     search_fields = ('title',)
     empty_value_display = '-пусто-'
 
 
+class BackgroundDeleteUserAdmin(BackgroundDeleteMixin, UserAdmin):
+    pass
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.unregister(User)
+admin.site.register(User, BackgroundDeleteUserAdmin)
@@ -0,0 +1,145 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponse, HttpResponseBadRequest
+from django.views.decorators.gzip import gzip_page
+
+from posts.conditional import (KEYSET_PARAMS, feed_condition, group_scopes,
+                               index_scopes, post_scopes, profile_scopes)
+from posts.follows import followed_posts
+from posts.lookups import get_cached_or_404
+from posts.models import Comment, Group, Post
+from posts.services import get_keyset_page
+from posts.sharding import (attach_names, get_post_or_404, is_sharded,
+                            shard_for_id)
+from yatube.settings import MEDIA_URL
+
+User = get_user_model()
+
+POST_FIELDS = ('id', 'text', 'created', 'image',
+               'author__username', 'group__slug')
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+# На шардах авторы и группы читаются по id из основной базы.
+SHARD_POST_FIELDS = ('id', 'text', 'created', 'image', 'author_id',
+                     'group_id')
+SHARD_COMMENT_FIELDS = ('id', 'text', 'created', 'author_id')
+
+
+def _serialize_post(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Приводит строку values() поста к виду ответа api."""
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'].isoformat(),
+        'image': MEDIA_URL + row['image'] if row['image'] else None,
+        'author': row['author__username'],
+        'group': row['group__slug'],
+    }
+
+
+def _serialize_comment(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Приводит строку values() комментария к виду ответа api."""
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'].isoformat(),
+        'author': row['author__username'],
+    }
+
+
+def _json_response(data: Any) -> HttpResponse:
+    """Сериализует ответ стандартным json без пробелов. Даты уже
+    приведены к строкам, поэтому DjangoJSONEncoder не нужен и работает
+    быстрый кодировщик на C.
+    """
+    return HttpResponse(
+        json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+        content_type='application/json'
+    )
+
+
+def _post_values(posts: QuerySet) -> QuerySet:
+    """Строки постов для ответа api."""
+    return posts.values(*(SHARD_POST_FIELDS if is_sharded()
+                          else POST_FIELDS))
+
+
+def _page_response(request: HttpRequest, rows: QuerySet,
+                   serialize=_serialize_post,
+                   aliases: Optional[List[str]] = None) -> HttpResponse:
+    """Отдает страницу записей с курсором следующей страницы."""
+    try:
+        page, next_cursor = get_keyset_page(request, rows, aliases)
+    except ValueError:
+        return HttpResponseBadRequest()
+    if is_sharded():
+        attach_names(page)
+    results: List[Dict[str, Any]] = [serialize(row) for row in page]
+    return _json_response({'next': next_cursor, 'results': results})
+
+
+@gzip_page
+@feed_condition(index_scopes, KEYSET_PARAMS)
+def index(request: HttpRequest) -> HttpResponse:
+    """Все посты."""
+    return _page_response(request, _post_values(Post.objects.all()))
+
+
+@gzip_page
+@feed_condition(group_scopes, KEYSET_PARAMS)
+def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
+    """Посты группы."""
+    group_id = get_cached_or_404(Group, slug=slug).id
+    return _page_response(
+        request, _post_values(Post.objects.filter(group_id=group_id)))
+
+
+@gzip_page
+@feed_condition(profile_scopes, KEYSET_PARAMS)
+def profile(request: HttpRequest, username: str) -> HttpResponse:
+    """Посты автора."""
+    author_id = get_cached_or_404(User, username=username).id
+    return _page_response(
+        request, _post_values(Post.objects.filter(author_id=author_id)))
+
+
+@login_required
+@gzip_page
+@feed_condition(index_scopes, KEYSET_PARAMS)
+def follow_index(request: HttpRequest) -> HttpResponse:
+    """Посты авторов, на которых подписан пользователь."""
+    return _page_response(request, _post_values(followed_posts(request)))
+
+
+@gzip_page
+@feed_condition(post_scopes)
+def post_detail(request: HttpRequest, post_id: int) -> HttpResponse:
+    """Пост с числом комментариев."""
+    post = get_post_or_404(post_id)
+    data = _serialize_post({
+        'id': post.id,
+        'text': post.text,
+        'created': post.created,
+        'image': post.image.name,
+        'author__username': post.author.username,
+        'group__slug': post.group.slug if post.group else None,
+    })
+    data['comments_count'] = post.comments.count()
+    return _json_response(data)
+
+
+@gzip_page
+@feed_condition(post_scopes, KEYSET_PARAMS)
+def comments(request: HttpRequest, post_id: int) -> HttpResponse:
+    """Комментарии к посту. Все они лежат на шарде поста."""
+    post_id = get_post_or_404(post_id).id
+    fields = SHARD_COMMENT_FIELDS if is_sharded() else COMMENT_FIELDS
+    return _page_response(
+        request,
+        Comment.objects.filter(post_id=post_id).values(*fields),
+        _serialize_comment,
+        [shard_for_id(post_id)]
+    )
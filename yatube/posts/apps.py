@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        import posts.fragments  # noqa: F401
+        import posts.jobs  # noqa: F401
+        import posts.notifications  # noqa: F401
+        import posts.sharding  # noqa: F401
+        import posts.signals  # noqa: F401
+        import posts.stats  # noqa: F401
+        import posts.suggestions  # noqa: F401
@@ -0,0 +1,50 @@
+from typing import List, Optional, Union
+
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+from posts.models import ArchivedPost, Post
+from posts.sharding import ShardedFeed
+
+
+def find_archived_post(post_id: int) -> Optional[ArchivedPost]:
+    """Возвращает архивный пост с автором и группой или None."""
+    return ArchivedPost.objects.select_related(
+        'author', 'group').filter(pk=post_id).first()
+
+
+class ArchiveFeed:
+    """Лента, которая продолжается архивными постами после оперативных.
+    В архив попадают только посты старше оперативных, поэтому ленты
+    склеиваются без сортировки, а архив читается только на страницах
+    за концом оперативной ленты.
+    """
+
+    def __init__(self, hot: Union[QuerySet, ShardedFeed],
+                 archived: QuerySet) -> None:
+        self.hot = hot
+        self.archived = archived
+
+    @cached_property
+    def hot_count(self) -> int:
+        return self.hot.count()
+
+    def count(self) -> int:
+        return self.hot_count + self.archived.count()
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, index: Union[int, slice]
+                    ) -> Union[Post, ArchivedPost, List]:
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop
+        posts = list(self.hot[start:stop]) if start < self.hot_count else []
+        if stop is None or stop > self.hot_count:
+            posts.extend(self.archived[
+                max(start - self.hot_count, 0):
+                None if stop is None else stop - self.hot_count
+            ])
+        return posts
@@ -0,0 +1,80 @@
+import time
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+
+from yatube.settings import VERSION_CACHE_SECONDS
+
+VERSION_KEY = 'version:{scope}'
+COUNT_KEY = 'count:{scope}'
+
+INDEX_SCOPE = 'index'
+GROUPS_SCOPE = 'groups'
+USERS_SCOPE = 'users'
+
+
+def group_scope(slug: str) -> str:
+    """Возвращает область кеша ленты группы."""
+    return f'group:{slug}'
+
+
+def profile_scope(username: str) -> str:
+    """Возвращает область кеша ленты автора."""
+    return f'profile:{username}'
+
+
+def post_scope(post_id: int) -> str:
+    """Возвращает область кеша страницы поста."""
+    return f'post:{post_id}'
+
+
+def follow_scope(user_id: int) -> str:
+    """Возвращает область кеша подписок пользователя."""
+    return f'follow:{user_id}'
+
+
+def sitemap_scope(section: str, shard: int) -> str:
+    """Возвращает область кеша части карты сайта."""
+    return f'sitemap:{section}:{shard}'
+
+
+def get_versions(scopes: Iterable[str]) -> Dict[str, float]:
+    """Возвращает версии областей кеша.
+    Версия - это время последнего изменения области. Если версии еще нет
+    в кеше, она создается с текущим временем. Версии хранятся
+    VERSION_CACHE_SECONDS, после чего область считается измененной.
+    """
+    keys = {VERSION_KEY.format(scope=scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, VERSION_CACHE_SECONDS)
+        found.update(missing)
+    return {scope: found[key] for key, scope in keys.items()}
+
+
+def get_version(scope: str) -> float:
+    """Возвращает версию одной области кеша."""
+    return get_versions([scope])[scope]
+
+
+def bump_versions(*scopes: str) -> None:
+    """Обновляет версии областей, делая устаревшим все,
+    что было закешировано по старым версиям.
+    """
+    now = time.time()
+    cache.set_many(
+        {VERSION_KEY.format(scope=scope): now for scope in scopes},
+        VERSION_CACHE_SECONDS
+    )
+
+
+def adjust_counts(delta: int, *scopes: str) -> None:
+    """Изменяет счетчики постов областей на delta. Счетчик, которого
+    еще нет в кеше, не создается: он будет посчитан при чтении.
+    """
+    for scope in scopes:
+        try:
+            cache.incr(COUNT_KEY.format(scope=scope), delta)
+        except ValueError:
+            pass
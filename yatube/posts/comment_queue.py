@@ -0,0 +1,211 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import (DataError, IntegrityError, close_old_connections,
+                       transaction)
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.cache import bump_versions, post_scope
+from posts.models import Comment
+from posts.services import forget_post_bundle
+from posts.sharding import resolve_post_ids, shard_for_id
+from posts.trending import record_comments
+from yatube.settings import (COMMENT_BATCH_SIZE, COMMENT_FLUSH_SECONDS,
+                             COMMENT_QUEUE_DIR)
+
+LOCK_NAME = '.lock'
+TMP_SUFFIX = '.tmp'
+FAILED_DIR = 'failed'
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+
+def enqueue_comment(post_id: int, author_id: int, text: str) -> None:
+    """Кладет принятый комментарий в очередь на диске вместе со временем
+    отправки. Файл сначала пишется во временный и затем
+    переименовывается, поэтому писатель никогда не увидит его
+    наполовину записанным.
+    """
+    os.makedirs(COMMENT_QUEUE_DIR, exist_ok=True)
+    name = f'{time.time_ns():020d}-{uuid.uuid4().hex}.json'
+    path = os.path.join(COMMENT_QUEUE_DIR, name)
+    with open(path + TMP_SUFFIX, 'w') as file:
+        json.dump({'post_id': post_id, 'author_id': author_id,
+                   'text': text, 'created': timezone.now().isoformat()},
+                  file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + TMP_SUFFIX, path)
+
+
+def _pending(limit: int) -> List[str]:
+    """Имена файлов очереди в порядке поступления."""
+    names = sorted(
+        name for name in os.listdir(COMMENT_QUEUE_DIR)
+        if name.endswith('.json')
+    )
+    return names[:limit]
+
+
+def _move_to_failed(name: str) -> None:
+    """Переносит файл, который не удалось записать, в папку failed,
+    чтобы он не останавливал разбор очереди.
+    """
+    failed_dir = os.path.join(COMMENT_QUEUE_DIR, FAILED_DIR)
+    os.makedirs(failed_dir, exist_ok=True)
+    os.replace(os.path.join(COMMENT_QUEUE_DIR, name),
+               os.path.join(failed_dir, name))
+    logger.error('Comment %s moved to %s', name, failed_dir)
+
+
+def _parse(name: str) -> Comment:
+    """Читает комментарий из файла очереди. Время создания - время
+    отправки из файла; у файлов без него оно берется из имени.
+    """
+    with open(os.path.join(COMMENT_QUEUE_DIR, name)) as file:
+        row = json.load(file)
+    created = row.pop('created', None)
+    if created is None:
+        created = datetime.fromtimestamp(
+            int(name.split('-', 1)[0]) / 10 ** 9, timezone.utc)
+    else:
+        created = parse_datetime(created)
+        if created is None:
+            raise ValueError(name)
+    return Comment(created=created, post_id=int(row['post_id']),
+                   author_id=int(row['author_id']), text=str(row['text']))
+
+
+def _read_batch(names: List[str]) -> List[Tuple[str, Comment]]:
+    """Читает комментарии из файлов очереди. Файлы, которые не удалось
+    разобрать, переносятся в failed. Комментарии к удаленным постам
+    и от удаленных пользователей отбрасываются вместе с файлами.
+    Комментарий к посту, перенесенному решардингом, получает его
+    новый id.
+    """
+    rows: List[Tuple[str, Comment]] = []
+    for name in names:
+        try:
+            rows.append((name, _parse(name)))
+        except (ValueError, KeyError, TypeError):
+            _move_to_failed(name)
+    posts = resolve_post_ids({comment.post_id for _, comment in rows})
+    authors = set(User.objects.filter(
+        pk__in={comment.author_id for _, comment in rows}).values_list(
+        'id', flat=True))
+    kept = []
+    for name, comment in rows:
+        if comment.post_id in posts and comment.author_id in authors:
+            comment.post_id = posts[comment.post_id]
+            kept.append((name, comment))
+        else:
+            os.remove(os.path.join(COMMENT_QUEUE_DIR, name))
+    return kept
+
+
+def _insert(comments: List[Comment]) -> None:
+    """Записывает комментарии на шарды их постов, по запросу на шард.
+    В отличие от bulk_create вставка raw берет created из объектов,
+    а не текущее время.
+    """
+    by_shard = defaultdict(list)
+    for comment in comments:
+        by_shard[shard_for_id(comment.post_id)].append(comment)
+    fields = [field for field in Comment._meta.concrete_fields
+              if not field.primary_key]
+    for alias, shard_comments in by_shard.items():
+        with transaction.atomic(using=alias):
+            Comment.objects.using(alias)._insert(
+                shard_comments, fields=fields, using=alias, raw=True)
+
+
+def _write_batch(rows: List[Tuple[str, Comment]]) -> List[Comment]:
+    """Записывает пачку и удаляет ее файлы. Если пачка нарушает
+    ограничения базы, комментарии записываются по одному, а те,
+    что не записались, переносятся в failed. Возвращает записанные
+    комментарии. Остальные ошибки базы, например блокировка,
+    пробрасываются, и пачка остается в очереди.
+    """
+    try:
+        _insert([comment for _, comment in rows])
+        written = rows
+    except (IntegrityError, DataError):
+        written = []
+        for name, comment in rows:
+            try:
+                _insert([comment])
+            except (IntegrityError, DataError):
+                _move_to_failed(name)
+            else:
+                written.append((name, comment))
+    for name, _ in written:
+        os.remove(os.path.join(COMMENT_QUEUE_DIR, name))
+    return [comment for _, comment in written]
+
+
+def flush_comments(batch_size: int = COMMENT_BATCH_SIZE) -> int:
+    """Записывает накопленные комментарии в базу пачками, по одной
+    транзакции на пачку. Кеши страниц постов сбрасываются один раз
+    на пачку. Одновременно очередь разбирает только один процесс.
+    Возвращает число записанных комментариев. Если процесс упадет
+    между записью пачки и удалением ее файлов, пачка будет записана
+    повторно.
+    """
+    if not os.path.isdir(COMMENT_QUEUE_DIR):
+        return 0
+    written = 0
+    with open(os.path.join(COMMENT_QUEUE_DIR, LOCK_NAME), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        while True:
+            names = _pending(batch_size)
+            if not names:
+                break
+            comments = _write_batch(_read_batch(names))
+            post_ids = {comment.post_id for comment in comments}
+            bump_versions(*(post_scope(post_id) for post_id in post_ids))
+            for post_id in post_ids:
+                forget_post_bundle(post_id)
+            record_comments(comments)
+            written += len(comments)
+    return written
+
+
+def _writer_loop() -> None:
+    """Раз в COMMENT_FLUSH_SECONDS разбирает очередь. Ошибка разбора
+    записывается в лог, и поток пробует снова в следующий раз.
+    """
+    while True:
+        time.sleep(COMMENT_FLUSH_SECONDS)
+        try:
+            flush_comments()
+        except Exception:
+            logger.exception('Comment queue flush failed')
+        finally:
+            close_old_connections()
+
+
+def start_writer() -> None:
+    """Запускает фоновый поток записи, если он еще не запущен
+    в этом процессе.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(
+                target=_writer_loop, name='comment-writer', daemon=True)
+            _writer.start()
@@ -0,0 +1,156 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Sequence
+
+from django.contrib.auth import get_user_model
+from django.http import Http404, HttpRequest, HttpResponse
+from django.views.decorators.http import condition
+
+from core.cache import SHELL_PARAMS, shell_path
+from core.routers import replica_reads
+from posts.cache import (GROUPS_SCOPE, INDEX_SCOPE, USERS_SCOPE,
+                         follow_scope, get_version, get_versions,
+                         group_scope, profile_scope)
+from posts.lookups import get_cached_or_404
+from posts.models import Group
+from posts.services import get_post_bundle
+
+User = get_user_model()
+
+UPDATES_PARAMS = ('cursor', 'format')
+KEYSET_PARAMS = ('before',)
+
+ScopesFunc = Callable[..., Optional[List[str]]]
+
+
+def index_scopes() -> List[str]:
+    """Области кеша главной страницы."""
+    return [INDEX_SCOPE, GROUPS_SCOPE, USERS_SCOPE]
+
+
+def group_scopes(slug: str) -> List[str]:
+    """Области кеша страницы группы."""
+    return [group_scope(slug), USERS_SCOPE]
+
+
+def profile_scopes(username: str) -> List[str]:
+    """Области кеша страницы автора."""
+    return [profile_scope(username), GROUPS_SCOPE]
+
+
+def post_scopes(post_id: int) -> Optional[List[str]]:
+    """Области кеша страницы поста. На странице выводится число постов
+    автора и название группы, поэтому в валидатор входят и их ленты.
+    Области берутся из закешированного набора страницы поста.
+    Если поста нет, возвращает None.
+    """
+    bundle = get_post_bundle(post_id)
+    return None if bundle is None else bundle['scopes']
+
+
+def updates_scopes(slug: Optional[str] = None,
+                   username: Optional[str] = None) -> Optional[List[str]]:
+    """Области кеша ленты новых постов. Если группы или автора нет,
+    возвращает None.
+    """
+    try:
+        if slug is not None:
+            get_cached_or_404(Group, slug=slug)
+            return group_scopes(slug)
+        if username is not None:
+            get_cached_or_404(User, username=username)
+            return profile_scopes(username)
+    except Http404:
+        return None
+    return index_scopes()
+
+
+def _get_versions(request: HttpRequest, scopes_func: ScopesFunc,
+                  kwargs: Dict) -> Optional[Dict[str, float]]:
+    """Возвращает версии областей кеша страницы. Результат сохраняется
+    в запросе, так как нужен и для ETag, и для Last-Modified, и для
+    ключа кеша страницы.
+    """
+    if not hasattr(request, '_page_versions'):
+        scopes = scopes_func(**kwargs)
+        request._page_versions = (
+            None if scopes is None else get_versions(scopes)
+        )
+    return request._page_versions
+
+
+def _join_versions(versions: Dict[str, float]) -> str:
+    """Собирает версии областей в строку."""
+    return '|'.join(
+        f'{scope}={version}' for scope, version in sorted(versions.items())
+    )
+
+
+def versions_key(scopes_func: ScopesFunc) -> Callable[..., Optional[str]]:
+    """Возвращает функцию ключа для cache_shell: страница кешируется,
+    пока не изменилась ни одна из ее областей.
+    """
+    def key_func(request: HttpRequest, **kwargs) -> Optional[str]:
+        versions = _get_versions(request, scopes_func, kwargs)
+        return None if versions is None else _join_versions(versions)
+    return key_func
+
+
+def feed_condition(scopes_func: ScopesFunc,
+                   params: Sequence[str] = SHELL_PARAMS) -> Callable:
+    """Декоратор условного GET для страниц с лентами.
+    ETag зависит от версий областей кеша, от подписок и от сессии
+    пользователя (в странице есть csrf токен), поэтому отвечает 304
+    до запуска пагинатора и рендера шаблона. В ETag входят и параметры
+    запроса из params, которые меняют ответ: номер страницы, курсор.
+    Last-Modified отдается только анонимам: у авторизованных
+    пользователей страница зависит от сессии.
+    """
+    def etag(request: HttpRequest, **kwargs) -> Optional[str]:
+        versions = _get_versions(request, scopes_func, kwargs)
+        if versions is None:
+            return None
+        variant = 'anonymous'
+        if request.user.is_authenticated:
+            variant = '{}:{}:{}'.format(
+                request.user.id,
+                request.session.session_key,
+                get_version(follow_scope(request.user.id))
+            )
+        raw = '{}|{}|{}'.format(shell_path(request, params),
+                                _join_versions(versions), variant)
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request: HttpRequest, **kwargs) -> Optional[datetime]:
+        if request.user.is_authenticated:
+            return None
+        versions = _get_versions(request, scopes_func, kwargs)
+        if versions is None:
+            return None
+        return datetime.fromtimestamp(max(versions.values()), timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def read_replica(scopes_func: ScopesFunc) -> Callable:
+    """Декоратор, который выполняет чтение представления в реплике.
+    Версии областей - это время их последнего изменения, поэтому
+    реплика подходит, если скопирована позже изменения любой области
+    страницы и подписок пользователя. Иначе чтение идет в основную
+    базу.
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            versions = _get_versions(request, scopes_func, kwargs)
+            if versions is None:
+                return view(request, *args, **kwargs)
+            since = max(versions.values())
+            if request.user.is_authenticated:
+                since = max(
+                    since, get_version(follow_scope(request.user.id)))
+            with replica_reads(request, since):
+                return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,173 @@
+import logging
+import threading
+from typing import Iterator, List, Optional, Set, Union
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import QuerySet
+
+from posts.cache import (COUNT_KEY, GROUPS_SCOPE, INDEX_SCOPE, USERS_SCOPE,
+                         bump_versions, group_scope, profile_scope)
+from posts.lookups import forget_object
+from posts.models import (ArchivedComment, ArchivedPost, Comment, Digest,
+                          Follow, Group, NotificationItem, PendingDeletion,
+                          Post)
+from posts.services import drop_snapshots
+from posts.trending import forget_scores
+from yatube.settings import DELETION_BATCH_SIZE, POST_SHARDS
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+_deleter: Optional[threading.Thread] = None
+_deleter_lock = threading.Lock()
+
+
+def schedule_deletion(instance: Union[User, Group]) -> None:
+    """Сразу скрывает пользователя или группу и ставит их в очередь
+    на удаление в фоне. Пользователь, кроме того, больше не может
+    войти на сайт.
+    """
+    PendingDeletion.objects.get_or_create(
+        model=instance._meta.label_lower, object_id=instance.pk)
+    if isinstance(instance, User):
+        User.objects.filter(pk=instance.pk).update(is_active=False)
+        bump_versions(profile_scope(instance.username))
+    else:
+        bump_versions(group_scope(instance.slug))
+    forget_object(instance)
+
+
+def _in_batches(rows: QuerySet, batch_size: int, **values) -> int:
+    """Удаляет строки пачками по batch_size, а если переданы values -
+    обновляет их. Каждая пачка выполняется в своей короткой транзакции
+    без загрузки объектов и без сигналов, поэтому у удаленных постов
+    оценки обсуждаемости удаляются здесь же. Возвращает число строк.
+    """
+    alias = rows.db
+    done = 0
+    while True:
+        ids = list(rows.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return done
+        batch = rows.model._base_manager.using(alias).filter(pk__in=ids)
+        with transaction.atomic(using=alias):
+            if values:
+                batch.update(**values)
+            else:
+                batch._raw_delete(alias)
+        if rows.model is Post and not values:
+            forget_scores(ids)
+        done += len(ids)
+
+
+def _user_dependents(user_id: int) -> Iterator[QuerySet]:
+    """Строки, которые удаляются вместе с пользователем, в порядке
+    удаления: сначала комментарии, затем посты, затем подписки
+    и уведомления.
+    """
+    for alias in POST_SHARDS:
+        comments = Comment.objects.using(alias)
+        yield comments.filter(post__author_id=user_id)
+        yield comments.filter(author_id=user_id)
+    yield ArchivedComment.objects.filter(post__author_id=user_id)
+    yield ArchivedComment.objects.filter(author_id=user_id)
+    for alias in POST_SHARDS:
+        yield Post.objects.using(alias).filter(author_id=user_id)
+    yield ArchivedPost.objects.filter(author_id=user_id)
+    yield Follow.objects.filter(user_id=user_id)
+    yield Follow.objects.filter(author_id=user_id)
+    yield NotificationItem.objects.filter(recipient_id=user_id)
+    yield NotificationItem.objects.filter(author_id=user_id)
+    yield Digest.objects.filter(recipient_id=user_id)
+
+
+def _user_groups(user_id: int) -> Set[int]:
+    """Группы, в ленты которых писал пользователь."""
+    group_ids = set()
+    for alias in POST_SHARDS:
+        group_ids.update(Post.objects.using(alias).filter(
+            author_id=user_id).values_list('group_id', flat=True).distinct())
+    return group_ids - {None}
+
+
+def _delete_user(user: User, batch_size: int) -> None:
+    """Удаляет пользователя, его посты, комментарии и подписки."""
+    group_ids = _user_groups(user.pk)
+    for rows in _user_dependents(user.pk):
+        _in_batches(rows, batch_size)
+    user.delete()
+    slugs = Group.objects.filter(
+        pk__in=group_ids).values_list('slug', flat=True)
+    feeds = [INDEX_SCOPE, *(group_scope(slug) for slug in slugs)]
+    bump_versions(*feeds, USERS_SCOPE)
+    drop_snapshots(*feeds)
+    cache.delete_many([COUNT_KEY.format(scope=scope) for scope in feeds])
+
+
+def _delete_group(group: Group, batch_size: int) -> None:
+    """Убирает группу из постов и удаляет ее."""
+    for alias in POST_SHARDS:
+        _in_batches(Post.objects.using(alias).filter(group_id=group.pk),
+                    batch_size, group=None)
+    _in_batches(ArchivedPost.objects.filter(group_id=group.pk),
+                batch_size, group=None)
+    group.delete()
+    bump_versions(INDEX_SCOPE, GROUPS_SCOPE)
+
+
+def run_deletions(batch_size: int = DELETION_BATCH_SIZE) -> int:
+    """Удаляет все объекты из очереди удаления. Связанные строки
+    удаляются или обнуляются пачками, а сам объект удаляется обычным
+    delete(), когда связанных строк уже не осталось. Кеши лент
+    и счетчики сбрасываются в конце. Прерванное удаление продолжится
+    при следующем запуске. Возвращает число удаленных объектов.
+    """
+    deleted = 0
+    for pending in list(PendingDeletion.objects.all()):
+        model = apps.get_model(pending.model)
+        instance = model.objects.filter(pk=pending.object_id).first()
+        if isinstance(instance, User):
+            _delete_user(instance, batch_size)
+        elif instance is not None:
+            _delete_group(instance, batch_size)
+        pending.delete()
+        deleted += 1
+    return deleted
+
+
+def _deleter_run() -> None:
+    """Разбирает очередь удаления в фоновом потоке, пока в ней
+    появляются новые объекты. Ошибка записывается в лог; объекты
+    остаются в очереди и удаляются при следующем запуске потока или
+    команды run_deletions.
+    """
+    try:
+        while run_deletions():
+            pass
+    except Exception:
+        logger.exception('Background deletion failed')
+    finally:
+        close_old_connections()
+
+
+def start_deleter() -> None:
+    """Запускает фоновый поток удаления, если он еще не запущен
+    в этом процессе.
+    """
+    global _deleter
+    with _deleter_lock:
+        if _deleter is None or not _deleter.is_alive():
+            _deleter = threading.Thread(
+                target=_deleter_run, name='deleter', daemon=True)
+            _deleter.start()
+
+
+def schedule_deletions(objects: List[Union[User, Group]]) -> None:
+    """Ставит объекты в очередь удаления и запускает фоновый поток."""
+    for instance in objects:
+        schedule_deletion(instance)
+    start_deleter()
@@ -0,0 +1,143 @@
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence
+
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.db.models import QuerySet
+from django.http import HttpRequest
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from core.cache import cache_shell
+from posts.conditional import (ScopesFunc, feed_condition, group_scopes,
+                               index_scopes, profile_scopes, versions_key)
+from posts.lookups import get_cached_or_404
+from posts.models import Group, Post
+from posts.sharding import ShardedFeed, is_sharded, shard_for_author
+from yatube.settings import FEED_ITEMS_COUNT, PAGE_CACHE_SECONDS
+
+User = get_user_model()
+
+TITLE_WORDS = 10
+
+
+def _latest_posts(post_list: QuerySet,
+                  aliases: Optional[Sequence[str]] = None) -> List[Post]:
+    """Последние FEED_ITEMS_COUNT постов ленты с авторами. Если посты
+    разнесены по шардам, ленты шардов aliases (по умолчанию всех)
+    сливаются.
+    """
+    if is_sharded():
+        return ShardedFeed(post_list, {}, aliases)[:FEED_ITEMS_COUNT]
+    return list(post_list.select_related('author')[:FEED_ITEMS_COUNT])
+
+
+class LatestPostsFeed(Feed):
+    """RSS лента последних постов сайта."""
+    title = 'Yatube: последние посты'
+    description = 'Новые записи всех авторов'
+
+    def link(self) -> str:
+        return reverse('posts:index')
+
+    def items(self) -> List[Post]:
+        return _latest_posts(Post.objects.all())
+
+    def item_title(self, item: Post) -> str:
+        return Truncator(item.text).words(TITLE_WORDS)
+
+    def item_description(self, item: Post) -> str:
+        return item.text
+
+    def item_link(self, item: Post) -> str:
+        return reverse('posts:post_detail', args=[item.id])
+
+    def item_author_name(self, item: Post) -> str:
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item: Post) -> datetime:
+        return item.created
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    """RSS лента постов группы. Посты выбираются по индексу
+    (group, -created).
+    """
+
+    def get_object(self, request: HttpRequest, slug: str) -> Group:
+        return get_cached_or_404(Group, slug=slug)
+
+    def title(self, group: Group) -> str:
+        return f'Yatube: {group.title}'
+
+    def description(self, group: Group) -> str:
+        return group.description
+
+    def link(self, group: Group) -> str:
+        return reverse('posts:group_list', args=[group.slug])
+
+    def items(self, group: Group) -> List[Post]:
+        return _latest_posts(Post.objects.filter(group_id=group.id))
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    """RSS лента постов автора. Посты выбираются по индексу
+    (author, -created).
+    """
+
+    def get_object(self, request: HttpRequest, username: str) -> User:
+        return get_cached_or_404(User, username=username)
+
+    def title(self, author: User) -> str:
+        return f'Yatube: посты {author.username}'
+
+    def description(self, author: User) -> str:
+        return f'Новые записи автора {author.username}'
+
+    def link(self, author: User) -> str:
+        return reverse('posts:profile', args=[author.username])
+
+    def items(self, author: User) -> List[Post]:
+        return _latest_posts(Post.objects.filter(author_id=author.id),
+                             [shard_for_author(author.id)])
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    """Atom лента последних постов сайта."""
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    """Atom лента постов группы."""
+    feed_type = Atom1Feed
+
+    def subtitle(self, group: Group) -> str:
+        return self.description(group)
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    """Atom лента постов автора."""
+    feed_type = Atom1Feed
+
+    def subtitle(self, author: User) -> str:
+        return self.description(author)
+
+
+def cached_feed(scopes_func: ScopesFunc, feed: Feed) -> Callable:
+    """Оборачивает ленту кешем по версиям областей и условным GET:
+    читатели лент опрашивают их часто, и пока лента не изменилась,
+    запрос заканчивается ответом 304 без обращения к базе.
+    """
+    return feed_condition(scopes_func)(
+        cache_shell(PAGE_CACHE_SECONDS, versions_key(scopes_func))(feed)
+    )
+
+
+latest_rss = cached_feed(index_scopes, LatestPostsFeed())
+latest_atom = cached_feed(index_scopes, LatestPostsAtomFeed())
+group_rss = cached_feed(group_scopes, GroupPostsFeed())
+group_atom = cached_feed(group_scopes, GroupPostsAtomFeed())
+author_rss = cached_feed(profile_scopes, AuthorPostsFeed())
+author_atom = cached_feed(profile_scopes, AuthorPostsAtomFeed())
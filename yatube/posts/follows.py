@@ -0,0 +1,158 @@
+from array import array
+from itertools import islice
+from typing import FrozenSet, Iterable, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+from django.http import HttpRequest
+
+from posts.cache import bump_versions, follow_scope, get_version
+from posts.models import Follow, Post
+from posts.sharding import is_sharded
+from posts.suggestions import mark_stale
+from yatube.settings import FOLLOW_BATCH_SIZE, FOLLOWED_CACHE_SECONDS
+
+FOLLOWED_KEY = 'followed:{user_id}:{version}'
+ID_TYPECODE = 'L'
+MAX_IN_IDS = 500
+
+User = get_user_model()
+
+
+def _encode(author_ids) -> bytes:
+    """Упаковывает id авторов в отсортированный массив чисел."""
+    return array(ID_TYPECODE, sorted(author_ids)).tobytes()
+
+
+def _decode(data: bytes) -> FrozenSet[int]:
+    """Распаковывает id авторов."""
+    ids = array(ID_TYPECODE)
+    ids.frombytes(data)
+    return frozenset(ids)
+
+
+def followed_authors(user_id: int) -> FrozenSet[int]:
+    """Возвращает id авторов, на которых подписан пользователь. Набор
+    хранится в кеше массивом чисел под версией подписок пользователя:
+    после изменения подписок старый набор больше не читается, даже если
+    его одновременно записал другой процесс.
+    """
+    key = FOLLOWED_KEY.format(
+        user_id=user_id, version=get_version(follow_scope(user_id)))
+    data = cache.get(key)
+    if data is None:
+        data = _encode(Follow.objects.filter(
+            user_id=user_id).values_list('author_id', flat=True))
+        cache.set(key, data, FOLLOWED_CACHE_SECONDS)
+    return _decode(data)
+
+
+def get_followed(request: HttpRequest) -> FrozenSet[int]:
+    """Возвращает подписки текущего пользователя. За время запроса
+    набор читается из кеша один раз.
+    """
+    if not request.user.is_authenticated:
+        return frozenset()
+    if not hasattr(request, '_followed'):
+        request._followed = followed_authors(request.user.id)
+    return request._followed
+
+
+def followed_posts(request: HttpRequest) -> QuerySet:
+    """Посты авторов, на которых подписан пользователь. Id авторов
+    берутся из кеша; слишком длинный список заменяется подзапросом,
+    если подписки и посты лежат в одной базе.
+    """
+    followed = get_followed(request)
+    if len(followed) > MAX_IN_IDS and not is_sharded():
+        return Post.objects.filter(
+            author__following__user_id=request.user.id)
+    return Post.objects.filter(author_id__in=followed)
+
+
+def _follows_changed(pairs: Iterable[Tuple[int, int]]) -> None:
+    """Сбрасывает версии подписок пользователей из пар (пользователь,
+    автор), а с ними и наборы подписок в кеше. Нужна после bulk_create,
+    который сигналов не отправляет. Рекомендации пользователей
+    и подписчиков авторов отмечаются для пересчета.
+    """
+    user_ids = {user_id for user_id, _ in pairs}
+    bump_versions(*(follow_scope(user_id) for user_id in user_ids))
+    mark_stale(user_ids, {author_id for _, author_id in pairs})
+
+
+def follow(user_id: int, author_id: int) -> None:
+    """Подписывает пользователя на автора одним INSERT OR IGNORE:
+    повторная или одновременная подписка ничего не меняет и не падает.
+    Подписка на себя пропускается.
+    """
+    if user_id == author_id:
+        return
+    Follow.objects.bulk_create(
+        [Follow(user_id=user_id, author_id=author_id)],
+        ignore_conflicts=True)
+    _follows_changed([(user_id, author_id)])
+
+
+def unfollow(user_id: int, author_id: int) -> None:
+    """Отписывает пользователя от автора. Удаление идет через
+    QuerySet.delete(), поэтому сигнал post_delete сбрасывает кеши
+    подписок. Отписка от автора, на которого пользователь
+    не подписан, ничего не делает.
+    """
+    Follow.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def follow_many(pairs: Iterable[Tuple[int, int]],
+                batch_size: int = FOLLOW_BATCH_SIZE) -> Tuple[int, int]:
+    """Записывает подписки из пар (пользователь, автор) пачками через
+    bulk_create с ignore_conflicts: существующие подписки пропускаются.
+    Пары с подпиской на себя или с несуществующим пользователем
+    отбрасываются до записи, иначе внешний ключ уронил бы всю пачку
+    при фиксации. Каждая пачка - одна транзакция. Возвращает число
+    записанных и отброшенных пар.
+    """
+    pairs = iter(pairs)
+    done = skipped = 0
+    while True:
+        batch = list(islice(pairs, batch_size))
+        if not batch:
+            return done, skipped
+        known = set(User.objects.filter(
+            pk__in={user_id for pair in batch for user_id in pair}
+        ).values_list('pk', flat=True))
+        valid = [(user_id, author_id) for user_id, author_id in batch
+                 if user_id != author_id
+                 and user_id in known and author_id in known]
+        skipped += len(batch) - len(valid)
+        if not valid:
+            continue
+        with transaction.atomic():
+            Follow.objects.bulk_create(
+                [Follow(user_id=user_id, author_id=author_id)
+                 for user_id, author_id in valid],
+                ignore_conflicts=True)
+        _follows_changed(valid)
+        done += len(valid)
+
+
+def sync_follows(user_id: int,
+                 author_ids: Iterable[int]) -> Tuple[int, int, int]:
+    """Приводит подписки пользователя к списку author_ids: добавляет
+    недостающие и удаляет лишние. Возвращает число добавленных,
+    удаленных и отброшенных подписок.
+    """
+    wanted = set(author_ids) - {user_id}
+    existing = dict(Follow.objects.filter(
+        user_id=user_id).values_list('author_id', 'pk'))
+    removed = [pk for author_id, pk in existing.items()
+               if author_id not in wanted]
+    added, skipped = follow_many(
+        (user_id, author_id) for author_id in wanted
+        if author_id not in existing)
+    for start in range(0, len(removed), FOLLOW_BATCH_SIZE):
+        Follow.objects.filter(
+            pk__in=removed[start:start + FOLLOW_BATCH_SIZE]).delete()
+    return added, len(removed), skipped
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpRequest
+from django.template.loader import render_to_string
+
+from core.fragments import register
+from posts.follows import get_followed
+from posts.forms import CommentForm
+from posts.suggestions import get_suggestions
+from yatube.settings import SUGGESTIONS_SHOWN
+
+User = get_user_model()
+
+
+@register('switcher')
+def switcher(request: HttpRequest, active: str = '') -> str:
+    """Переключатель между общей лентой и лентой подписок."""
+    return render_to_string('posts/includes/switcher.html',
+                            {active: True}, request)
+
+
+@register('follow_button')
+def follow_button(request: HttpRequest, author_id: str,
+                  username: str) -> str:
+    """Кнопка подписки на автора на странице профиля."""
+    user = request.user
+    if not user.is_authenticated or str(user.id) == author_id:
+        return ''
+    following = int(author_id) in get_followed(request)
+    return render_to_string('posts/includes/follow_button.html',
+                            {'username': username, 'following': following},
+                            request)
+
+
+@register('post_actions')
+def post_actions(request: HttpRequest, post_id: str, author_id: str) -> str:
+    """Ссылка на редактирование и форма комментария на странице поста."""
+    user = request.user
+    if not user.is_authenticated:
+        return ''
+    context = {
+        'post_id': post_id,
+        'is_author': str(user.id) == author_id,
+        'form': CommentForm()
+    }
+    return render_to_string('posts/includes/post_actions.html',
+                            context, request)
+
+
+@register('suggestions')
+def suggestions(request: HttpRequest) -> str:
+    """Авторы, которых стоит почитать, без тех, на кого пользователь
+    уже подписан.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return ''
+    followed = get_followed(request)
+    author_ids = [author_id for author_id in get_suggestions(user.id)
+                  if author_id != user.id and author_id not in followed]
+    names = dict(User.objects.filter(
+        pk__in=author_ids[:SUGGESTIONS_SHOWN * 2],
+        is_active=True).values_list('id', 'username'))
+    usernames = [names[author_id] for author_id in author_ids
+                 if author_id in names][:SUGGESTIONS_SHOWN]
+    if not usernames:
+        return ''
+    return render_to_string('posts/includes/suggestions.html',
+                            {'usernames': usernames}, request)
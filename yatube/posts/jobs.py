@@ -0,0 +1,17 @@
+from sorl.thumbnail import get_thumbnail
+
+from core.jobs import register
+from posts.sharding import find_post
+
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+@register('posts.make_thumbnail')
+def make_thumbnail(post_id: int) -> None:
+    """Заранее создает миниатюру картинки поста, которую выводят лента
+    и страница поста, чтобы ее не пришлось делать при показе.
+    """
+    post = find_post(post_id)
+    if post is not None and post.image:
+        get_thumbnail(post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
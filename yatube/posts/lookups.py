@@ -0,0 +1,90 @@
+import hashlib
+from typing import Dict, List, Tuple, Type
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Model
+from django.http import Http404
+
+from posts.models import Group, PendingDeletion
+from yatube.settings import MISSING_CACHE_SECONDS, OBJECT_CACHE_SECONDS
+
+User = get_user_model()
+
+OBJECT_KEY = 'object:{label}:{field}:{digest}'
+MISSING = 'missing'
+
+CACHED_FIELDS: Dict[Type[Model], Tuple[str, ...]] = {
+    Group: ('pk', 'slug'),
+    User: ('pk', 'username'),
+}
+
+# Поля, которые загружаются в кешируемый объект. Пароль, почта и время
+# входа пользователя в кеш не попадают.
+LOADED_FIELDS: Dict[Type[Model], Tuple[str, ...]] = {
+    User: ('id', 'username', 'first_name', 'last_name'),
+}
+
+
+def _key(model: Type[Model], field: str, value) -> str:
+    """Возвращает ключ кеша объекта по значению поля. Значение из
+    адреса хешируется: в нем могут быть пробелы и управляющие символы,
+    недопустимые в ключах memcached, и длина ключа не должна зависеть
+    от запроса.
+    """
+    return OBJECT_KEY.format(
+        label=model._meta.label_lower, field=field,
+        digest=hashlib.md5(str(value).encode()).hexdigest())
+
+
+def _object_keys(instance: Model) -> List[str]:
+    """Ключи, по которым объект лежит в кеше."""
+    model = type(instance)
+    return [_key(model, field, getattr(instance, field))
+            for field in CACHED_FIELDS[model]]
+
+
+def get_cached_or_404(model: Type[Model], **lookup) -> Model:
+    """Замена get_object_or_404 для групп и пользователей: объект
+    читается из кеша, а при промахе загружается и кешируется сразу
+    по всем полям из CACHED_FIELDS. Загружаются только поля из
+    LOADED_FIELDS, если они заданы. Отсутствие объекта тоже кешируется
+    на MISSING_CACHE_SECONDS, чтобы поток запросов к несуществующим
+    адресам не доходил до базы. Объекты, ожидающие удаления в фоне,
+    считаются отсутствующими.
+    """
+    (field, value), = lookup.items()
+    key = _key(model, field, value)
+    instance = cache.get(key)
+    if instance == MISSING:
+        raise Http404
+    if instance is not None:
+        return instance
+    queryset = model.objects.filter(**lookup)
+    if model in LOADED_FIELDS:
+        queryset = queryset.only(*LOADED_FIELDS[model])
+    instance = queryset.first()
+    if instance is None or is_pending_deletion(instance):
+        cache.set(key, MISSING, MISSING_CACHE_SECONDS)
+        raise Http404
+    cache.set_many(dict.fromkeys(_object_keys(instance), instance),
+                   OBJECT_CACHE_SECONDS)
+    return instance
+
+
+def is_pending_deletion(instance: Model) -> bool:
+    """Объект скрыт и ожидает удаления в фоне."""
+    return PendingDeletion.objects.filter(
+        model=instance._meta.label_lower, object_id=instance.pk).exists()
+
+
+def forget_object(instance: Model) -> None:
+    """Удаляет объект из кеша по текущим и по закешированным прежним
+    значениям полей: после переименования старый адрес не должен
+    отдавать объект.
+    """
+    keys = _object_keys(instance)
+    cached = cache.get(_key(type(instance), 'pk', instance.pk))
+    if isinstance(cached, Model):
+        keys.extend(_object_keys(cached))
+    cache.delete_many(keys)
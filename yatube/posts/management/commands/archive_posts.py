@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from typing import List
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts.cache import (COUNT_KEY, INDEX_SCOPE, bump_versions, group_scope,
+                         post_scope, profile_scope, sitemap_scope)
+from posts.models import ArchivedComment, ArchivedPost, Comment, Group, Post
+from posts.services import drop_snapshots
+from posts.sitemaps import shard_of
+from posts.trending import forget_scores
+from yatube.settings import (ARCHIVE_AFTER_DAYS, ARCHIVE_CHUNK_SIZE,
+                             POST_SHARDS)
+
+User = get_user_model()
+
+POST_FIELDS = ('id', 'text', 'created', 'author_id', 'group_id', 'image')
+COMMENT_FIELDS = ('id', 'text', 'created', 'post_id', 'author_id')
+
+
+class Command(BaseCommand):
+    help = ('Переносит посты старше ARCHIVE_AFTER_DAYS дней вместе '
+            'с комментариями в архивные таблицы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                            help='Возраст поста в днях, после которого '
+                                 'он переносится в архив.')
+        parser.add_argument('--chunk-size', type=int,
+                            default=ARCHIVE_CHUNK_SIZE,
+                            help='Число постов, переносимых за раз.')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        moved = 0
+        for source in POST_SHARDS:
+            while True:
+                count = self._archive_chunk(
+                    source, before, options['chunk_size'])
+                if not count:
+                    break
+                moved += count
+        self.stdout.write(f'Перенесено в архив постов: {moved}')
+
+    @staticmethod
+    def _archive_chunk(source: str, before: datetime,
+                       chunk_size: int) -> int:
+        """Переносит в архив одну пачку самых старых постов. Пачка
+        сначала копируется в архив с теми же id, а затем удаляется из
+        оперативных таблиц; если перенос прервется, повторный запуск
+        пропустит уже скопированные строки. Удаление идет мимо сигналов,
+        поэтому оценки обсуждаемости постов удаляются отдельно.
+        """
+        posts = list(Post.objects.using(source).filter(
+            created__lt=before).order_by('pk').values(*POST_FIELDS)[
+            :chunk_size])
+        if not posts:
+            return 0
+        post_ids = [post['id'] for post in posts]
+        comments = Comment.objects.using(source).filter(
+            post_id__in=post_ids).values(*COMMENT_FIELDS)
+        with transaction.atomic():
+            ArchivedPost.objects.bulk_create(
+                [ArchivedPost(**post) for post in posts],
+                ignore_conflicts=True)
+            ArchivedComment.objects.bulk_create(
+                [ArchivedComment(**comment) for comment in comments],
+                ignore_conflicts=True)
+        with transaction.atomic(using=source):
+            Comment.objects.using(source).filter(
+                post_id__in=post_ids)._raw_delete(source)
+            Post.objects.using(source).filter(
+                pk__in=post_ids)._raw_delete(source)
+        forget_scores(post_ids)
+        Command._forget_feeds(posts)
+        return len(posts)
+
+    @staticmethod
+    def _forget_feeds(posts: List[dict]) -> None:
+        """Сбрасывает кеш лент и страниц, из которых ушли посты.
+        Счетчики общей ленты и групп пересчитываются при чтении,
+        а в ленте автора архивные посты остаются.
+        """
+        group_ids = {post['group_id'] for post in posts} - {None}
+        slugs = Group.objects.filter(
+            pk__in=group_ids).values_list('slug', flat=True)
+        usernames = User.objects.filter(
+            pk__in={post['author_id'] for post in posts}
+        ).values_list('username', flat=True)
+        feeds = [INDEX_SCOPE, *(group_scope(slug) for slug in slugs)]
+        bump_versions(
+            *feeds,
+            *(profile_scope(username) for username in usernames),
+            *(post_scope(post['id']) for post in posts),
+            *{sitemap_scope('posts', shard_of(post['id'])) for post in posts}
+        )
+        drop_snapshots(*feeds)
+        cache.delete_many([COUNT_KEY.format(scope=scope) for scope in feeds])
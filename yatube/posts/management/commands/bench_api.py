@@ -0,0 +1,74 @@
+import time
+from typing import List, Tuple
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+# Замеры идут на отдельном кеше в памяти процесса: очистка кеша перед
+# запросом не должна сбрасывать общий кеш работающего сайта.
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench_api',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает время ответа json api и html страниц с лентами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Число запросов к каждой странице.')
+        parser.add_argument('--warm', action='store_true',
+                            help='Не очищать кеш перед каждым запросом.')
+
+    def handle(self, *args, **options):
+        post = Post.objects.select_related('author', 'group').first()
+        if post is None:
+            raise CommandError('В базе нет постов.')
+        pairs: List[Tuple[str, str, str]] = [
+            ('index', reverse('posts:index'), reverse('posts:api_index')),
+            ('profile',
+             reverse('posts:profile', args=[post.author.username]),
+             reverse('posts:api_profile', args=[post.author.username])),
+            ('post_detail',
+             reverse('posts:post_detail', args=[post.id]),
+             reverse('posts:api_post_detail', args=[post.id])),
+        ]
+        group = Group.objects.first()
+        if group is not None:
+            pairs.append((
+                'group_list',
+                reverse('posts:group_list', args=[group.slug]),
+                reverse('posts:api_group_list', args=[group.slug])
+            ))
+        user = User.objects.filter(is_active=True).first()
+        if user is None:
+            raise CommandError('В базе нет активных пользователей.')
+        with override_settings(CACHES=BENCH_CACHES):
+            # Адрес не из INTERNAL_IPS, чтобы debug toolbar не встраивался
+            # в html страницы.
+            client = Client(REMOTE_ADDR='192.0.2.1')
+            client.force_login(user)
+            self.stdout.write(
+                f'{"page":<12}{"html, ms":>12}{"api, ms":>12}')
+            for name, html_url, api_url in pairs:
+                html = self._measure(client, html_url, options)
+                api = self._measure(client, api_url, options)
+                self.stdout.write(f'{name:<12}{html:>12.2f}{api:>12.2f}')
+
+    def _measure(self, client: Client, url: str, options: dict) -> float:
+        """Возвращает среднее время ответа страницы в миллисекундах."""
+        total = 0.0
+        for _ in range(options['requests']):
+            if not options['warm']:
+                cache.clear()
+            start = time.perf_counter()
+            client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            total += time.perf_counter() - start
+        return total / options['requests'] * 1000
@@ -0,0 +1,142 @@
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test import Client
+from django.urls import reverse
+
+import core.db
+from posts.models import Follow, Post, User
+
+BENCH_USERNAME = 'bench_writer_{}'
+BENCH_AUTHOR = 'bench_author'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает обычный и рабочий режим SQLite под смешанной '
+            'нагрузкой чтения и записи из нескольких потоков.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Число одновременных клиентов.')
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Число запросов каждого клиента.')
+        parser.add_argument('--writes', type=float, default=0.3,
+                            help='Доля запросов на запись.')
+
+    def handle(self, *args, **options):
+        settings_dict = connections.databases['default']
+        if settings_dict['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Бенчмарк работает только с SQLite.')
+        source = settings_dict['NAME']
+        if not os.path.exists(source):
+            raise CommandError('Нет файла базы, выполните migrate.')
+        tmp_dir = tempfile.mkdtemp()
+        original = dict(settings_dict)
+        try:
+            for production in (False, True):
+                name = os.path.join(tmp_dir, f'bench-{production}.sqlite3')
+                shutil.copy(source, name)
+                connections.close_all()
+                settings_dict['NAME'] = name
+                settings_dict['CONN_MAX_AGE'] = 600 if production else 0
+                core.db.SQLITE_PRODUCTION = production
+                core.db.SQLITE_WRITE_LOCK = name + '.lock'
+                self._report(production, self._run(options))
+        finally:
+            connections.close_all()
+            settings_dict.clear()
+            settings_dict.update(original)
+            core.db.SQLITE_PRODUCTION = False
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _run(self, options: Dict) -> Dict:
+        """Запускает клиентов в потоках и собирает время ответов
+        и число ошибок блокировки.
+        """
+        cache.clear()
+        author, _ = User.objects.get_or_create(username=BENCH_AUTHOR)
+        post = Post.objects.create(text='Пост для бенчмарка', author=author)
+        users = [
+            User.objects.get_or_create(username=BENCH_USERNAME.format(n))[0]
+            for n in range(options['threads'])
+        ]
+        Follow.objects.filter(user__in=users).delete()
+        stats = {'read': [], 'write': [], 'errors': 0}
+        lock = threading.Lock()
+
+        def worker(user: User) -> None:
+            client = Client(REMOTE_ADDR='192.0.2.1')
+            client.force_login(user)
+            for i in range(options['requests']):
+                write = random.random() < options['writes']
+                started = time.perf_counter()
+                try:
+                    self._request(client, write, i, post, author)
+                except OperationalError:
+                    with lock:
+                        stats['errors'] += 1
+                    continue
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    stats['write' if write else 'read'].append(elapsed)
+            connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=[user])
+                   for user in users]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats['total'] = time.perf_counter() - started
+        return stats
+
+    @staticmethod
+    def _request(client: Client, write: bool, i: int, post: Post,
+                 author: User) -> None:
+        """Выполняет один запрос: чтение ленты или поста, или одну из
+        трех записей. Подписка сразу сменяется отпиской.
+        """
+        if not write:
+            if i % 2:
+                client.get(reverse('posts:index'))
+            else:
+                client.get(reverse('posts:post_detail', args=[post.id]))
+            return
+        kind = i % 3
+        if kind == 0:
+            client.post(reverse('posts:post_create'),
+                        data={'text': f'Пост бенчмарка {i}'})
+        elif kind == 1:
+            client.post(reverse('posts:add_comment', args=[post.id]),
+                        data={'text': f'Комментарий бенчмарка {i}'})
+        else:
+            client.get(reverse('posts:profile_follow',
+                               args=[author.username]))
+            client.get(reverse('posts:profile_unfollow',
+                               args=[author.username]))
+
+    def _report(self, production: bool, stats: Dict) -> None:
+        """Печатает результаты одного режима."""
+        mode = 'рабочий' if production else 'обычный'
+        done = len(stats['read']) + len(stats['write'])
+        self.stdout.write(
+            f'Режим {mode}: {done / stats["total"]:.0f} запросов/с, '
+            f'ошибок блокировки: {stats["errors"]}')
+        for kind in ('read', 'write'):
+            times: List[float] = sorted(stats[kind])
+            if not times:
+                continue
+            p95 = times[int(len(times) * 0.95) - 1]
+            self.stdout.write(
+                f'  {kind}: среднее {statistics.mean(times):.1f} мс, '
+                f'p95 {p95:.1f} мс, запросов {len(times)}')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.notifications import send_pending
+
+
+class Command(BaseCommand):
+    help = ('Раздает уведомления о новых постах и собирает дайджесты. '
+            'Запускается периодически, когда фоновая очередь выключена.')
+
+    def handle(self, *args, **options):
+        sent = send_pending()
+        self.stdout.write(f'Разослано постов: {sent}')
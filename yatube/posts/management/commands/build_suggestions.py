@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.suggestions import build_suggestions
+from yatube.settings import SUGGEST_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации авторов по общим подпискам. '
+            'Запускается периодически: без --full обновляет только '
+            'пользователей, у которых изменились подписки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=SUGGEST_BATCH_SIZE,
+                            help='Число пользователей, записываемых за раз.')
+        parser.add_argument('--full', action='store_true',
+                            help='Пересчитать рекомендации всех '
+                                 'пользователей.')
+
+    def handle(self, *args, **options):
+        updated = build_suggestions(options['full'], options['batch_size'])
+        self.stdout.write(f'Обновлено рекомендаций: {updated}')
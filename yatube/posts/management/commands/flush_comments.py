@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.comment_queue import flush_comments
+from yatube.settings import COMMENT_BATCH_SIZE, COMMENT_FLUSH_SECONDS
+
+
+class Command(BaseCommand):
+    help = 'Записывает комментарии из очереди в базу.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=COMMENT_BATCH_SIZE,
+                            help='Число комментариев в одной пачке.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Разбирать очередь, пока процесс '
+                                 'не остановлен.')
+
+    def handle(self, *args, **options):
+        while True:
+            written = flush_comments(options['batch_size'])
+            if written:
+                self.stdout.write(f'Записано комментариев: {written}')
+            if not options['loop']:
+                return
+            time.sleep(COMMENT_FLUSH_SECONDS)
@@ -0,0 +1,59 @@
+import csv
+from itertools import groupby
+from typing import Iterator, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.follows import follow_many, sync_follows
+from yatube.settings import FOLLOW_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = ('Загружает подписки из CSV-файла со строками '
+            '"id пользователя,id автора".')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к CSV-файлу.')
+        parser.add_argument('--batch-size', type=int,
+                            default=FOLLOW_BATCH_SIZE,
+                            help='Число подписок в одной пачке.')
+        parser.add_argument('--sync', action='store_true',
+                            help='Удалить подписки пользователей из файла, '
+                                 'которых в файле нет. Строки одного '
+                                 'пользователя должны идти подряд.')
+
+    def handle(self, *args, **options):
+        with open(options['path'], newline='') as file:
+            pairs = self._pairs(csv.reader(file))
+            if not options['sync']:
+                done, skipped = follow_many(pairs, options['batch_size'])
+                self.stdout.write(
+                    f'Записано подписок: {done}, пропущено: {skipped}')
+                return
+            added = removed = skipped = 0
+            seen = set()
+            for user_id, rows in groupby(pairs, key=lambda pair: pair[0]):
+                if user_id in seen:
+                    raise CommandError(
+                        f'Строки пользователя {user_id} идут не подряд.')
+                seen.add(user_id)
+                user_added, user_removed, user_skipped = sync_follows(
+                    user_id, (author_id for _, author_id in rows))
+                added += user_added
+                removed += user_removed
+                skipped += user_skipped
+        self.stdout.write(f'Добавлено подписок: {added}, удалено: '
+                          f'{removed}, пропущено: {skipped}')
+
+    @staticmethod
+    def _pairs(rows: Iterator) -> Iterator[Tuple[int, int]]:
+        """Пары (пользователь, автор) из строк файла. Заголовок
+        и пустые строки пропускаются.
+        """
+        for number, row in enumerate(rows, start=1):
+            if not row or (number == 1 and not row[0].strip().isdigit()):
+                continue
+            try:
+                yield int(row[0]), int(row[1])
+            except (IndexError, ValueError):
+                raise CommandError(f'Некорректная строка {number}: {row}')
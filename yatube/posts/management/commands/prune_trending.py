@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import prune_trending
+
+
+class Command(BaseCommand):
+    help = ('Удаляет оценки обсуждаемости постов, которые вышли '
+            'из окна TRENDING_WINDOW. Запускается периодически.')
+
+    def handle(self, *args, **options):
+        deleted = prune_trending()
+        self.stdout.write(f'Удалено оценок: {deleted}')
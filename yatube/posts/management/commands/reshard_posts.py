@@ -0,0 +1,149 @@
+from typing import Dict, List, Type
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Case, IntegerField, Model, Value, When
+
+from posts.cache import GROUPS_SCOPE, USERS_SCOPE, bump_versions
+from posts.models import (Comment, DailyPostComments, MovedPost,
+                          NotificationItem, Post, PostViews, RollupSkip,
+                          TrendingScore)
+from posts.services import forget_post_bundle
+from posts.sharding import shard_for_author
+from posts.stats import cursor_name, rolled_up_ids
+from yatube.settings import POST_SHARDS, SHARD_ID_SPAN
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Таблицы основной базы, которые ссылаются на пост по id.
+POST_ID_TABLES = (TrendingScore, PostViews, DailyPostComments,
+                  NotificationItem)
+
+
+def reserve_ids(model: Type[Model], alias: str, count: int) -> List[int]:
+    """Резервирует count id постов или комментариев в диапазоне шарда,
+    сдвигая его автоинкремент. Сайт может писать на шард одновременно:
+    следующая строка получит id после зарезервированных.
+    """
+    table = model._meta.db_table
+    floor = POST_SHARDS.index(alias) * SHARD_ID_SPAN
+    with transaction.atomic(using=alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+            row = cursor.fetchone()
+            start = max(floor, row[0] if row else 0) + 1
+            if row is None:
+                cursor.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                    [table, start + count - 1])
+            else:
+                cursor.execute(
+                    'UPDATE sqlite_sequence SET seq = %s WHERE name = %s',
+                    [start + count - 1, table])
+    return list(range(start, start + count))
+
+
+def remap_post_ids(mapping: Dict[int, int]) -> None:
+    """Переводит ссылки на посты в таблицах основной базы на новые id
+    одним UPDATE на таблицу.
+    """
+    new_id = Case(*(When(post_id=old, then=Value(new))
+                    for old, new in mapping.items()),
+                  output_field=IntegerField())
+    for model in POST_ID_TABLES:
+        model.objects.filter(post_id__in=mapping).update(post_id=new_id)
+
+
+class Command(BaseCommand):
+    help = ('Переносит посты и комментарии на шарды их авторов, '
+            'например после изменения POST_SHARD_COUNT.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int,
+                            default=DEFAULT_CHUNK_SIZE,
+                            help='Число постов, переносимых за раз.')
+
+    def handle(self, *args, **options):
+        moved = 0
+        for source in POST_SHARDS:
+            author_ids = Post.objects.using(source).values_list(
+                'author_id', flat=True).distinct()
+            for author_id in list(author_ids):
+                target = shard_for_author(author_id)
+                if target != source:
+                    moved += self._move_author(
+                        source, target, author_id, options['chunk_size'])
+        if moved:
+            bump_versions(USERS_SCOPE, GROUPS_SCOPE)
+        self.stdout.write(f'Перенесено постов: {moved}')
+
+    @staticmethod
+    def _move_author(source: str, target: str, author_id: int,
+                     chunk_size: int) -> int:
+        """Переносит посты автора пачками. Пост получает новый id из
+        диапазона нового шарда, иначе автоинкремент шарда ушел бы
+        в чужой диапазон. Соответствие старых и новых id записывается
+        в MovedPost до копирования, поэтому повторный запуск после сбоя
+        берет те же id и пропускает уже скопированные посты.
+        Комментарии копируются в одной транзакции со своими постами
+        и получают id шарда. Строки, уже учтенные в статистике старого
+        шарда, записываются в RollupSkip, чтобы статистика нового шарда
+        не учла их второй раз; поэтому update_rollups не должна идти
+        одновременно с решардингом. Со старого шарда строки удаляются
+        мимо сигналов: пост не исчезает с сайта, а переезжает.
+        """
+        moved = 0
+        while True:
+            posts = list(Post.objects.using(source).filter(
+                author_id=author_id).order_by('pk')[:chunk_size])
+            if not posts:
+                return moved
+            post_ids = [post.pk for post in posts]
+            mapping = dict(MovedPost.objects.filter(
+                pk__in=post_ids).values_list('id', 'new_id'))
+            fresh = [pk for pk in post_ids if pk not in mapping]
+            if fresh:
+                new_ids = reserve_ids(Post, target, len(fresh))
+                MovedPost.objects.bulk_create(
+                    [MovedPost(id=old, new_id=new)
+                     for old, new in zip(fresh, new_ids)])
+                mapping.update(zip(fresh, new_ids))
+            copied = set(Post.objects.using(target).filter(
+                pk__in=mapping.values()).values_list('pk', flat=True))
+            posts = [post for post in posts if mapping[post.pk] not in copied]
+            comments = list(Comment.objects.using(source).filter(
+                post_id__in=[post.pk for post in posts]))
+            posts_rolled = rolled_up_ids(Post, source)
+            comments_rolled = rolled_up_ids(Comment, source)
+            skips = [RollupSkip(name=cursor_name(Post, target),
+                                row_id=mapping[post.pk])
+                     for post in posts if post.pk <= posts_rolled]
+            comment_ids = reserve_ids(Comment, target, len(comments))
+            for post in posts:
+                post.pk = mapping[post.pk]
+            for comment, new_id in zip(comments, comment_ids):
+                if comment.pk <= comments_rolled:
+                    skips.append(RollupSkip(
+                        name=cursor_name(Comment, target), row_id=new_id))
+                comment.pk = new_id
+                comment.post_id = mapping[comment.post_id]
+            RollupSkip.objects.bulk_create(skips, ignore_conflicts=True)
+            with transaction.atomic(using=target):
+                if posts:
+                    Post._base_manager.using(target)._insert(
+                        posts, fields=Post._meta.concrete_fields,
+                        using=target, raw=True)
+                if comments:
+                    Comment._base_manager.using(target)._insert(
+                        comments, fields=Comment._meta.concrete_fields,
+                        using=target, raw=True)
+            remap_post_ids(mapping)
+            with transaction.atomic(using=source):
+                Comment.objects.using(source).filter(
+                    post_id__in=post_ids)._raw_delete(source)
+                Post.objects.using(source).filter(
+                    pk__in=post_ids)._raw_delete(source)
+            for post_id in post_ids:
+                forget_post_bundle(post_id)
+            moved += len(post_ids)
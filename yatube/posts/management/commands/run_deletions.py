@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.deletion import run_deletions, schedule_deletion
+from posts.models import Group, User
+from yatube.settings import DELETION_BATCH_SIZE, DELETION_POLL_SECONDS
+
+
+class Command(BaseCommand):
+    help = ('Удаляет пользователей и группы, поставленные в очередь '
+            'удаления, вместе со связанными строками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=DELETION_BATCH_SIZE,
+                            help='Число строк, удаляемых за раз.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Разбирать очередь, пока процесс '
+                                 'не остановлен.')
+        parser.add_argument('--user', action='append', default=[],
+                            help='Поставить в очередь пользователя '
+                                 'с этим именем.')
+        parser.add_argument('--group', action='append', default=[],
+                            help='Поставить в очередь группу с этим slug.')
+
+    def handle(self, *args, **options):
+        objects = (
+            [self._get(User, username=name) for name in options['user']]
+            + [self._get(Group, slug=slug) for slug in options['group']]
+        )
+        for instance in objects:
+            schedule_deletion(instance)
+        while True:
+            deleted = run_deletions(options['batch_size'])
+            if deleted:
+                self.stdout.write(f'Удалено объектов: {deleted}')
+            if not options['loop']:
+                return
+            time.sleep(DELETION_POLL_SECONDS)
+
+    @staticmethod
+    def _get(model, **lookup):
+        """Объект для удаления; если его нет, команда завершается
+        с ошибкой, ничего не поставив в очередь.
+        """
+        try:
+            return model.objects.get(**lookup)
+        except model.DoesNotExist:
+            value, = lookup.values()
+            raise CommandError(
+                f'Не найдено: {model._meta.verbose_name} {value}.')
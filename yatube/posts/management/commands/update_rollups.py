@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import update_rollups
+from yatube.settings import ROLLUP_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = ('Добавляет новые посты и комментарии в таблицы статистики. '
+            'Запускается периодически и читает только новые строки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=ROLLUP_BATCH_SIZE,
+                            help='Число строк, учитываемых за раз.')
+
+    def handle(self, *args, **options):
+        done = update_rollups(options['batch_size'])
+        self.stdout.write(f'Учтено строк: {done}')
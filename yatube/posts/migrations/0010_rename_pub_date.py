@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_image'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='post',
+            old_name='pub_date',
+            new_name='created',
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_trendingscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostViews',
+            fields=[
+                ('post_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('views', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='postviews',
+            index=models.Index(fields=['-views'], name='post_views_idx'),
+        ),
+    ]
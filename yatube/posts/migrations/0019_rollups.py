@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_postviews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCursor',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('last_id', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyPostComments',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('post_id', models.IntegerField()),
+                ('comments', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('day', 'post_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyGroupPosts',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('group_id', models.IntegerField()),
+                ('posts', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('day', 'group_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyActiveAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('author_id', models.IntegerField()),
+            ],
+            options={
+                'unique_together': {('day', 'author_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_pendingnotification'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rollupcursor',
+            name='last_id',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_rollupcursor_last_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupSkip',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('row_id', models.BigIntegerField()),
+            ],
+            options={
+                'unique_together': {('name', 'row_id')},
+            },
+        ),
+    ]
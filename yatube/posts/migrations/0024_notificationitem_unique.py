@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:26
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Min
+
+
+def drop_duplicates(apps, schema_editor):
+    """Оставляет по одному уведомлению на получателя и пост."""
+    NotificationItem = apps.get_model('posts', 'NotificationItem')
+    keep = NotificationItem.objects.values(
+        'recipient_id', 'post_id').annotate(first=Min('pk')).values('first')
+    NotificationItem.objects.exclude(pk__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0023_rollupskip'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='notificationitem',
+            unique_together={('recipient', 'post_id')},
+        ),
+    ]
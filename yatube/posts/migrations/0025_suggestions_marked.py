@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_notificationitem_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='suggestions',
+            name='marked',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -6,6 +6,18 @@ from core.models import CreatedModel
 User = get_user_model()
 
 
+class RoutedQuerySet(models.QuerySet):
+    """create() без явного using выбирает базу по самому объекту:
+    посты и комментарии лежат на шарде автора.
+    """
+
+    def create(self, **kwargs):
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
@@ -42,10 +54,18 @@ class Post(CreatedModel):
                               help_text='Выберите картинку к посту'
                               )
 
+    objects = RoutedQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['group', '-created'],
+                         name='post_group_created_idx'),
+            models.Index(fields=['author', '-created'],
+                         name='post_author_created_idx'),
+        ]
 
     def __str__(self):
         return str(self.text[:15])
@@ -62,6 +82,8 @@ class Comment(CreatedModel):
                                related_name='comments'
                                )
 
+    objects = RoutedQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created']
         verbose_name = 'Комментарий'
@@ -71,6 +93,282 @@ class Comment(CreatedModel):
         return self.text
 
 
+class ArchivedPost(models.Model):
+    """Пост, перенесенный из оперативной таблицы в архив. Id поста
+    сохраняется, поэтому его адрес не меняется.
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(verbose_name='Контент')
+    created = models.DateTimeField(verbose_name='Дата создания')
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name='archived_posts',
+                               verbose_name='Автор'
+                               )
+    group = models.ForeignKey(Group,
+                              blank=True,
+                              null=True,
+                              on_delete=models.SET_NULL,
+                              related_name='archived_posts',
+                              verbose_name='Группа'
+                              )
+    image = models.ImageField(verbose_name='Картинка',
+                              upload_to='posts/',
+                              blank=True
+                              )
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+        indexes = [
+            models.Index(fields=['author', '-created'],
+                         name='archived_author_created_idx'),
+        ]
+
+    def __str__(self):
+        return str(self.text[:15])
+
+
+class ArchivedComment(models.Model):
+    """Комментарий к архивному посту."""
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(verbose_name='Ваш комментарий')
+    created = models.DateTimeField(verbose_name='Дата создания')
+    post = models.ForeignKey(ArchivedPost,
+                             on_delete=models.CASCADE,
+                             related_name='comments'
+                             )
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name='archived_comments'
+                               )
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
+
+    def __str__(self):
+        return self.text
+
+
+class MovedPost(models.Model):
+    """Новый id поста, перенесенного решардингом на другой шард: id
+    выдаются из диапазона шарда, поэтому при переносе пост получает
+    новый. Старый адрес поста ведет на новый.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    new_id = models.BigIntegerField()
+
+    def __str__(self):
+        return f'{self.id}:{self.new_id}'
+
+
+class PendingDeletion(CreatedModel):
+    """Пользователь или группа, которые скрыты с сайта и удаляются
+    в фоне вместе со своими постами и подписками.
+    """
+    model = models.CharField(max_length=100)
+    object_id = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['created']
+        unique_together = ['model', 'object_id']
+        verbose_name = 'Отложенное удаление'
+        verbose_name_plural = 'Отложенные удаления'
+
+    def __str__(self):
+        return f'{self.model}:{self.object_id}'
+
+
+class PendingNotification(CreatedModel):
+    """Новый пост, о котором еще не разосланы уведомления. Пишется,
+    когда фоновая очередь выключена; уведомления раздает периодическая
+    команда build_digests.
+    """
+    post_id = models.IntegerField()
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name='+'
+                               )
+
+    def __str__(self):
+        return f'{self.author_id}:{self.post_id}'
+
+
+class NotificationItem(CreatedModel):
+    """Уведомление о новом посте, еще не собранное в дайджест.
+    Получатель получает уведомление о посте один раз.
+    """
+    recipient = models.ForeignKey(User,
+                                  on_delete=models.CASCADE,
+                                  related_name='+'
+                                  )
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name='+'
+                               )
+    post_id = models.IntegerField()
+
+    class Meta:
+        unique_together = ['recipient', 'post_id']
+
+    def __str__(self):
+        return f'{self.recipient_id}:{self.post_id}'
+
+
+class Digest(CreatedModel):
+    """Дайджест уведомлений пользователя о новых постах авторов,
+    на которых он подписан. Посты хранятся списком в JSON вместе
+    с именами авторов и началом текста, чтобы входящие выводились
+    без соединений.
+    """
+    recipient = models.ForeignKey(User,
+                                  on_delete=models.CASCADE,
+                                  related_name='digests'
+                                  )
+    posts = models.TextField()
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Дайджест'
+        verbose_name_plural = 'Дайджесты'
+
+    def __str__(self):
+        return f'{self.recipient_id}:{self.created}'
+
+
+class TrendingScore(models.Model):
+    """Оценка обсуждаемости поста. Каждый комментарий добавляет к ней
+    вес, который растет со временем; оценка хранится как логарифм
+    суммы весов, поэтому старые оценки не нужно пересчитывать.
+    """
+    post_id = models.IntegerField(primary_key=True)
+    group = models.ForeignKey(Group,
+                              blank=True,
+                              null=True,
+                              on_delete=models.SET_NULL,
+                              related_name='+'
+                              )
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='trending_score_idx'),
+            models.Index(fields=['group', '-score'],
+                         name='trending_group_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}:{self.score}'
+
+
+class PostViews(models.Model):
+    """Число просмотров поста. Просмотры копятся в памяти процессов
+    и прибавляются пачками.
+    """
+    post_id = models.IntegerField(primary_key=True)
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-views'], name='post_views_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}:{self.views}'
+
+
+class DailyGroupPosts(models.Model):
+    """Число постов за день в группе. Посты без группы считаются
+    с group_id 0.
+    """
+    day = models.DateField()
+    group_id = models.IntegerField()
+    posts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['day', 'group_id']
+
+    def __str__(self):
+        return f'{self.day}:{self.group_id}'
+
+
+class DailyPostComments(models.Model):
+    """Число комментариев к посту за день."""
+    day = models.DateField()
+    post_id = models.IntegerField()
+    comments = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['day', 'post_id']
+
+    def __str__(self):
+        return f'{self.day}:{self.post_id}'
+
+
+class DailyActiveAuthor(models.Model):
+    """Пользователь, который написал за день пост или комментарий."""
+    day = models.DateField()
+    author_id = models.IntegerField()
+
+    class Meta:
+        unique_together = ['day', 'author_id']
+
+    def __str__(self):
+        return f'{self.day}:{self.author_id}'
+
+
+class RollupCursor(models.Model):
+    """Id последней строки таблицы шарда, уже учтенной в статистике."""
+    name = models.CharField(max_length=100, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}:{self.last_id}'
+
+
+class RollupSkip(models.Model):
+    """Строка таблицы шарда, уже учтенная в статистике под прежним id:
+    решардинг переносит строки с новыми id, и курсор статистики шарда
+    их пропускает.
+    """
+    name = models.CharField(max_length=100)
+    row_id = models.BigIntegerField()
+
+    class Meta:
+        unique_together = ['name', 'row_id']
+
+    def __str__(self):
+        return f'{self.name}:{self.row_id}'
+
+
+class Suggestions(models.Model):
+    """Авторы, которых стоит почитать пользователю, посчитанные заранее
+    по общим подпискам. Id авторов хранятся списком в JSON по убыванию
+    оценки; stale отмечает, что подписки пользователя или похожих
+    на него читателей изменились и список нужно пересчитать, marked -
+    когда это случилось в последний раз.
+    """
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='+'
+                                )
+    authors = models.TextField(default='[]')
+    stale = models.BooleanField(default=False)
+    marked = models.DateTimeField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Рекомендации'
+        verbose_name_plural = 'Рекомендации'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
 class Follow(models.Model):
     user = models.ForeignKey(User,
                              on_delete=models.CASCADE,
@@ -0,0 +1,142 @@
+import json
+from collections import defaultdict
+from typing import Dict, List, Set
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.jobs import enqueue, queue_enabled, register
+from posts.models import (Digest, Follow, NotificationItem,
+                          PendingNotification, Post)
+from yatube.settings import (DIGEST_BATCH_SIZE, DIGEST_SECONDS,
+                             NOTIFY_CHUNK_SIZE, POST_SHARDS)
+
+PREVIEW_LENGTH = 100
+
+BUILD_DIGESTS_KEY = 'posts.build_digests'
+
+
+def notify_later(post_id: int, author_id: int) -> None:
+    """Откладывает уведомления о новом посте. С фоновой очередью
+    ставит задачу раздачи, без нее записывает одну отметку: раздача
+    подписчикам не должна идти в запросе, который создал пост.
+    """
+    if queue_enabled():
+        enqueue('posts.notify_followers', post_id=post_id,
+                author_id=author_id)
+    else:
+        PendingNotification.objects.create(post_id=post_id,
+                                           author_id=author_id)
+
+
+@register('posts.notify_followers')
+def notify_followers(post_id: int, author_id: int) -> None:
+    """Раздает уведомление о новом посте подписчикам автора. Подписчики
+    читаются пачками по NOTIFY_CHUNK_SIZE по ключу подписки, и каждая
+    пачка записывается одним bulk_create. Уже записанные уведомления
+    пропускаются, поэтому повторный запуск задачи после сбоя
+    не дублирует их. Уведомления собираются в дайджесты позже,
+    задачей posts.build_digests.
+    """
+    last_id = 0
+    while True:
+        chunk = list(Follow.objects.filter(
+            author_id=author_id, pk__gt=last_id).order_by('pk').values_list(
+            'pk', 'user_id')[:NOTIFY_CHUNK_SIZE])
+        if not chunk:
+            break
+        NotificationItem.objects.bulk_create((
+            NotificationItem(recipient_id=user_id, author_id=author_id,
+                             post_id=post_id)
+            for _, user_id in chunk
+        ), ignore_conflicts=True)
+        last_id = chunk[-1][0]
+    if last_id:
+        schedule_digests()
+
+
+def schedule_digests() -> None:
+    """Ставит сборку дайджестов через DIGEST_SECONDS, если она еще
+    не запланирована: все уведомления за это время попадут в один
+    дайджест получателя. Ожидающая задача одна благодаря unique_key.
+    Без фоновой очереди дайджесты собирает send_pending.
+    """
+    if queue_enabled():
+        enqueue('posts.build_digests', delay=DIGEST_SECONDS,
+                unique_key=BUILD_DIGESTS_KEY)
+
+
+def send_pending() -> int:
+    """Раздает уведомления по отметкам PendingNotification и собирает
+    дайджесты, когда самому старому уведомлению исполнилось
+    DIGEST_SECONDS, как и задача из очереди. Запускается периодически,
+    когда фоновая очередь выключена. Возвращает число разосланных
+    постов.
+    """
+    sent = 0
+    for pending in PendingNotification.objects.order_by('pk').iterator():
+        with transaction.atomic():
+            notify_followers(pending.post_id, pending.author_id)
+            pending.delete()
+        sent += 1
+    oldest = NotificationItem.objects.order_by('created').values_list(
+        'created', flat=True).first()
+    if oldest is not None and (
+            timezone.now() - oldest).total_seconds() >= DIGEST_SECONDS:
+        build_digests()
+    return sent
+
+
+def _previews(post_ids: Set[int]) -> Dict[int, str]:
+    """Начала текстов постов со всех шардов. Удаленных постов в ответе
+    нет.
+    """
+    previews = {}
+    for alias in POST_SHARDS:
+        previews.update(
+            (post_id, text[:PREVIEW_LENGTH])
+            for post_id, text in Post.objects.using(alias).filter(
+                pk__in=post_ids).values_list('id', 'text')
+        )
+    return previews
+
+
+def _digest_posts(items: List[Dict], previews: Dict[int, str]) -> str:
+    """Список постов дайджеста в JSON."""
+    return json.dumps([
+        {'id': item['post_id'], 'author': item['author__username'],
+         'text': previews[item['post_id']]}
+        for item in items if item['post_id'] in previews
+    ], ensure_ascii=False)
+
+
+@register('posts.build_digests')
+def build_digests() -> None:
+    """Собирает накопленные уведомления в дайджесты: по одному на
+    получателя. Получатели обрабатываются пачками по DIGEST_BATCH_SIZE,
+    дайджесты пачки записываются одним bulk_create в одной транзакции
+    с удалением собранных уведомлений.
+    """
+    while True:
+        recipients = list(NotificationItem.objects.order_by(
+            'recipient_id').values_list(
+            'recipient_id', flat=True).distinct()[:DIGEST_BATCH_SIZE])
+        if not recipients:
+            return
+        items = list(NotificationItem.objects.filter(
+            recipient_id__in=recipients).order_by('pk').values(
+            'id', 'recipient_id', 'post_id', 'author__username'))
+        by_recipient = defaultdict(list)
+        for item in items:
+            by_recipient[item['recipient_id']].append(item)
+        previews = _previews({item['post_id'] for item in items})
+        digests = [
+            Digest(recipient_id=recipient_id,
+                   posts=_digest_posts(recipient_items, previews))
+            for recipient_id, recipient_items in by_recipient.items()
+        ]
+        with transaction.atomic():
+            Digest.objects.bulk_create(
+                digest for digest in digests if digest.posts != '[]')
+            NotificationItem.objects.filter(
+                pk__in=[item['id'] for item in items]).delete()
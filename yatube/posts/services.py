@@ -1,12 +1,362 @@
+import heapq
+from itertools import islice
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.paginator import Page, Paginator
 from django.db.models import QuerySet
 from django.http import HttpRequest
+from django.utils.functional import cached_property
+
+from posts.archive import ArchiveFeed, find_archived_post
+from posts.cache import (COUNT_KEY, GROUPS_SCOPE, USERS_SCOPE, get_versions,
+                         group_scope, post_scope, profile_scope)
+from posts.models import Comment, Post
+from posts.sharding import (ShardedFeed, attach_related, find_post,
+                            get_comments, is_sharded, newest_rows,
+                            post_shards, shard_for_author)
+from yatube.settings import (COMMENTS_PER_PAGE, COUNT_CACHE_SECONDS,
+                             EXACT_COUNT_LIMIT, MISSING_CACHE_SECONDS,
+                             NEW_POSTS_LIMIT, PAGE_CACHE_SECONDS,
+                             POSTS_PER_PAGE, SNAPSHOT_CACHE_SECONDS,
+                             SNAPSHOT_PAGES)
+
+User = get_user_model()
+
+PAGE_LINKS_ON_EACH_SIDE = 2
+
+SNAPSHOT_KEY = 'snapshot:{scope}'
+SNAPSHOT_SIZE = SNAPSHOT_PAGES * POSTS_PER_PAGE
+
+POST_BUNDLE_KEY = 'post_bundle:{post_id}'
+MISSING_BUNDLE = 'missing'
+
+MAX_ID = 2 ** 63 - 1
+
+
+class ElidedPage(Page):
+    """Страница, которая выводит ссылки только на соседние страницы,
+    первую и последнюю. Пропуски обозначаются None.
+    """
+
+    @cached_property
+    def page_links(self) -> List[Optional[int]]:
+        num_pages = self.paginator.num_pages
+        first = max(1, self.number - PAGE_LINKS_ON_EACH_SIDE)
+        last = min(num_pages, self.number + PAGE_LINKS_ON_EACH_SIDE)
+        links = []
+        if first > 1:
+            links.append(1)
+        if first > 2:
+            links.append(None)
+        links.extend(range(first, last + 1))
+        if last < num_pages - 1:
+            links.append(None)
+        if last < num_pages:
+            links.append(num_pages)
+        return links
+
+
+class ApproximatePaginator(Paginator):
+    """Paginator, который берет число объектов из счетчика в кеше.
+    Счетчики поддерживают сигналы постов, а раз в COUNT_CACHE_SECONDS
+    они пересчитываются. Небольшие ленты считаются точно: COUNT по
+    ним дешевый, а неточность была бы заметна.
+    """
+
+    def __init__(self, object_list: Union[QuerySet, 'SnapshotFeed',
+                                          ShardedFeed, ArchiveFeed],
+                 per_page: int,
+                 count_scope: Optional[str] = None, **kwargs) -> None:
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_scope = count_scope
+
+    @cached_property
+    def count(self) -> int:
+        if self.count_scope is None:
+            return super().count
+        key = COUNT_KEY.format(scope=self.count_scope)
+        estimate = cache.get(key)
+        if estimate is not None and estimate >= EXACT_COUNT_LIMIT:
+            return estimate
+        count = super().count
+        cache.set(key, count, COUNT_CACHE_SECONDS)
+        return count
+
+    def _get_page(self, *args, **kwargs) -> ElidedPage:
+        return ElidedPage(*args, **kwargs)
+
+
+def get_identity_map(request: HttpRequest) -> Dict:
+    """Возвращает карту объектов, уже созданных за время запроса."""
+    if not hasattr(request, '_identity_map'):
+        request._identity_map = {}
+    return request._identity_map
+
+
+def hydrate_posts(post_list: QuerySet, ids: List[int],
+                  identity_map: Dict) -> List[Post]:
+    """Загружает посты по списку id одним запросом и сохраняет их
+    порядок. Посты читаются без соединений, а авторы и группы
+    подставляются из карты запроса или догружаются по одному запросу
+    на модель, так что один и тот же автор на странице - один объект.
+    """
+    posts = post_list.select_related(None).in_bulk(ids)
+    return attach_related(
+        [posts[post_id] for post_id in ids if post_id in posts],
+        identity_map)
+
+
+class SnapshotFeed:
+    """Лента, id постов первых SNAPSHOT_PAGES страниц которой хранятся
+    в кеше. Страницы из снимка загружаются по id без сортировки
+    и соединений в базе, остальные берутся из post_list.
+    Снимок, в котором меньше SNAPSHOT_SIZE id, содержит всю ленту.
+    """
+
+    def __init__(self, request: HttpRequest, scope: str,
+                 post_list: QuerySet) -> None:
+        self.scope = scope
+        self.post_list = post_list
+        self.identity_map = get_identity_map(request)
+
+    @cached_property
+    def ids(self) -> List[int]:
+        key = SNAPSHOT_KEY.format(scope=self.scope)
+        ids = cache.get(key)
+        if ids is None:
+            ids = list(self.post_list.values_list(
+                'id', flat=True)[:SNAPSHOT_SIZE])
+            cache.set(key, ids, SNAPSHOT_CACHE_SECONDS)
+        return ids
+
+    def count(self) -> int:
+        return self.post_list.count()
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Post, List]:
+        if not isinstance(index, slice) or index.step is not None:
+            return self.post_list[index]
+        stop = index.stop
+        if len(self.ids) < SNAPSHOT_SIZE or (
+                stop is not None and stop <= len(self.ids)):
+            return hydrate_posts(
+                self.post_list, self.ids[index], self.identity_map)
+        return self.post_list[index]
+
+
+def get_feed(request: HttpRequest, scope: str,
+             post_list: QuerySet) -> Union[SnapshotFeed, ShardedFeed]:
+    """Возвращает ленту для пагинатора: первые страницы из снимка id
+    или, если посты разнесены по шардам, слияние лент всех шардов.
+    """
+    if is_sharded():
+        return ShardedFeed(post_list, get_identity_map(request))
+    return SnapshotFeed(request, scope, post_list)
+
 
-from yatube.settings import POSTS_PER_PAGE
+def across_shards(request: HttpRequest,
+                  post_list: QuerySet) -> Union[QuerySet, ShardedFeed]:
+    """Возвращает ленту без снимка: запрос к основной базе или, если
+    посты разнесены по шардам, слияние лент всех шардов.
+    """
+    if is_sharded():
+        return ShardedFeed(post_list, get_identity_map(request))
+    return post_list
 
 
-def get_paginator(request: HttpRequest, post_list: QuerySet) -> Page:
-    """Возвращает Paginator."""
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
+def get_author_feed(request: HttpRequest, author: User) -> ArchiveFeed:
+    """Возвращает ленту автора: оперативные посты, а за ними архивные.
+    Оперативные посты автора всегда лежат на одном шарде.
+    """
+    post_list = author.posts.select_related('group')
+    if is_sharded():
+        post_list = ShardedFeed(post_list, get_identity_map(request),
+                                [shard_for_author(author.id)])
+    return ArchiveFeed(post_list,
+                       author.archived_posts.select_related('group'))
+
+
+def drop_snapshots(*scopes: str) -> None:
+    """Удаляет снимки лент: после нового поста, удаления поста или
+    смены группы снимок пересоздается при следующем чтении. Снимок
+    не дополняется на месте: чтение и запись списка в кеше не атомарны,
+    и одновременные публикации теряли бы посты.
+    """
+    cache.delete_many([SNAPSHOT_KEY.format(scope=scope) for scope in scopes])
+
+
+def _post_bundle_scopes(post: Post) -> List[str]:
+    """Области кеша, от которых зависит страница поста: сам пост,
+    лента автора (число его постов), имена пользователей и группа.
+    """
+    scopes = [post_scope(post.id), profile_scope(post.author.username),
+              USERS_SCOPE]
+    if post.group is not None:
+        scopes.extend([group_scope(post.group.slug), GROUPS_SCOPE])
+    return scopes
+
+
+def get_post_bundle(post_id: int) -> Optional[Dict[str, Any]]:
+    """Возвращает неизменяемую часть страницы поста: пост с автором
+    и группой, число постов автора, первую страницу комментариев и их
+    общее число. Набор хранится в кеше вместе с версиями своих областей
+    и пересобирается, когда любая из них изменилась. Пост, которого нет
+    в оперативной таблице, ищется в архиве. Если поста нет нигде,
+    возвращает None; отсутствие кешируется на MISSING_CACHE_SECONDS,
+    новый пост сбрасывает его сигналом.
+    """
+    key = POST_BUNDLE_KEY.format(post_id=post_id)
+    bundle = cache.get(key)
+    if bundle == MISSING_BUNDLE:
+        return None
+    if bundle is not None and (
+            get_versions(bundle['scopes']) == bundle['versions']):
+        return bundle
+    post = find_post(post_id) or find_archived_post(post_id)
+    if post is None:
+        cache.set(key, MISSING_BUNDLE, MISSING_CACHE_SECONDS)
+        return None
+    scopes = _post_bundle_scopes(post)
+    bundle = {
+        'post': post,
+        'scopes': scopes,
+        'versions': get_versions(scopes),
+        'count': (post.author.posts.count()
+                  + post.author.archived_posts.count()),
+        'comments': get_comments(post, stop=COMMENTS_PER_PAGE),
+        'comments_count': post.comments.count(),
+    }
+    cache.set(key, bundle, PAGE_CACHE_SECONDS)
+    return bundle
+
+
+def forget_post_bundle(post_id: int) -> None:
+    """Удаляет набор страницы поста из кеша."""
+    cache.delete(POST_BUNDLE_KEY.format(post_id=post_id))
+
+
+class CommentFeed:
+    """Комментарии поста для пагинатора: первая страница и число
+    комментариев берутся из набора страницы поста, остальные страницы
+    читаются из базы срезом.
+    """
+
+    def __init__(self, bundle: Dict[str, Any]) -> None:
+        self.bundle = bundle
+
+    def count(self) -> int:
+        return self.bundle['comments_count']
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, index: slice) -> List:
+        if not index.start and index.stop <= COMMENTS_PER_PAGE:
+            return self.bundle['comments'][index]
+        return get_comments(self.bundle['post'], index.start, index.stop)
+
+
+def get_comment_page(request: HttpRequest, bundle: Dict[str, Any]) -> Page:
+    """Возвращает страницу комментариев поста."""
+    paginator = ApproximatePaginator(CommentFeed(bundle), COMMENTS_PER_PAGE)
+    return paginator.get_page(request.GET.get('page'))
+
+
+def get_paginator(request: HttpRequest,
+                  post_list: Union[QuerySet, SnapshotFeed, ShardedFeed,
+                                   ArchiveFeed, List[int]],
+                  count_scope: Optional[str] = None) -> Page:
+    """Возвращает страницу ленты. Если указана область count_scope,
+    число постов берется из ее счетчика.
+    """
+    paginator = ApproximatePaginator(post_list, POSTS_PER_PAGE, count_scope)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def parse_id(value: str) -> int:
+    """Разбирает id из параметра запроса. Если это не целое число
+    в диапазоне первичного ключа, выбрасывает ValueError: большее число
+    не поместится в параметр запроса к базе.
+    """
+    number = int(value)
+    if not 0 <= number <= MAX_ID:
+        raise ValueError(value)
+    return number
+
+
+def parse_cursor(value: str) -> Dict[str, int]:
+    """Разбирает курсор ленты новых постов: последний показанный id
+    на каждом шарде, через точку в порядке шардов. Недостающие шарды
+    читаются с начала. Если курсор некорректен, выбрасывает ValueError.
+    """
+    shards = post_shards()
+    parts = str(value).split('.')
+    if len(parts) > len(shards):
+        raise ValueError(value)
+    ids = [parse_id(part) for part in parts]
+    return dict(zip(shards, ids + [0] * (len(shards) - len(ids))))
+
+
+def format_cursor(cursor: Dict[str, int]) -> Union[int, str]:
+    """Курсор для ответа. На одном шарде это просто id поста."""
+    ids = [cursor[alias] for alias in post_shards()]
+    return ids[0] if len(ids) == 1 else '.'.join(map(str, ids))
+
+
+def get_new_posts(post_list: QuerySet, cursor: Dict[str, int]
+                  ) -> Tuple[List[Post], bool, Dict[str, int]]:
+    """Возвращает посты новее курсора в порядке публикации, признак
+    того, что за один запрос вернулись не все новые посты, и новый
+    курсор. Каждый шард читается по диапазону первичного ключа одним
+    запросом, а посты шардов сливаются по дате публикации.
+    """
+    if not is_sharded():
+        posts = list(
+            post_list.filter(pk__gt=cursor['default'])
+            .select_related('author', 'group')
+            .order_by('pk')[:NEW_POSTS_LIMIT + 1]
+        )
+    else:
+        parts = [
+            list(post_list.using(alias).filter(pk__gt=last_id)
+                 .select_related(None).order_by('pk')[:NEW_POSTS_LIMIT + 1])
+            for alias, last_id in cursor.items()
+        ]
+        posts = attach_related(list(islice(heapq.merge(
+            *parts, key=lambda post: (post.created, post.pk)),
+            NEW_POSTS_LIMIT + 1)))
+    has_more = len(posts) > NEW_POSTS_LIMIT
+    posts = posts[:NEW_POSTS_LIMIT]
+    cursor = dict(cursor)
+    for post in posts:
+        alias = post._state.db
+        cursor[alias] = max(cursor[alias], post.pk)
+    return posts, has_more, cursor
+
+
+def get_keyset_page(request: HttpRequest, rows: QuerySet,
+                    aliases: Optional[Sequence[str]] = None
+                    ) -> Tuple[List, Optional[int]]:
+    """Возвращает страницу по ключу: записи с id меньше параметра before
+    и курсор следующей страницы. В отличие от Paginator не считает
+    COUNT и не сдвигает OFFSET, поэтому глубокие страницы не дороже первой.
+    Посты и комментарии на шардах читаются с шардов aliases (по умолчанию
+    со всех) и сливаются по id. Если before некорректен, выбрасывает
+    ValueError.
+    """
+    before = request.GET.get('before')
+    if before is not None:
+        rows = rows.filter(pk__lt=parse_id(before))
+    if is_sharded() and rows.model in (Post, Comment):
+        page = newest_rows(rows, POSTS_PER_PAGE + 1, aliases)
+    else:
+        page = list(rows.order_by('-pk')[:POSTS_PER_PAGE + 1])
+    if len(page) > POSTS_PER_PAGE:
+        page = page[:POSTS_PER_PAGE]
+        return page, page[-1]['id']
+    return page, None
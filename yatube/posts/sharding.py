@@ -0,0 +1,270 @@
+import heapq
+from collections import defaultdict
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.signals import connection_created
+from django.db.models import Model, QuerySet
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+from django.http import Http404
+
+from posts.models import Comment, Group, MovedPost, Post
+from yatube.settings import POST_SHARDS, SHARD_ID_SPAN
+
+User = get_user_model()
+
+SHARDED_MODELS = ('post', 'comment')
+RELATED_FIELDS = ('author', 'group')
+# Поля values() со связанными объектами основной базы: на шардах
+# вместо соединения читается id, а имя подставляется отдельно.
+RELATED_VALUES = (
+    ('author_id', 'author__username', User, 'username'),
+    ('group_id', 'group__slug', Group, 'slug'),
+)
+
+
+def is_sharded() -> bool:
+    """Посты разнесены по нескольким базам."""
+    return len(POST_SHARDS) > 1
+
+
+def post_shards() -> List[str]:
+    """Базы, на которых лежат посты и комментарии."""
+    return list(POST_SHARDS)
+
+
+def shard_for_author(author_id: int) -> str:
+    """Шард, на котором лежат посты автора и комментарии к ним."""
+    return POST_SHARDS[author_id % len(POST_SHARDS)]
+
+
+def shard_for_id(object_id: int) -> str:
+    """Шард, на котором объект был создан, по диапазону его id."""
+    number = object_id // SHARD_ID_SPAN
+    return POST_SHARDS[number] if number < len(POST_SHARDS) else POST_SHARDS[0]
+
+
+class ShardRouter:
+    """Направляет запросы к постам и комментариям на шард автора.
+    Прочитанный объект пишется туда, откуда прочитан; новый пост - на
+    шард своего автора, комментарий - на шард своего поста. Запросы
+    без подсказки (например, общие ленты) решает следующий роутер,
+    а ленты по всем шардам читает ShardedFeed.
+    """
+
+    def _shard(self, model, instance: Optional[Model]) -> Optional[str]:
+        if not is_sharded() or model not in (Post, Comment):
+            return None
+        if isinstance(instance, User):
+            return shard_for_author(instance.pk) if model is Post else None
+        if not isinstance(instance, (Post, Comment)):
+            return None
+        if not instance._state.adding and instance._state.db in POST_SHARDS:
+            return instance._state.db
+        if isinstance(instance, Post):
+            return shard_for_author(instance.author_id)
+        if Comment.post.is_cached(instance):
+            return self._shard(Post, instance.post)
+        if instance.post_id is not None:
+            return shard_for_id(instance.post_id)
+        return None
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        return self._shard(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints) -> Optional[str]:
+        return self._shard(model, hints.get('instance'))
+
+    def allow_migrate(self, db: str, app_label: str,
+                      model_name: Optional[str] = None,
+                      **hints) -> Optional[bool]:
+        if db in POST_SHARDS[1:]:
+            return app_label == 'posts' and model_name in SHARDED_MODELS
+        return None
+
+
+@receiver(connection_created)
+def disable_foreign_keys(sender, connection: BaseDatabaseWrapper,
+                         **kwargs) -> None:
+    """Авторы и группы живут в основной базе, поэтому на шардах
+    внешние ключи на них не проверяются.
+    """
+    if connection.alias in POST_SHARDS[1:]:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA foreign_keys = OFF')
+
+
+@receiver(post_migrate)
+def init_shard_sequences(sender, using: str, **kwargs) -> None:
+    """Сдвигает автоинкремент постов и комментариев шарда в его
+    диапазон id.
+    """
+    if sender.name != 'posts' or using not in POST_SHARDS[1:]:
+        return
+    floor = POST_SHARDS.index(using) * SHARD_ID_SPAN
+    with connections[using].cursor() as cursor:
+        for model in (Post, Comment):
+            table = model._meta.db_table
+            cursor.execute(
+                'SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                    [table, floor])
+            elif row[0] < floor:
+                cursor.execute(
+                    'UPDATE sqlite_sequence SET seq = %s WHERE name = %s',
+                    [floor, table])
+
+
+def attach_related(objects: List[Model],
+                   identity_map: Optional[Dict] = None) -> List[Model]:
+    """Подставляет в посты или комментарии с шардов их авторов и группы
+    из основной базы: по одному запросу in_bulk на модель. Уже
+    загруженные за запрос объекты берутся из identity_map.
+    """
+    if not objects:
+        return objects
+    identity_map = {} if identity_map is None else identity_map
+    meta = objects[0]._meta
+    for name in RELATED_FIELDS:
+        try:
+            field = meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        model = field.related_model
+        ids = {getattr(obj, field.attname) for obj in objects} - {None}
+        missing = [pk for pk in ids if (model, pk) not in identity_map]
+        for pk, related in model.objects.in_bulk(missing).items():
+            identity_map[(model, pk)] = related
+        for obj in objects:
+            related_id = getattr(obj, field.attname)
+            field.set_cached_value(
+                obj, identity_map.get((model, related_id)))
+    return objects
+
+
+class ShardedFeed:
+    """Лента постов с нескольких шардов. Каждый шард отдает первые
+    stop постов страницы в порядке ленты, и они сливаются k-путевым
+    слиянием, так что глубина страницы определяет размер выборки
+    с каждого шарда.
+    """
+
+    def __init__(self, post_list: QuerySet, identity_map: Dict,
+                 aliases: Optional[Sequence[str]] = None) -> None:
+        self.post_list = post_list.select_related(None).order_by(
+            '-created', '-pk')
+        self.identity_map = identity_map
+        self.aliases = POST_SHARDS if aliases is None else aliases
+
+    def count(self) -> int:
+        return sum(self.post_list.using(alias).count()
+                   for alias in self.aliases)
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Post, List]:
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        parts = [self.post_list.using(alias)[:index.stop]
+                 for alias in self.aliases]
+        merged = heapq.merge(
+            *parts, key=lambda post: (post.created, post.pk), reverse=True)
+        return attach_related(
+            list(islice(merged, start, index.stop)), self.identity_map)
+
+
+def find_post(post_id: int) -> Optional[Post]:
+    """Возвращает пост с автором и группой или None. Пост ищется
+    на шарде, который выдал его id; пост, перенесенный решардингом,
+    ищется по новому id.
+    """
+    if not is_sharded():
+        post = Post.objects.select_related(
+            'author', 'group').filter(pk=post_id).first()
+    else:
+        post = Post.objects.using(shard_for_id(post_id)).filter(
+            pk=post_id).first()
+        if post is not None:
+            post = attach_related([post])[0]
+    if post is not None:
+        return post
+    new_id = MovedPost.objects.filter(pk=post_id).values_list(
+        'new_id', flat=True).first()
+    return None if new_id is None else find_post(new_id)
+
+
+def get_post_or_404(post_id: int) -> Post:
+    """Возвращает пост с любого шарда или выбрасывает Http404."""
+    post = find_post(post_id)
+    if post is None:
+        raise Http404
+    return post
+
+
+def get_comments(post: Post, start: int = 0,
+                 stop: Optional[int] = None) -> List[Comment]:
+    """Комментарии к посту с их авторами, срез [start:stop] от новых
+    к старым.
+    """
+    if not is_sharded():
+        return list(post.comments.select_related('author')[start:stop])
+    return attach_related(list(post.comments.all()[start:stop]))
+
+
+def resolve_post_ids(post_ids: Iterable[int]) -> Dict[int, int]:
+    """Текущие id существующих постов: пост ищется на шарде своего id,
+    а пост, перенесенный решардингом, - по новому id. Удаленных постов
+    в ответе нет.
+    """
+    by_shard = defaultdict(set)
+    for post_id in post_ids:
+        by_shard[shard_for_id(post_id)].add(post_id)
+    found = {}
+    for alias, ids in by_shard.items():
+        found.update((pk, pk) for pk in Post.objects.using(alias).filter(
+            pk__in=ids).values_list('id', flat=True))
+    missing = set().union(*by_shard.values()) - found.keys()
+    moved = dict(MovedPost.objects.filter(pk__in=missing).values_list(
+        'id', 'new_id')) if missing else {}
+    if moved:
+        current = resolve_post_ids(moved.values())
+        found.update((old, current[new]) for old, new in moved.items()
+                     if new in current)
+    return found
+
+
+def newest_rows(rows: QuerySet, limit: int,
+                aliases: Optional[Sequence[str]] = None) -> List[Dict]:
+    """Первые limit строк values() по убыванию id со всех шардов:
+    каждый шард отдает свои первые limit строк, и они сливаются.
+    """
+    aliases = POST_SHARDS if aliases is None else aliases
+    parts = [rows.using(alias).order_by('-pk')[:limit] for alias in aliases]
+    return list(islice(
+        heapq.merge(*parts, key=itemgetter('id'), reverse=True), limit))
+
+
+def attach_names(rows: List[Dict]) -> List[Dict]:
+    """Заменяет в строках values() с шардов id автора и группы на имя
+    автора и slug группы из основной базы: по запросу на модель.
+    """
+    for attname, name, model, field in RELATED_VALUES:
+        if not rows or attname not in rows[0]:
+            continue
+        ids = {row[attname] for row in rows} - {None}
+        names = dict(model.objects.filter(pk__in=ids).values_list(
+            'pk', field))
+        for row in rows:
+            row[name] = names.get(row.pop(attname))
+    return rows
@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from posts.cache import (GROUPS_SCOPE, INDEX_SCOPE, USERS_SCOPE,
+                         adjust_counts, bump_versions, follow_scope,
+                         group_scope, post_scope, profile_scope,
+                         sitemap_scope)
+from posts.lookups import forget_object
+from posts.models import Comment, Follow, Group, Post, PostViews
+from posts.notifications import notify_later
+from posts.services import drop_snapshots, forget_post_bundle
+from posts.sitemaps import shard_of
+from posts.suggestions import mark_stale
+from posts.trending import forget_trending, move_trending, record_comments
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_group(sender, instance: Post, using: str,
+                       **kwargs) -> None:
+    """Запоминает прежнюю группу поста, чтобы сбросить и ее ленту."""
+    if instance.pk is None:
+        instance._old_group_id = None
+        return
+    instance._old_group_id = Post.objects.using(using).filter(
+        pk=instance.pk).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_versions(sender, instance: Post, signal, created=False,
+                       **kwargs) -> None:
+    """Сбрасывает версии лент, в которые входит пост, и обновляет
+    счетчики постов в них.
+    """
+    old_group_id = getattr(instance, '_old_group_id', None)
+    group_ids = {instance.group_id, old_group_id} - {None}
+    slugs = dict(
+        Group.objects.filter(pk__in=group_ids).values_list('id', 'slug'))
+    username = User.objects.filter(
+        pk=instance.author_id).values_list('username', flat=True).first()
+    bump_versions(
+        INDEX_SCOPE,
+        post_scope(instance.pk),
+        profile_scope(username),
+        sitemap_scope('posts', shard_of(instance.pk)),
+        sitemap_scope('profiles', shard_of(instance.author_id)),
+        *(group_scope(slug) for slug in slugs.values()),
+        *(sitemap_scope('groups', shard_of(group_id))
+          for group_id in group_ids)
+    )
+    forget_post_bundle(instance.pk)
+    new_groups = []
+    if instance.group_id in slugs:
+        new_groups.append(group_scope(slugs[instance.group_id]))
+    if signal is post_delete:
+        adjust_counts(-1, INDEX_SCOPE, profile_scope(username), *new_groups)
+        drop_snapshots(INDEX_SCOPE, *new_groups)
+        forget_trending(instance.pk, *group_ids)
+        PostViews.objects.filter(post_id=instance.pk).delete()
+    elif created:
+        adjust_counts(1, INDEX_SCOPE, profile_scope(username), *new_groups)
+        drop_snapshots(INDEX_SCOPE, *new_groups)
+        notify_later(instance.pk, instance.author_id)
+    elif old_group_id != instance.group_id:
+        old_groups = []
+        if old_group_id in slugs:
+            old_groups.append(group_scope(slugs[old_group_id]))
+        adjust_counts(-1, *old_groups)
+        adjust_counts(1, *new_groups)
+        drop_snapshots(*old_groups, *new_groups)
+        move_trending(instance.pk, old_group_id, instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_versions(sender, instance: Comment, **kwargs) -> None:
+    """Сбрасывает версию страницы поста при изменении комментариев."""
+    bump_versions(post_scope(instance.post_id))
+    forget_post_bundle(instance.post_id)
+
+
+@receiver(post_save, sender=Comment)
+def record_trending(sender, instance: Comment, created: bool,
+                    **kwargs) -> None:
+    """Добавляет новый комментарий к оценке обсуждаемости поста."""
+    if created:
+        record_comments([instance])
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow_versions(sender, instance: Follow, **kwargs) -> None:
+    """Сбрасывает версию подписок пользователя, а с ней набор подписок
+    в кеше, и отмечает для пересчета его рекомендации и рекомендации
+    подписчиков автора.
+    """
+    bump_versions(follow_scope(instance.user_id))
+    mark_stale([instance.user_id], [instance.author_id])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_versions(sender, instance: Group, **kwargs) -> None:
+    """Название группы выводится во всех лентах, поэтому сбрасываются
+    общая версия групп и лента самой группы.
+    """
+    bump_versions(GROUPS_SCOPE, group_scope(instance.slug),
+                  sitemap_scope('groups', shard_of(instance.pk)))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_versions(sender, instance: User, update_fields=None,
+                       **kwargs) -> None:
+    """Имя автора выводится во всех лентах. Обновление только времени
+    входа на страницы не влияет.
+    """
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    bump_versions(USERS_SCOPE, profile_scope(instance.username),
+                  sitemap_scope('profiles', shard_of(instance.pk)))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_object(sender, instance, update_fields=None,
+                         **kwargs) -> None:
+    """Удаляет группу или пользователя из кеша объектов."""
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    forget_object(instance)
@@ -0,0 +1,173 @@
+import hashlib
+from datetime import datetime
+from typing import (Callable, Dict, Iterable, Iterator, List, Optional,
+                    Tuple, Type)
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Max, Min, Model
+from django.http import (Http404, HttpRequest, HttpResponse,
+                         StreamingHttpResponse)
+from django.urls import reverse
+from django.utils.html import escape
+
+from posts.cache import get_version, sitemap_scope
+from posts.models import Group, Post
+from posts.sharding import is_sharded, post_shards, shard_for_id
+from yatube.settings import SITEMAP_CACHE_SECONDS, SITEMAP_SHARD_SIZE
+
+User = get_user_model()
+
+SITEMAP_KEY = 'sitemap:{digest}'
+CONTENT_TYPE = 'application/xml'
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def shard_of(object_id: int) -> int:
+    """Возвращает номер части карты сайта, в которую попадает объект."""
+    return object_id // SITEMAP_SHARD_SIZE
+
+
+def _post_rows(low: int, high: int) -> Iterable[Tuple[int, datetime]]:
+    """Id и дата публикации постов. Диапазон части карты целиком
+    лежит в диапазоне id одного шарда.
+    """
+    return Post.objects.using(shard_for_id(low)).filter(
+        pk__gte=low, pk__lt=high).values_list(
+        'id', 'created').order_by('pk').iterator()
+
+
+def _last_posts(field: str, low: int, high: int) -> Dict[int, datetime]:
+    """Дата последнего поста по значениям поля field из диапазона
+    со всех шардов.
+    """
+    last: Dict[int, datetime] = {}
+    for alias in post_shards():
+        rows = Post.objects.using(alias).filter(**{
+            f'{field}__gte': low, f'{field}__lt': high,
+        }).values_list(field).annotate(last=Max('created')).order_by()
+        for key, created in rows:
+            last[key] = max(created, last.get(key, created))
+    return last
+
+
+def _profile_rows(low: int, high: int) -> Iterable[Tuple[str, datetime]]:
+    """Авторы и дата их последнего поста."""
+    if not is_sharded():
+        return User.objects.filter(pk__gte=low, pk__lt=high).annotate(
+            last=Max('posts__created')).filter(
+            last__isnull=False).values_list(
+            'username', 'last').order_by('pk').iterator()
+    last = _last_posts('author_id', low, high)
+    return [(username, last[pk]) for pk, username in User.objects.filter(
+        pk__in=last).order_by('pk').values_list('pk', 'username')]
+
+
+def _group_rows(low: int, high: int
+                ) -> Iterable[Tuple[str, Optional[datetime]]]:
+    """Группы и дата последнего поста в них."""
+    groups = Group.objects.filter(pk__gte=low, pk__lt=high).order_by('pk')
+    if not is_sharded():
+        return groups.annotate(last=Max('posts__created')).values_list(
+            'slug', 'last').iterator()
+    last = _last_posts('group_id', low, high)
+    return [(slug, last.get(pk))
+            for pk, slug in groups.values_list('pk', 'slug')]
+
+
+RowsFunc = Callable[[int, int], Iterable[Tuple[str, Optional[datetime]]]]
+
+SECTIONS: Dict[str, Tuple[RowsFunc, str, Type[Model]]] = {
+    'posts': (_post_rows, 'posts:post_detail', Post),
+    'profiles': (_profile_rows, 'posts:profile', User),
+    'groups': (_group_rows, 'posts:group_list', Group),
+}
+
+
+def _url(loc: str, lastmod: Optional[datetime] = None) -> str:
+    """Возвращает запись карты сайта."""
+    if lastmod is None:
+        return f'<url><loc>{escape(loc)}</loc></url>\n'
+    return (f'<url><loc>{escape(loc)}</loc>'
+            f'<lastmod>{lastmod.date().isoformat()}</lastmod></url>\n')
+
+
+def _shard_entries(base: str, section: str, shard: int) -> Iterator[str]:
+    """Построчно генерирует часть карты сайта. Строки читаются из базы
+    итератором по диапазону первичного ключа, поэтому память не растет
+    с числом объектов.
+    """
+    rows_func, url_name, _ = SECTIONS[section]
+    low = shard * SITEMAP_SHARD_SIZE
+    yield XML_HEADER
+    yield f'<urlset xmlns="{XMLNS}">\n'
+    for key, lastmod in rows_func(low, low + SITEMAP_SHARD_SIZE):
+        yield _url(base + reverse(url_name, args=[key]), lastmod)
+    yield '</urlset>\n'
+
+
+def _cache_stream(key: str, chunks: Iterator[str], scope: str,
+                  version: float) -> Iterator[str]:
+    """Отдает части ответа по мере генерации и кеширует ответ целиком,
+    когда генерация закончена. Если за время генерации версия области
+    изменилась, ответ мог пропустить изменение и не кешируется.
+    """
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    if get_version(scope) == version:
+        cache.set(key, ''.join(parts), SITEMAP_CACHE_SECONDS)
+
+
+def _parts(model: Type[Model]) -> List[int]:
+    """Номера частей карты сайта от первого до последнего объекта
+    модели на каждой базе: посты шардов лежат в своих диапазонах id.
+    """
+    aliases = post_shards() if model is Post else [DEFAULT_DB_ALIAS]
+    parts = set()
+    for alias in aliases:
+        bounds = model.objects.using(alias).aggregate(
+            low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is not None:
+            parts.update(range(shard_of(bounds['low']),
+                               shard_of(bounds['high']) + 1))
+    return sorted(parts)
+
+
+def sitemap_index(request: HttpRequest) -> HttpResponse:
+    """Возвращает индекс карты сайта со ссылками на все ее части."""
+    base = request.build_absolute_uri('/')[:-1]
+    lines = [XML_HEADER, f'<sitemapindex xmlns="{XMLNS}">\n']
+    for section, (_, _, model) in SECTIONS.items():
+        for shard in _parts(model):
+            loc = base + reverse('posts:sitemap_shard', args=[section, shard])
+            lines.append(f'<sitemap><loc>{escape(loc)}</loc></sitemap>\n')
+    lines.append('</sitemapindex>\n')
+    return HttpResponse(''.join(lines), content_type=CONTENT_TYPE)
+
+
+def sitemap_shard(request: HttpRequest, section: str,
+                  shard: int) -> HttpResponse:
+    """Возвращает часть карты сайта. Часть хранится в кеше, пока
+    не изменится версия ее области, но не дольше SITEMAP_CACHE_SECONDS:
+    записи под старыми версиями вытесняются сами.
+    """
+    if section not in SECTIONS:
+        raise Http404
+    base = request.build_absolute_uri('/')[:-1]
+    scope = sitemap_scope(section, shard)
+    version = get_version(scope)
+    digest = hashlib.md5(
+        f'{base}|{section}|{shard}|{version}'.encode()).hexdigest()
+    key = SITEMAP_KEY.format(digest=digest)
+    content = cache.get(key)
+    if content is not None:
+        return HttpResponse(content, content_type=CONTENT_TYPE)
+    return StreamingHttpResponse(
+        _cache_stream(key, _shard_entries(base, section, shard), scope,
+                      version),
+        content_type=CONTENT_TYPE
+    )
@@ -0,0 +1,153 @@
+from collections import Counter
+from datetime import date
+from typing import Callable, Dict, List, Tuple, Type
+
+from django.db import transaction
+from django.db.models import Count, Model, Sum
+from django.utils import timezone
+
+from core.db import add_counts
+from core.jobs import register
+from posts.models import (Comment, DailyActiveAuthor, DailyGroupPosts,
+                          DailyPostComments, Group, Post, RollupCursor,
+                          RollupSkip)
+from yatube.settings import POST_SHARDS, ROLLUP_BATCH_SIZE
+
+NO_GROUP = 0
+
+Row = Tuple[int, date, int, int]
+
+
+def _roll_posts(rows: List[Row]) -> None:
+    """Добавляет посты к числу постов за день в группе и к активным
+    авторам дня.
+    """
+    add_counts(DailyGroupPosts, ['day', 'group_id'], 'posts', Counter(
+        (day, group_id or NO_GROUP) for _, day, group_id, _ in rows))
+    _add_authors(rows)
+
+
+def _roll_comments(rows: List[Row]) -> None:
+    """Добавляет комментарии к числу комментариев поста за день
+    и к активным авторам дня.
+    """
+    add_counts(DailyPostComments, ['day', 'post_id'], 'comments', Counter(
+        (day, post_id) for _, day, post_id, _ in rows))
+    _add_authors(rows)
+
+
+def _add_authors(rows: List[Row]) -> None:
+    """Отмечает авторов строк активными в день создания строки."""
+    DailyActiveAuthor.objects.bulk_create(
+        [DailyActiveAuthor(day=day, author_id=author_id)
+         for day, author_id in {(row[1], row[3]) for row in rows}],
+        ignore_conflicts=True)
+
+
+ROLLUPS: List[Tuple[Type[Model], str, Callable[[List[Row]], None]]] = [
+    (Post, 'group_id', _roll_posts),
+    (Comment, 'post_id', _roll_comments),
+]
+
+
+def cursor_name(model: Type[Model], alias: str) -> str:
+    """Имя курсора статистики таблицы шарда."""
+    return f'{model._meta.model_name}:{alias}'
+
+
+def rolled_up_ids(model: Type[Model], alias: str) -> int:
+    """Id, до которого таблица шарда уже учтена в статистике."""
+    return RollupCursor.objects.filter(
+        name=cursor_name(model, alias)).values_list(
+        'last_id', flat=True).first() or 0
+
+
+def _roll_table(model: Type[Model], field: str,
+                handler: Callable[[List[Row]], None], alias: str,
+                batch_size: int) -> int:
+    """Учитывает новые строки таблицы шарда пачками по первичному
+    ключу. Курсор сдвигается условным UPDATE по прежнему положению
+    в одной транзакции с учетом пачки: если курсор уже сдвинул
+    одновременный запуск, пачка пропускается, и строки не учитываются
+    дважды. Строки из RollupSkip, учтенные до решардинга под старыми
+    id, тоже пропускаются.
+    """
+    name = cursor_name(model, alias)
+    cursor = RollupCursor.objects.filter(name=name)
+    RollupCursor.objects.get_or_create(name=name)
+    done = 0
+    while True:
+        last_id = cursor.values_list('last_id', flat=True).get()
+        rows = [
+            (pk, timezone.localdate(created), value, author_id)
+            for pk, created, value, author_id in model.objects.using(
+                alias).filter(pk__gt=last_id).order_by('pk').values_list(
+                'pk', 'created', field, 'author_id')[:batch_size]
+        ]
+        if not rows:
+            return done
+        with transaction.atomic():
+            if not cursor.filter(last_id=last_id).update(
+                    last_id=rows[-1][0]):
+                continue
+            skipped = RollupSkip.objects.filter(
+                name=name, row_id__lte=rows[-1][0])
+            skip = set(skipped.values_list('row_id', flat=True))
+            rows = [row for row in rows if row[0] not in skip]
+            if rows:
+                handler(rows)
+            skipped.delete()
+        done += len(rows)
+
+
+@register('posts.update_rollups')
+def update_rollups(batch_size: int = ROLLUP_BATCH_SIZE) -> int:
+    """Добавляет в таблицы статистики посты и комментарии, появившиеся
+    с прошлого запуска. Каждая таблица каждого шарда читается от своего
+    курсора, так что запуск обходит только новые строки. Статистика
+    считается по дате создания: удаление поста и перенос в другую
+    группу ее не меняют. Возвращает число учтенных строк.
+    """
+    return sum(
+        _roll_table(model, field, handler, alias, batch_size)
+        for alias in POST_SHARDS
+        for model, field, handler in ROLLUPS
+    )
+
+
+def daily_summary(since: date) -> List[Dict]:
+    """Число постов, комментариев и активных авторов по дням начиная
+    с since, новые дни сверху.
+    """
+    days: Dict[date, Dict] = {}
+    totals = [
+        ('posts', DailyGroupPosts, Sum('posts')),
+        ('comments', DailyPostComments, Sum('comments')),
+        ('authors', DailyActiveAuthor, Count('author_id')),
+    ]
+    for name, model, total in totals:
+        rows = model.objects.filter(day__gte=since).values('day').annotate(
+            total=total).order_by()
+        for row in rows:
+            days.setdefault(row['day'], {
+                'day': row['day'], 'posts': 0, 'comments': 0, 'authors': 0,
+            })[name] = row['total']
+    return sorted(days.values(), key=lambda row: row['day'], reverse=True)
+
+
+def group_totals(since: date) -> List[Dict]:
+    """Число постов в группах начиная с since, по убыванию."""
+    rows = list(DailyGroupPosts.objects.filter(day__gte=since).values(
+        'group_id').annotate(total=Sum('posts')).order_by('-total'))
+    titles = dict(Group.objects.filter(
+        pk__in=[row['group_id'] for row in rows]).values_list('id', 'title'))
+    for row in rows:
+        row['title'] = titles.get(row['group_id'], '')
+    return rows
+
+
+def top_posts(since: date, limit: int) -> List[Dict]:
+    """Посты с наибольшим числом комментариев начиная с since."""
+    return list(DailyPostComments.objects.filter(day__gte=since).values(
+        'post_id').annotate(total=Sum('comments')).order_by(
+        '-total')[:limit])
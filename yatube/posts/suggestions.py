@@ -0,0 +1,222 @@
+import heapq
+import json
+import math
+from array import array
+from collections import defaultdict
+from operator import itemgetter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core.jobs import register
+from posts.models import Follow, Suggestions
+from yatube.settings import (SUGGEST_BATCH_SIZE, SUGGESTIONS_CACHE_SECONDS,
+                             SUGGESTIONS_COUNT)
+
+ID_TYPECODE = 'L'
+SUGGESTIONS_KEY = 'suggestions:{user_id}'
+POPULAR_KEY = 'suggestions:popular'
+MAX_FOLLOWS = 100
+MAX_FANS = 200
+SIMILAR_USERS = 50
+GRAPH_CHUNK_SIZE = 10000
+IDS_CHUNK_SIZE = 500
+
+Adjacency = Dict[int, array]
+Similar = List[Tuple[int, float]]
+
+
+def _load_graph() -> Tuple[Adjacency, Adjacency]:
+    """Читает все подписки одним проходом и раскладывает их в массивы
+    смежности: авторы каждого пользователя и подписчики каждого автора,
+    в порядке подписки.
+    """
+    follows: Adjacency = defaultdict(lambda: array(ID_TYPECODE))
+    fans: Adjacency = defaultdict(lambda: array(ID_TYPECODE))
+    rows = Follow.objects.order_by('pk').values_list(
+        'user_id', 'author_id').iterator(chunk_size=GRAPH_CHUNK_SIZE)
+    for user_id, author_id in rows:
+        follows[user_id].append(author_id)
+        fans[author_id].append(user_id)
+    return follows, fans
+
+
+def _load_rows(adjacency: Adjacency, field: str, ids: Iterable[int],
+               other: str) -> None:
+    """Дописывает в массивы смежности подписки, у которых field
+    из ids, в порядке подписки. Id читаются пачками по IDS_CHUNK_SIZE,
+    и у каждого id все строки попадают в одну пачку.
+    """
+    ids = sorted(ids)
+    for start in range(0, len(ids), IDS_CHUNK_SIZE):
+        rows = Follow.objects.filter(**{
+            f'{field}__in': ids[start:start + IDS_CHUNK_SIZE],
+        }).order_by('pk').values_list(field, other)
+        for key, value in rows:
+            adjacency[key].append(value)
+
+
+def _load_neighbourhood(
+        user_ids: Sequence[int]) -> Tuple[Adjacency, Adjacency]:
+    """Читает только подписки пользователей и подписчиков их последних
+    MAX_FOLLOWS авторов - то, что нужно similar_users.
+    """
+    follows: Adjacency = defaultdict(lambda: array(ID_TYPECODE))
+    fans: Adjacency = defaultdict(lambda: array(ID_TYPECODE))
+    _load_rows(follows, 'user_id', user_ids, 'author_id')
+    _load_rows(fans, 'author_id', {
+        author_id for user_id in user_ids
+        for author_id in follows.get(user_id, ())[-MAX_FOLLOWS:]
+    }, 'user_id')
+    return follows, fans
+
+
+def _popular() -> List[int]:
+    """Авторы с наибольшим числом подписчиков: их получают пользователи,
+    у которых еще нет подписок.
+    """
+    return list(Follow.objects.values('author_id').annotate(
+        fans=Count('pk')).order_by('-fans', 'author_id').values_list(
+        'author_id', flat=True)[:SUGGESTIONS_COUNT * 2])
+
+
+def similar_users(user_id: int, follows: Adjacency,
+                  fans: Adjacency) -> Similar:
+    """Читатели, похожие на пользователя, с похожестью: сумма общих
+    авторов, где популярный автор весит меньше. Берутся только
+    последние MAX_FOLLOWS подписок и MAX_FANS подписчиков каждого
+    автора, так что время на пользователя ограничено и не зависит
+    от размера графа.
+    """
+    similar: Dict[int, float] = defaultdict(float)
+    for author_id in follows.get(user_id, ())[-MAX_FOLLOWS:]:
+        author_fans = fans[author_id]
+        weight = 1 / math.log(2 + len(author_fans))
+        for fan_id in author_fans[-MAX_FANS:]:
+            if fan_id != user_id:
+                similar[fan_id] += weight
+    return heapq.nlargest(SIMILAR_USERS, similar.items(), key=itemgetter(1))
+
+
+def score_user(user_id: int, similar: Similar, follows: Adjacency,
+               popular: Sequence[int]) -> List[int]:
+    """Считает лучших авторов для пользователя: оценка автора - сумма
+    похожестей читателей, подписанных на него. Недостающие места
+    заполняются популярными авторами.
+    """
+    scores: Dict[int, float] = defaultdict(float)
+    for fan_id, similarity in similar:
+        for author_id in follows[fan_id][-MAX_FOLLOWS:]:
+            scores[author_id] += similarity
+    exclude = set(follows.get(user_id, ()))
+    exclude.add(user_id)
+    best = [author_id for author_id, _ in heapq.nlargest(
+        SUGGESTIONS_COUNT,
+        ((author_id, score) for author_id, score in scores.items()
+         if author_id not in exclude),
+        key=itemgetter(1))]
+    exclude.update(best)
+    best.extend(author_id for author_id in popular
+                if author_id not in exclude)
+    return best[:SUGGESTIONS_COUNT]
+
+
+def mark_stale(user_ids: Iterable[int],
+               author_ids: Iterable[int] = ()) -> None:
+    """Отмечает, что рекомендации пользователей нужно пересчитать.
+    Подписка меняет и рекомендации подписчиков ее автора: похожесть
+    на подписавшегося у них изменилась. Отмечаются последние MAX_FANS
+    подписчиков автора, чтобы подписка на популярного автора не
+    отмечала всех; остальных обновит полный пересчет.
+    """
+    now = timezone.now()
+    Suggestions.objects.filter(user_id__in=list(user_ids)).update(
+        stale=True, marked=now)
+    for author_id in set(author_ids):
+        fans = Follow.objects.filter(author_id=author_id).order_by(
+            '-pk').values('user_id')[:MAX_FANS]
+        Suggestions.objects.filter(user_id__in=fans).update(
+            stale=True, marked=now)
+
+
+def _changed_users() -> List[int]:
+    """Пользователи с отметкой stale и пользователи с подписками,
+    у которых списка еще нет.
+    """
+    stale = Suggestions.objects.filter(stale=True).values_list(
+        'user_id', flat=True)
+    new = Follow.objects.exclude(
+        user_id__in=Suggestions.objects.values('user_id')).values_list(
+        'user_id', flat=True).distinct()
+    return sorted(set(stale) | set(new))
+
+
+@register('posts.build_suggestions')
+def build_suggestions(full: bool = False,
+                      batch_size: int = SUGGEST_BATCH_SIZE) -> int:
+    """Пересчитывает рекомендации пользователей, у которых изменились
+    подписки или еще нет списка, а с full - всех. Без full читаются
+    только окрестности этих пользователей в графе подписок, пачками
+    по batch_size. Флаг stale снимается в одной транзакции с записью
+    новых списков и только у тех, кого не отметили после начала
+    пересчета: сбой оставит флаги, а подписка во время пересчета снова
+    отметит список. Возвращает число обновленных пользователей.
+    """
+    started = timezone.now()
+    known = set(Suggestions.objects.values_list('user_id', flat=True))
+    if full:
+        follows, fans = _load_graph()
+        user_ids = sorted(known | follows.keys())
+    else:
+        user_ids = _changed_users()
+    popular = _popular()
+    cache.set(POPULAR_KEY, popular, None)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        if not full:
+            follows, fans = _load_neighbourhood(batch)
+        similar = {user_id: similar_users(user_id, follows, fans)
+                   for user_id in batch}
+        if not full:
+            _load_rows(follows, 'user_id', {
+                fan_id for fans_of_user in similar.values()
+                for fan_id, _ in fans_of_user
+            } - follows.keys(), 'author_id')
+        now = timezone.now()
+        rows = [
+            Suggestions(user_id=user_id, updated=now, authors=json.dumps(
+                score_user(user_id, similar[user_id], follows, popular)))
+            for user_id in batch
+        ]
+        with transaction.atomic():
+            Suggestions.objects.bulk_update(
+                [row for row in rows if row.user_id in known],
+                ['authors', 'updated'])
+            Suggestions.objects.bulk_create(
+                [row for row in rows if row.user_id not in known],
+                ignore_conflicts=True)
+            Suggestions.objects.filter(
+                user_id__in=batch, stale=True).exclude(
+                marked__gt=started).update(stale=False)
+        cache.delete_many(
+            [SUGGESTIONS_KEY.format(user_id=user_id) for user_id in batch])
+    return len(user_ids)
+
+
+def get_suggestions(user_id: int) -> List[int]:
+    """Id рекомендованных авторов из кеша или базы. Пользователю, для
+    которого список еще не посчитан, достаются популярные авторы.
+    """
+    key = SUGGESTIONS_KEY.format(user_id=user_id)
+    authors = cache.get(key)
+    if authors is None:
+        data = Suggestions.objects.filter(user_id=user_id).values_list(
+            'authors', flat=True).first()
+        if data is None:
+            return cache.get(POPULAR_KEY, [])
+        authors = json.loads(data)
+        cache.set(key, authors, SUGGESTIONS_CACHE_SECONDS)
+    return authors
@@ -0,0 +1,142 @@
+import gzip
+import io
+import json
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from yatube.settings import POSTS_PER_PAGE
+
+
+class ApiViewTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаем двух авторов, подписчика и группу."""
+        super().setUpClass()
+        cls.author_1 = User.objects.create_user(username='author_1')
+        cls.author_2 = User.objects.create_user(username='author_2')
+        cls.user = User.objects.create_user(username='user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author_2)
+
+    def setUp(self):
+        """Создаем клиентов, 15 постов первого автора в группе
+        и пост второго автора с комментарием.
+        """
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.number_create_posts = 15
+        for i in range(self.number_create_posts):
+            Post.objects.create(
+                text=f'test_text_{i}',
+                author=self.author_1,
+                group=self.group
+            )
+        self.post = Post.objects.create(
+            text='Пост второго автора',
+            author=self.author_2
+        )
+        self.comment = Comment.objects.create(
+            text='Комментарий',
+            post=self.post,
+            author=self.user
+        )
+
+    def test_feeds_keyset_pagination(self):
+        """Ленты отдаются страницами по ключу без пропусков и повторов."""
+        feeds = {
+            reverse('posts:api_index'): self.number_create_posts + 1,
+            reverse('posts:api_group_list',
+                    args=[self.group.slug]): self.number_create_posts,
+            reverse('posts:api_profile',
+                    args=[self.author_1.username]): self.number_create_posts,
+        }
+        for address, expected in feeds.items():
+            with self.subTest(address=address):
+                first = self.guest_client.get(address).json()
+                self.assertEqual(len(first['results']), POSTS_PER_PAGE)
+                second = self.guest_client.get(
+                    address, {'before': first['next']}).json()
+                self.assertIsNone(second['next'])
+                ids = [post['id'] for post in
+                       first['results'] + second['results']]
+                self.assertEqual(len(set(ids)), expected)
+                self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_invalid_before(self):
+        """Некорректный курсор страницы возвращает 400."""
+        for before in ('abc', '-1', '99999999999999999999'):
+            with self.subTest(before=before):
+                response = self.guest_client.get(
+                    reverse('posts:api_index'), {'before': before})
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.BAD_REQUEST)
+
+    def test_etag_depends_on_before(self):
+        """ETag первой страницы не подходит следующей."""
+        address = reverse('posts:api_index')
+        first = self.guest_client.get(address)
+        response = self.guest_client.get(
+            address, {'before': first.json()['next']},
+            HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_bench_keeps_site_cache(self):
+        """Замер api очищает только свой кеш."""
+        cache.set('site_key', 1)
+        call_command('bench_api', requests=1, stdout=io.StringIO())
+        self.assertEqual(cache.get('site_key'), 1)
+
+    def test_follow_feed(self):
+        """В ленте подписок только посты избранных авторов."""
+        response = self.authorized_client.get(
+            reverse('posts:api_follow_index'))
+        self.assertEqual(
+            [post['id'] for post in response.json()['results']],
+            [self.post.id]
+        )
+
+    def test_post_detail_and_comments(self):
+        """Пост отдается с числом комментариев, комментарии - списком."""
+        post = self.guest_client.get(
+            reverse('posts:api_post_detail', args=[self.post.id])).json()
+        self.assertEqual(post['text'], self.post.text)
+        self.assertEqual(post['author'], self.author_2.username)
+        self.assertEqual(post['comments_count'], 1)
+        comments = self.guest_client.get(
+            reverse('posts:api_comments', args=[self.post.id])).json()
+        self.assertEqual(comments['results'][0]['text'], self.comment.text)
+
+    def test_not_found(self):
+        """Несуществующие объекты возвращают 404."""
+        addresses = (
+            reverse('posts:api_group_list', args=['no_group']),
+            reverse('posts:api_profile', args=['no_user']),
+            reverse('posts:api_post_detail', args=[0]),
+            reverse('posts:api_comments', args=[0]),
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_etag_and_gzip(self):
+        """Ответ сжимается gzip и поддерживает условный GET."""
+        address = reverse('posts:api_index')
+        response = self.guest_client.get(address, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), POSTS_PER_PAGE)
+        response = self.guest_client.get(
+            address, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
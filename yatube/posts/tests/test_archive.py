@@ -0,0 +1,86 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import (ArchivedComment, ArchivedPost, Comment, Group, Post,
+                          User)
+
+
+class ArchiveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создаем автора и группу."""
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        """Создаем старый пост с комментарием и новый пост."""
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.old_post = Post.objects.create(
+            text='Старый пост', author=self.author, group=self.group)
+        Post.objects.filter(pk=self.old_post.pk).update(
+            created=timezone.now() - timedelta(days=400))
+        self.comment = Comment.objects.create(
+            text='Старый комментарий', post=self.old_post, author=self.author)
+        self.new_post = Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group)
+
+    def _archive(self) -> None:
+        call_command('archive_posts', days=365, chunk_size=1,
+                     stdout=StringIO())
+
+    def test_old_posts_moved_to_archive(self):
+        """Старые посты и их комментарии переносятся в архив с теми же
+        id, новые остаются на месте.
+        """
+        self._archive()
+        self.assertFalse(Post.objects.filter(pk=self.old_post.pk).exists())
+        self.assertFalse(Comment.objects.filter(pk=self.comment.pk).exists())
+        self.assertTrue(Post.objects.filter(pk=self.new_post.pk).exists())
+        archived = ArchivedPost.objects.get(pk=self.old_post.pk)
+        self.assertEqual(archived.text, self.old_post.text)
+        self.assertEqual(archived.group, self.group)
+        self.assertTrue(
+            ArchivedComment.objects.filter(pk=self.comment.pk).exists())
+
+    def test_archive_is_idempotent(self):
+        """Повторный запуск ничего не переносит и не падает."""
+        self._archive()
+        self._archive()
+        self.assertEqual(ArchivedPost.objects.count(), 1)
+
+    def test_post_detail_reads_archive(self):
+        """Страница архивного поста открывается по прежнему адресу,
+        но без формы комментария.
+        """
+        address = reverse('posts:post_detail', args=[self.old_post.pk])
+        self.client.get(address)
+        self._archive()
+        response = self.client.get(address)
+        self.assertContains(response, self.old_post.text)
+        self.assertContains(response, self.comment.text)
+        self.assertNotContains(
+            response, reverse('posts:add_comment', args=[self.old_post.pk]))
+        self.assertEqual(response.context['number_posts_author'], 2)
+
+    def test_profile_continues_with_archive(self):
+        """Лента автора после оперативных постов выводит архивные,
+        а общая лента - только оперативные.
+        """
+        self._archive()
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username]))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.new_post,
+                          ArchivedPost.objects.get(pk=self.old_post.pk)])
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(list(response.context['page_obj']), [self.new_post])
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.comment_queue import FAILED_DIR, enqueue_comment, flush_comments
+from posts.models import Comment, Post, User
+from posts.services import get_post_bundle
+
+
+class CommentQueueTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора, пост и временную папку очереди."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.queue_dir = tempfile.mkdtemp()
+        cls.patches = [
+            mock.patch('posts.comment_queue.COMMENT_QUEUE_DIR', cls.queue_dir),
+            mock.patch('posts.views.COMMENT_QUEUE_ENABLED', True),
+            mock.patch('posts.views.start_writer'),
+        ]
+        for patch in cls.patches:
+            patch.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        for patch in cls.patches:
+            patch.stop()
+        shutil.rmtree(cls.queue_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        """Создаем авторизованного клиента."""
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def _comment(self, text: str):
+        return self.client.post(
+            reverse('posts:add_comment', args=[self.post.id]),
+            data={'text': text})
+
+    def test_comments_written_by_batches(self):
+        """Комментарии попадают в базу при разборе очереди."""
+        get_post_bundle(self.post.id)
+        for i in range(3):
+            response = self._comment(f'Комментарий {i}')
+            self.assertRedirects(
+                response, reverse('posts:post_detail', args=[self.post.id]))
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(flush_comments(batch_size=2), 3)
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 3)
+        self.assertEqual(len(get_post_bundle(self.post.id)['comments']), 3)
+        self.assertEqual(flush_comments(), 0)
+
+    def test_invalid_comment_not_queued(self):
+        """Пустой комментарий не попадает в очередь."""
+        self._comment('')
+        self.assertEqual(flush_comments(), 0)
+
+    def test_comment_for_deleted_post_dropped(self):
+        """Комментарий к удаленному посту отбрасывается."""
+        self._comment('Комментарий')
+        Post.objects.filter(id=self.post.id).delete()
+        self.assertEqual(flush_comments(), 0)
+
+    def test_created_from_submission_time(self):
+        """Время комментария - время отправки, а не время записи."""
+        submitted = timezone.now() - timedelta(hours=1)
+        with mock.patch('posts.comment_queue.timezone.now',
+                        return_value=submitted):
+            enqueue_comment(self.post.id, self.author.id, 'Комментарий')
+        flush_comments()
+        self.assertEqual(Comment.objects.get().created, submitted)
+
+    def test_bad_files_moved_to_failed(self):
+        """Испорченный файл уходит в failed, комментарий удаленного
+        пользователя отбрасывается, а остальная пачка записывается.
+        """
+        with open(os.path.join(self.queue_dir, '0-broken.json'), 'w') as file:
+            file.write('{')
+        enqueue_comment(self.post.id, 0, 'Без автора')
+        enqueue_comment(self.post.id, self.author.id, 'Комментарий')
+        self.assertEqual(flush_comments(), 1)
+        self.assertEqual(Comment.objects.get().text, 'Комментарий')
+        self.assertEqual(
+            os.listdir(os.path.join(self.queue_dir, FAILED_DIR)),
+            ['0-broken.json'])
+        self.assertEqual(flush_comments(), 0)
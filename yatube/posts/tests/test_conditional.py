@@ -0,0 +1,120 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.cache import INDEX_SCOPE, bump_versions, get_version
+from posts.models import Comment, Group, Post, User
+from yatube.settings import VERSION_CACHE_SECONDS
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора и группу."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug'
+        )
+
+    def setUp(self):
+        """Создаем гостевой и авторизованный клиент и пост."""
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+        self.post = Post.objects.create(
+            text='Тестовый пост',
+            author=self.author,
+            group=self.group
+        )
+        self.urls = (
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.id]),
+        )
+
+    def test_not_modified_with_same_etag(self):
+        """Повторный запрос с тем же ETag получает 304."""
+        for client in (self.guest_client, self.authorized_client):
+            for address in self.urls:
+                with self.subTest(address=address):
+                    etag = client.get(address)['ETag']
+                    response = client.get(address, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code,
+                                     HTTPStatus.NOT_MODIFIED)
+
+    def test_not_modified_since_for_anonymous(self):
+        """Аноним получает 304 по Last-Modified."""
+        for address in self.urls:
+            with self.subTest(address=address):
+                last_modified = self.guest_client.get(
+                    address)['Last-Modified']
+                response = self.guest_client.get(
+                    address, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+
+    def test_etag_changes_after_new_post(self):
+        """Новый пост меняет ETag лент группы и автора."""
+        etags = {address: self.guest_client.get(address)['ETag']
+                 for address in self.urls[:2]}
+        Post.objects.create(
+            text='Новый пост',
+            author=self.author,
+            group=self.group
+        )
+        for address, etag in etags.items():
+            with self.subTest(address=address):
+                response = self.guest_client.get(
+                    address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_changes_after_new_comment(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        address = reverse('posts:post_detail', args=[self.post.id])
+        etag = self.guest_client.get(address)['ETag']
+        Comment.objects.create(
+            text='Комментарий',
+            post=self.post,
+            author=self.author
+        )
+        response = self.guest_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_depends_on_user(self):
+        """ETag анонима не подходит авторизованному пользователю."""
+        for address in self.urls:
+            with self.subTest(address=address):
+                etag = self.guest_client.get(address)['ETag']
+                response = self.authorized_client.get(
+                    address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_shell_key_ignores_unknown_params(self):
+        """Лишние параметры запроса не создают новых записей в кеше
+        страницы, а номер страницы создает.
+        """
+        address = reverse('posts:index')
+        self.guest_client.get(address)
+        keys = len(cache._list_cache_files())
+        for number in range(3):
+            self.guest_client.get(address, {'utm': number})
+        self.assertEqual(len(cache._list_cache_files()), keys)
+        self.guest_client.get(address, {'page': 2})
+        self.assertGreater(len(cache._list_cache_files()), keys)
+
+    def test_versions_expire(self):
+        """Версии областей хранятся в кеше ограниченное время."""
+        with mock.patch('posts.cache.cache', wraps=cache) as wrapped:
+            bump_versions(INDEX_SCOPE)
+            cache.delete('version:groups')
+            get_version('groups')
+        for call in wrapped.set_many.call_args_list:
+            self.assertEqual(call[0][1], VERSION_CACHE_SECONDS)
+        self.assertEqual(wrapped.set_many.call_count, 2)
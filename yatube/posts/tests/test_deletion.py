@@ -0,0 +1,140 @@
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.deletion import _deleter_run, schedule_deletion
+from posts.models import Comment, Follow, Group, PendingDeletion, Post, User
+
+
+class DeletionTests(TestCase):
+
+    def setUp(self):
+        """Создаем автора с постами, комментариями и подписками."""
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.posts = [
+            Post.objects.create(text=f'Пост {number}', author=self.author,
+                                group=self.group)
+            for number in range(3)
+        ]
+        self.other_post = Post.objects.create(
+            text='Пост читателя', author=self.reader, group=self.group)
+        Comment.objects.create(
+            text='Комментарий', post=self.posts[0], author=self.reader)
+        Comment.objects.create(
+            text='Ответ', post=self.other_post, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client = Client()
+
+    def _run(self) -> None:
+        call_command('run_deletions', batch_size=2, stdout=StringIO())
+
+    def test_scheduled_user_hidden(self):
+        """Пользователь в очереди удаления сразу скрыт и не может войти,
+        а его посты еще не удалены.
+        """
+        profile = reverse('posts:profile', args=[self.author.username])
+        self.client.get(profile)
+        schedule_deletion(self.author)
+        self.assertEqual(self.client.get(profile).status_code,
+                         HTTPStatus.NOT_FOUND)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        self.assertEqual(Post.objects.filter(author=self.author).count(), 3)
+
+    def test_user_deleted_in_batches(self):
+        """Пользователь удаляется вместе с постами, комментариями
+        и подписками, а лента группы обновляется.
+        """
+        group_page = reverse('posts:group_list', args=[self.group.slug])
+        self.client.get(group_page)
+        schedule_deletion(self.author)
+        self._run()
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Post.objects.filter(author_id=self.author.pk))
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(PendingDeletion.objects.exists())
+        response = self.client.get(group_page)
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.other_post])
+
+    def test_group_deleted_posts_kept(self):
+        """После удаления группы ее посты остаются без группы."""
+        schedule_deletion(self.group)
+        self.assertEqual(
+            self.client.get(reverse(
+                'posts:group_list', args=[self.group.slug])).status_code,
+            HTTPStatus.NOT_FOUND)
+        self._run()
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.filter(group=None).count(), 4)
+
+    def test_command_schedules_by_name(self):
+        """Команда ставит в очередь пользователей и группы по имени
+        и slug и сразу их удаляет; неизвестное имя - ошибка, и в очередь
+        ничего не попадает.
+        """
+        with self.assertRaises(CommandError):
+            call_command('run_deletions', user=[self.author.username],
+                         group=['missing'], stdout=StringIO())
+        self.assertFalse(PendingDeletion.objects.exists())
+        call_command('run_deletions', user=[self.author.username],
+                     group=[self.group.slug], stdout=StringIO())
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Group.objects.exists())
+        self.assertFalse(PendingDeletion.objects.exists())
+        self.assertEqual(list(Post.objects.all()), [self.other_post])
+
+    @mock.patch('posts.admin.schedule_deletions')
+    def test_admin_schedules_deletion(self, schedule_deletions):
+        """Удаление группы из админки ставит ее в очередь удаления."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(admin)
+        self.client.post(
+            reverse('admin:posts_group_delete', args=[self.group.pk]),
+            {'post': 'yes'})
+        schedule_deletions.assert_called_once_with([self.group])
+        self.assertTrue(Group.objects.filter(pk=self.group.pk).exists())
+
+    @mock.patch('posts.admin.schedule_deletions')
+    def test_admin_requires_cascade_permissions(self, schedule_deletions):
+        """Без права на удаление постов пользователя из админки
+        не удалить.
+        """
+        admin = User.objects.create_user(
+            username='admin', password='pass', is_staff=True)
+        admin.user_permissions.add(
+            Permission.objects.get(codename='delete_user'),
+            Permission.objects.get(codename='change_user'))
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse('admin:auth_user_delete', args=[self.author.pk]),
+            {'post': 'yes'})
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        schedule_deletions.assert_not_called()
+        admin.user_permissions.add(
+            Permission.objects.get(codename='delete_post'))
+        self.client.post(
+            reverse('admin:auth_user_delete', args=[self.author.pk]),
+            {'post': 'yes'})
+        schedule_deletions.assert_called_once_with([self.author])
+
+    @mock.patch('posts.deletion.run_deletions', side_effect=RuntimeError)
+    def test_deleter_logs_errors(self, run_deletions):
+        """Ошибка удаления в фоне записывается в лог, а объект остается
+        в очереди.
+        """
+        schedule_deletion(self.author)
+        with self.assertLogs('posts.deletion', 'ERROR'):
+            _deleter_run()
+        self.assertTrue(PendingDeletion.objects.exists())
@@ -0,0 +1,83 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class FeedTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора и группу."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание'
+        )
+
+    def setUp(self):
+        """Создаем клиента и пост."""
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            text='Тестовый пост',
+            author=self.author,
+            group=self.group
+        )
+
+    def test_feeds_contain_post(self):
+        """Ленты RSS и Atom содержат ссылку на пост."""
+        addresses = (
+            reverse('posts:feed_rss'),
+            reverse('posts:feed_atom'),
+            reverse('posts:group_feed_rss', args=[self.group.slug]),
+            reverse('posts:group_feed_atom', args=[self.group.slug]),
+            reverse('posts:profile_feed_rss', args=[self.author.username]),
+            reverse('posts:profile_feed_atom', args=[self.author.username]),
+        )
+        link = reverse('posts:post_detail', args=[self.post.id])
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn('xml', response['Content-Type'])
+                self.assertContains(response, link)
+
+    def test_unknown_group_feed(self):
+        """Лента несуществующей группы возвращает 404."""
+        response = self.guest_client.get(
+            reverse('posts:group_feed_rss', args=['unknown']))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_feed_not_modified(self):
+        """Повторный запрос с ETag получает 304 без запросов к базе."""
+        address = reverse('posts:group_feed_rss', args=[self.group.slug])
+        response = self.guest_client.get(address)
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                address, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_cached_feed_keeps_content_type(self):
+        """Лента из кеша отдается с тем же типом содержимого."""
+        address = reverse('posts:feed_atom')
+        first = self.guest_client.get(address)
+        Post.objects.filter(id=self.post.id).update(text='Новый текст')
+        second = self.guest_client.get(address)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+
+    def test_feed_updated_after_new_post(self):
+        """Новый пост автора сразу попадает в его ленту."""
+        address = reverse(
+            'posts:profile_feed_rss', args=[self.author.username])
+        self.guest_client.get(address)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        response = self.guest_client.get(address)
+        self.assertContains(
+            response, reverse('posts:post_detail', args=[new_post.id]))
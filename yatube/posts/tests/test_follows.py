@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.cache import follow_scope, get_version
+from posts.follows import FOLLOWED_KEY, follow, followed_authors
+from posts.models import Follow, Post, User
+
+
+class FollowedSetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создаем автора с постом и читателя."""
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def _follow_queries(self, address: str) -> list:
+        """Запросы к подпискам при открытии страницы."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(address)
+        return [query['sql'] for query in queries
+                if 'posts_follow' in query['sql']]
+
+    def test_set_updated_on_follow_and_unfollow(self):
+        """Набор подписок в кеше обновляется при подписке и отписке."""
+        self.assertEqual(followed_authors(self.reader.id), frozenset())
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(followed_authors(self.reader.id),
+                         frozenset({self.author.id}))
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(followed_authors(self.reader.id), frozenset())
+
+    def test_late_write_not_read(self):
+        """Набор, который другой процесс прочитал до подписки и записал
+        в кеш после нее, не читается.
+        """
+        version = get_version(follow_scope(self.reader.id))
+        Follow.objects.create(user=self.reader, author=self.author)
+        cache.set(FOLLOWED_KEY.format(user_id=self.reader.id,
+                                      version=version), b'')
+        self.assertEqual(followed_authors(self.reader.id),
+                         frozenset({self.author.id}))
+
+    def test_pages_read_cached_set(self):
+        """Кнопка подписки и лента подписок не обращаются к таблице
+        подписок, когда набор уже в кеше.
+        """
+        self.client.get(reverse('posts:profile_follow',
+                                args=[self.author.username]))
+        followed_authors(self.reader.id)
+        for address in (reverse('posts:profile', args=[self.author.username]),
+                        reverse('posts:follow_index')):
+            with self.subTest(address=address):
+                self.assertEqual(self._follow_queries(address), [])
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+
+class FollowWriteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создаем авторов и читателей."""
+        cls.users = [User.objects.create_user(username=f'user_{number}')
+                     for number in range(4)]
+
+    def setUp(self):
+        cache.clear()
+        self.reader, self.author = self.users[:2]
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_follow_idempotent(self):
+        """Повторная подписка и подписка на себя не падают и не создают
+        лишних подписок.
+        """
+        for username in (self.author.username, self.author.username,
+                         self.reader.username):
+            with self.subTest(username=username):
+                response = self.client.get(
+                    reverse('posts:profile_follow', args=[username]))
+                self.assertRedirects(response, reverse('posts:follow_index'))
+        self.assertEqual(
+            list(Follow.objects.values_list('user_id', 'author_id')),
+            [(self.reader.id, self.author.id)])
+        self.assertEqual(followed_authors(self.reader.id),
+                         frozenset({self.author.id}))
+
+    def test_unfollow_idempotent(self):
+        """Повторная отписка ничего не ломает."""
+        follow(self.reader.id, self.author.id)
+        for _ in range(2):
+            response = self.client.get(reverse(
+                'posts:profile_unfollow', args=[self.author.username]))
+            self.assertRedirects(response, reverse('posts:follow_index'))
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(followed_authors(self.reader.id), frozenset())
+
+    def test_import_and_sync(self):
+        """Команда загружает подписки пачками, а с --sync удаляет
+        подписки, которых нет в файле.
+        """
+        ids = [user.id for user in self.users]
+        path = os.path.join(tempfile.mkdtemp(), 'follows.csv')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        missing = max(ids) + 1
+        rows = [(ids[0], ids[1]), (ids[0], ids[2]), (ids[0], ids[0]),
+                (ids[1], missing), (ids[1], ids[0])]
+        with open(path, 'w') as file:
+            file.write('user,author\n')
+            file.writelines(f'{user},{author}\n' for user, author in rows)
+        out = StringIO()
+        call_command('import_follows', path, batch_size=2, stdout=out)
+        self.assertIn('пропущено: 2', out.getvalue())
+        call_command('import_follows', path, stdout=StringIO())
+        self.assertEqual(Follow.objects.count(), 3)
+        with open(path, 'w') as file:
+            file.write(f'{ids[0]},{ids[3]}\n{ids[0]},{missing}\n')
+        out = StringIO()
+        call_command('import_follows', path, sync=True, stdout=out)
+        self.assertIn('пропущено: 1', out.getvalue())
+        self.assertEqual(
+            set(Follow.objects.values_list('user_id', 'author_id')),
+            {(ids[0], ids[3]), (ids[1], ids[0])})
+        self.assertEqual(followed_authors(ids[0]), frozenset({ids[3]}))
@@ -0,0 +1,72 @@
+import warnings
+
+from django.core.cache import cache
+from django.http import Http404
+from django.test import TestCase
+
+from posts.lookups import _key, get_cached_or_404
+from posts.models import Group, User
+
+
+class CachedLookupTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаем пользователя и группу."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_object_cached_by_all_fields(self):
+        """После первого чтения объект берется из кеша по любому полю."""
+        get_cached_or_404(User, username='author')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_cached_or_404(User, username='author'), self.user)
+            self.assertEqual(get_cached_or_404(User, pk=self.user.pk),
+                             self.user)
+
+    def test_private_fields_not_cached(self):
+        """В кеш попадают только имя и id пользователя, без пароля
+        и почты.
+        """
+        get_cached_or_404(User, username='author')
+        cached = cache.get(_key(User, 'username', 'author'))
+        self.assertEqual(cached.get_full_name(), self.user.get_full_name())
+        for field in ('password', 'email', 'last_login'):
+            with self.subTest(field=field):
+                self.assertNotIn(field, cached.__dict__)
+
+    def test_unsafe_value_hashed(self):
+        """Значение с пробелами и управляющими символами дает
+        допустимый ключ кеша.
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            with self.assertRaises(Http404):
+                get_cached_or_404(User, username='a b\n' * 100)
+
+    def test_missing_object_cached(self):
+        """Отсутствие объекта кешируется, пока он не создан."""
+        with self.assertRaises(Http404):
+            get_cached_or_404(Group, slug='new_slug')
+        with self.assertNumQueries(0), self.assertRaises(Http404):
+            get_cached_or_404(Group, slug='new_slug')
+        group = Group.objects.create(title='Новая группа', slug='new_slug')
+        self.assertEqual(get_cached_or_404(Group, slug='new_slug'), group)
+
+    def test_renamed_object_forgotten(self):
+        """После смены slug старый адрес больше не находит группу."""
+        get_cached_or_404(Group, slug='test_slug')
+        self.group.slug = 'renamed'
+        self.group.save()
+        with self.assertRaises(Http404):
+            get_cached_or_404(Group, slug='test_slug')
+        self.assertEqual(
+            get_cached_or_404(Group, slug='renamed').slug, 'renamed')
@@ -0,0 +1,119 @@
+import json
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.jobs import claim, work
+from core.models import Job
+from posts.models import (Digest, Follow, NotificationItem,
+                          PendingNotification, Post, User)
+from posts.notifications import (build_digests, notify_followers,
+                                 schedule_digests, send_pending)
+from yatube.settings import DIGEST_SECONDS, POSTS_PER_PAGE
+
+
+class NotificationTests(TestCase):
+
+    def setUp(self):
+        """Создаем автора и трех подписчиков."""
+        self.author = User.objects.create_user(username='author')
+        self.followers = [User.objects.create_user(username=f'reader_{n}')
+                          for n in range(3)]
+        Follow.objects.bulk_create(
+            Follow(user=follower, author=self.author)
+            for follower in self.followers)
+        self.client = Client()
+        self.client.force_login(self.followers[0])
+
+    @mock.patch('posts.notifications.NOTIFY_CHUNK_SIZE', 2)
+    @mock.patch('core.jobs.JOB_QUEUE_ENABLED', True)
+    def test_posts_coalesced_into_digests(self):
+        """Новый пост ставит одну задачу, которая раздает уведомления
+        пачками, а уведомления получателя собираются в один дайджест.
+        """
+        posts = [Post.objects.create(text=f'Пост {n}', author=self.author)
+                 for n in range(2)]
+        self.assertEqual(
+            Job.objects.filter(name='posts.notify_followers').count(), 2)
+        work('worker', threading.Event(), burst=True)
+        self.assertEqual(NotificationItem.objects.count(), 6)
+        digest_job = Job.objects.get()
+        self.assertEqual(digest_job.name, 'posts.build_digests')
+        build_digests()
+        self.assertFalse(NotificationItem.objects.exists())
+        digest = Digest.objects.get(recipient=self.followers[0])
+        self.assertEqual(
+            [post['id'] for post in json.loads(digest.posts)],
+            [post.id for post in posts])
+        self.assertEqual(Digest.objects.count(), 3)
+
+    @mock.patch('posts.notifications.NOTIFY_CHUNK_SIZE', 2)
+    def test_notify_repeated_once(self):
+        """Повторная раздача уведомлений о посте, например после сбоя
+        задачи, не дублирует их.
+        """
+        post = Post.objects.create(text='Пост', author=self.author)
+        NotificationItem.objects.all().delete()
+        NotificationItem.objects.create(recipient=self.followers[0],
+                                        author=self.author, post_id=post.id)
+        for _ in range(2):
+            notify_followers(post.id, self.author.id)
+        self.assertEqual(
+            sorted(NotificationItem.objects.values_list(
+                'recipient_id', flat=True)),
+            [follower.id for follower in self.followers])
+
+    @mock.patch('core.jobs.JOB_QUEUE_ENABLED', True)
+    def test_digest_job_unique_while_queued(self):
+        """Сборка дайджестов ставится в очередь один раз, а после
+        захвата задачи можно поставить следующую.
+        """
+        schedule_digests()
+        schedule_digests()
+        self.assertEqual(Job.objects.count(), 1)
+        Job.objects.update(run_at=timezone.now())
+        claim('worker')
+        schedule_digests()
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_pending_without_queue(self):
+        """Без фоновой очереди пост оставляет одну отметку, а дайджесты
+        собираются только через DIGEST_SECONDS.
+        """
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(NotificationItem.objects.exists())
+        self.assertEqual(PendingNotification.objects.get().post_id, post.id)
+        self.assertEqual(send_pending(), 1)
+        self.assertFalse(PendingNotification.objects.exists())
+        self.assertEqual(NotificationItem.objects.count(), 3)
+        self.assertFalse(Digest.objects.exists())
+        NotificationItem.objects.update(
+            created=timezone.now() - timedelta(seconds=DIGEST_SECONDS))
+        send_pending()
+        self.assertFalse(NotificationItem.objects.exists())
+        self.assertEqual(Digest.objects.count(), 3)
+
+    def test_inbox_keyset_pages(self):
+        """Входящие выводятся страницами по ключу, новые сверху."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        Digest.objects.all().delete()
+        posts = json.dumps([{'id': post.id, 'author': 'author',
+                             'text': post.text}])
+        Digest.objects.bulk_create(
+            Digest(recipient=self.followers[0], posts=posts)
+            for _ in range(POSTS_PER_PAGE + 1))
+        response = self.client.get(reverse('posts:notifications'))
+        self.assertEqual(len(response.context['digests']), POSTS_PER_PAGE)
+        self.assertContains(
+            response, reverse('posts:post_detail', args=[post.id]))
+        cursor = response.context['next_cursor']
+        response = self.client.get(
+            reverse('posts:notifications'), {'before': cursor})
+        self.assertEqual(len(response.context['digests']), 1)
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertEqual(response.context['digests'][0]['id'],
+                         Digest.objects.order_by('pk').first().pk)
@@ -0,0 +1,171 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from posts.cache import COUNT_KEY, INDEX_SCOPE, profile_scope
+from posts.models import Comment, Post, User
+from posts.services import (SNAPSHOT_KEY, ApproximatePaginator, SnapshotFeed,
+                            get_comment_page, get_paginator,
+                            get_post_bundle)
+
+
+class ApproximatePaginatorTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        """Очищаем кеш и создаем посты."""
+        cache.clear()
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+
+    def test_page_links_elided(self):
+        """Выводятся только соседние страницы, первая и последняя."""
+        paginator = ApproximatePaginator(list(range(1000)), 10)
+        cases = {
+            1: [1, 2, 3, None, 100],
+            4: [1, 2, 3, 4, 5, 6, None, 100],
+            50: [1, None, 48, 49, 50, 51, 52, None, 100],
+            100: [1, None, 98, 99, 100],
+        }
+        for number, links in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(paginator.page(number).page_links, links)
+
+    def test_small_feed_counted_exactly(self):
+        """Небольшая лента считается точно, даже если счетчик неверен."""
+        cache.set(COUNT_KEY.format(scope=INDEX_SCOPE), 100)
+        paginator = ApproximatePaginator(Post.objects.all(), 10, INDEX_SCOPE)
+        self.assertEqual(paginator.count, 3)
+
+    @mock.patch('posts.services.EXACT_COUNT_LIMIT', 2)
+    def test_large_feed_uses_counter(self):
+        """Большая лента берет число постов из счетчика без COUNT."""
+        request = RequestFactory().get('/')
+        scope = profile_scope(self.author.username)
+        get_paginator(request, self.author.posts.all(), scope)
+        Post.objects.create(text='Новый пост', author=self.author)
+        with self.assertNumQueries(0):
+            count = ApproximatePaginator(
+                self.author.posts.all(), 10, scope).count
+        self.assertEqual(count, 4)
+        Post.objects.get(text='Новый пост').delete()
+        self.assertEqual(
+            cache.get(COUNT_KEY.format(scope=scope)), 3)
+
+
+class SnapshotFeedTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        """Очищаем кеш и создаем посты."""
+        cache.clear()
+        self.request = RequestFactory().get('/')
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+
+    def _feed(self) -> SnapshotFeed:
+        return SnapshotFeed(
+            self.request, INDEX_SCOPE,
+            Post.objects.select_related('author', 'group'))
+
+    def test_page_loaded_by_ids(self):
+        """Страница из снимка совпадает с лентой из базы и загружается
+        запросом постов и запросом авторов; авторы, уже загруженные
+        за время запроса, повторно не читаются.
+        """
+        expected = list(Post.objects.all()[:2])
+        self._feed().ids
+        with self.assertNumQueries(2):
+            self.assertEqual(self._feed()[0:2], expected)
+        with self.assertNumQueries(1):
+            self.assertEqual(self._feed()[0:2], expected)
+
+    def test_new_post_added_to_snapshot(self):
+        """Новый пост сбрасывает снимок и попадает в его начало."""
+        self._feed().ids
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertIsNone(cache.get(SNAPSHOT_KEY.format(scope=INDEX_SCOPE)))
+        self.assertEqual(self._feed().ids[0], post.id)
+
+    def test_deleted_post_drops_snapshot(self):
+        """Удаление поста сбрасывает снимок."""
+        feed = self._feed()
+        post_id = feed.ids[0]
+        Post.objects.filter(id=post_id).get().delete()
+        self.assertNotIn(post_id, self._feed().ids)
+
+    def test_identity_map(self):
+        """Автор всех постов страницы - один объект."""
+        page = self._feed()[0:3]
+        self.assertIs(page[0].author, page[2].author)
+
+
+class PostBundleTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора и пост."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bundle_cached(self):
+        """Повторное чтение набора страницы поста не обращается к базе."""
+        get_post_bundle(self.post.id)
+        with self.assertNumQueries(0):
+            bundle = get_post_bundle(self.post.id)
+        self.assertEqual(bundle['post'], self.post)
+        self.assertEqual(bundle['count'], 1)
+
+    def test_bundle_updated_after_writes(self):
+        """Новый комментарий и новый пост автора обновляют набор."""
+        get_post_bundle(self.post.id)
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий')
+        Post.objects.create(text='Новый пост', author=self.author)
+        bundle = get_post_bundle(self.post.id)
+        self.assertEqual(bundle['comments'], [comment])
+        self.assertEqual(bundle['count'], 2)
+
+    def test_missing_post(self):
+        """Для несуществующего поста возвращается None, и отсутствие
+        кешируется, пока пост не создан.
+        """
+        self.assertIsNone(get_post_bundle(0))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_post_bundle(0))
+        post_id = self.post.id + 1
+        get_post_bundle(post_id)
+        Post.objects.create(id=post_id, text='Новый пост', author=self.author)
+        self.assertIsNotNone(get_post_bundle(post_id))
+
+    @mock.patch('posts.services.COMMENTS_PER_PAGE', 2)
+    def test_comments_paginated(self):
+        """В наборе только первая страница комментариев, следующие
+        читаются из базы.
+        """
+        comments = [
+            Comment.objects.create(
+                post=self.post, author=self.author, text=f'Комментарий {i}')
+            for i in range(3)
+        ]
+        bundle = get_post_bundle(self.post.id)
+        self.assertEqual(bundle['comments'], comments[:0:-1])
+        request = RequestFactory().get('/', {'page': 2})
+        page = get_comment_page(request, bundle)
+        self.assertEqual(page.paginator.num_pages, 2)
+        self.assertEqual(list(page), [comments[0]])
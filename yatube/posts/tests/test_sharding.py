@@ -0,0 +1,256 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import Sum
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.comment_queue import enqueue_comment, flush_comments
+from posts.follows import follow
+from posts.models import (Comment, DailyGroupPosts, DailyPostComments,
+                          Group, Post, PostViews, User)
+from posts.sharding import shard_for_id
+from posts.sitemaps import shard_of
+from posts.stats import update_rollups
+
+SHARD = 'test_shard_1'
+SHARDS = ['default', SHARD]
+
+
+class ShardingTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Подключаем второй шард - отдельный файл SQLite."""
+        super().setUpClass()
+        cls.tmp_dir = tempfile.mkdtemp()
+        connections.databases[SHARD] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.tmp_dir, 'shard.sqlite3'),
+            'TEST': {'NAME': os.path.join(cls.tmp_dir, 'shard.sqlite3')},
+        }
+        cls.patches = [
+            mock.patch('posts.sharding.POST_SHARDS', SHARDS),
+            mock.patch('posts.management.commands.reshard_posts.POST_SHARDS',
+                       SHARDS),
+            mock.patch('posts.stats.POST_SHARDS', SHARDS),
+        ]
+        for patch in cls.patches:
+            patch.start()
+        call_command('migrate', database=SHARD, run_syncdb=True, verbosity=0)
+        connections[SHARD].close()
+
+    @classmethod
+    def tearDownClass(cls):
+        for patch in cls.patches:
+            patch.stop()
+        connections[SHARD].close()
+        del connections.databases[SHARD]
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        """Создаем авторов на разных шардах и группу."""
+        cache.clear()
+        Post.objects.using(SHARD).all()._raw_delete(SHARD)
+        Comment.objects.using(SHARD).all()._raw_delete(SHARD)
+        self.group = Group.objects.create(title='Группа', slug='group')
+        users = [User.objects.create_user(username=f'user_{i}')
+                 for i in range(2)]
+        self.even, self.odd = sorted(users, key=lambda user: user.id % 2)
+        self.client = Client()
+        self.client.force_login(self.odd)
+
+    def test_posts_written_to_author_shard(self):
+        """Пост и комментарии к нему пишутся на шард автора, а id
+        поста на шарде лежит в диапазоне шарда.
+        """
+        post = Post.objects.create(
+            text='Пост', author=self.odd, group=self.group)
+        self.assertFalse(Post.objects.using('default').filter(
+            pk=post.pk).exists())
+        self.assertEqual(
+            Post.objects.using(SHARD).get(pk=post.pk).author_id, self.odd.id)
+        self.client.post(reverse('posts:add_comment', args=[post.id]),
+                         data={'text': 'Комментарий'})
+        self.assertTrue(
+            Comment.objects.using(SHARD).filter(post_id=post.pk).exists())
+
+    def test_feeds_merge_shards(self):
+        """Общая лента и лента группы собираются со всех шардов,
+        лента автора - с его шарда.
+        """
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=author,
+                                group=self.group)
+            for i, author in enumerate(
+                [self.even, self.odd, self.even, self.odd])
+        ]
+        expected = list(reversed(posts))
+        for address in (reverse('posts:index'),
+                        reverse('posts:group_list', args=['group'])):
+            with self.subTest(address=address):
+                page = self.client.get(address).context['page_obj']
+                self.assertEqual(list(page), expected)
+                self.assertEqual(page.paginator.count, 4)
+                self.assertEqual(page[0].author, self.odd)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.odd.username]))
+        self.assertEqual(
+            list(response.context['page_obj']), [posts[3], posts[1]])
+
+    def test_post_detail_from_shard(self):
+        """Страница поста находит пост на шарде."""
+        post = Post.objects.create(text='Пост на шарде', author=self.odd)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.id]))
+        self.assertEqual(response.context['post'], post)
+        self.assertEqual(response.context['post'].author, self.odd)
+
+    def test_reshard_moves_posts(self):
+        """Решардинг переносит посты с комментариями на шард автора
+        с новыми id из диапазона шарда и датой публикации; ссылки
+        на пост переводятся на новый id, а старый адрес ведет на новый.
+        """
+        post = Post(text='Старый пост', author=self.odd)
+        post.save(using='default')
+        Comment(post=post, author=self.even, text='Комментарий').save(
+            using='default')
+        PostViews.objects.create(post_id=post.pk, views=3)
+        call_command('reshard_posts', chunk_size=1, stdout=StringIO())
+        self.assertFalse(Post.objects.using('default').filter(
+            pk=post.pk).exists())
+        moved = Post.objects.using(SHARD).get()
+        self.assertEqual(shard_for_id(moved.pk), SHARD)
+        self.assertEqual(moved.created, post.created)
+        self.assertEqual(
+            Comment.objects.using(SHARD).filter(post_id=moved.pk).count(), 1)
+        self.assertEqual(PostViews.objects.get().post_id, moved.pk)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=[moved.pk]),
+            status_code=301)
+        new_post = Post.objects.create(text='Новый пост', author=self.odd)
+        self.assertEqual(new_post.pk, moved.pk + 1)
+
+    def test_reshard_keeps_rollups(self):
+        """Перенесенные посты и комментарии, уже учтенные
+        в статистике, не учитываются второй раз под новыми id.
+        """
+        for i in range(2):
+            post = Post(text=f'Старый пост {i}', author=self.odd,
+                        group=self.group)
+            post.save(using='default')
+            Comment(post=post, author=self.even, text='Комментарий').save(
+                using='default')
+        update_rollups()
+
+        def totals():
+            return (
+                DailyGroupPosts.objects.aggregate(total=Sum('posts'))['total'],
+                DailyPostComments.objects.aggregate(
+                    total=Sum('comments'))['total'],
+            )
+
+        self.assertEqual(totals(), (2, 2))
+        call_command('reshard_posts', chunk_size=1, stdout=StringIO())
+        update_rollups()
+        self.assertEqual(totals(), (2, 2))
+        Post.objects.create(text='Новый пост', author=self.odd)
+        update_rollups()
+        self.assertEqual(totals(), (3, 2))
+
+    def _two_posts(self):
+        """Пост в основной базе и пост на шарде, второй новее."""
+        return [Post.objects.create(text=f'Пост {i}', author=author,
+                                    group=self.group)
+                for i, author in enumerate([self.even, self.odd])]
+
+    def test_api_reads_shards(self):
+        """Api собирает ленты со всех шардов и находит пост и его
+        комментарии на шарде.
+        """
+        posts = self._two_posts()
+        Comment.objects.create(post=posts[1], author=self.even,
+                               text='Комментарий')
+        for address in (reverse('posts:api_index'),
+                        reverse('posts:api_group_list', args=['group'])):
+            with self.subTest(address=address):
+                results = self.client.get(address).json()['results']
+                self.assertEqual([row['id'] for row in results],
+                                 [posts[1].id, posts[0].id])
+                self.assertEqual(results[0]['author'], self.odd.username)
+                self.assertEqual(results[0]['group'], 'group')
+        data = self.client.get(
+            reverse('posts:api_post_detail', args=[posts[1].id])).json()
+        self.assertEqual(data['author'], self.odd.username)
+        self.assertEqual(data['comments_count'], 1)
+        results = self.client.get(reverse(
+            'posts:api_comments', args=[posts[1].id])).json()['results']
+        self.assertEqual(results[0]['author'], self.even.username)
+
+    def test_feeds_and_sitemap_read_shards(self):
+        """RSS и карта сайта выводят посты со всех шардов."""
+        posts = self._two_posts()
+        content = self.client.get(reverse('posts:feed_rss')).content.decode()
+        for post in posts:
+            self.assertIn(reverse('posts:post_detail', args=[post.id]),
+                          content)
+        content = self.client.get(reverse(
+            'posts:profile_feed_rss', args=[self.odd.username])).content
+        self.assertIn(reverse('posts:post_detail', args=[posts[1].id]),
+                      content.decode())
+        part = reverse('posts:sitemap_shard',
+                       args=['posts', shard_of(posts[1].id)])
+        self.assertIn(part, self.client.get(
+            reverse('posts:sitemap')).content.decode())
+        content = b''.join(self.client.get(part).streaming_content).decode()
+        self.assertIn(reverse('posts:post_detail', args=[posts[1].id]),
+                      content)
+        part = reverse('posts:sitemap_shard', args=['profiles', 0])
+        content = b''.join(self.client.get(part).streaming_content).decode()
+        self.assertIn(reverse('posts:profile', args=[self.odd.username]),
+                      content)
+
+    def test_updates_cursor_per_shard(self):
+        """Лента новых постов ведет курсор по каждому шарду."""
+        posts = self._two_posts()
+        data = self.client.get(reverse('posts:new_posts')).json()
+        self.assertEqual([post['id'] for post in data['posts']],
+                         [post.id for post in posts])
+        self.assertEqual(data['cursor'], f'{posts[0].id}.{posts[1].id}')
+        new_post = Post.objects.create(text='Новый', author=self.even)
+        data = self.client.get(reverse('posts:new_posts'),
+                               {'cursor': data['cursor']}).json()
+        self.assertEqual([post['id'] for post in data['posts']],
+                         [new_post.id])
+
+    def test_follow_feed_reads_shards(self):
+        """Лента подписок собирается со всех шардов."""
+        reader = User.objects.create_user(username='reader')
+        for author in (self.even, self.odd):
+            follow(reader.id, author.id)
+        posts = self._two_posts()
+        self.client.force_login(reader)
+        page = self.client.get(reverse('posts:follow_index')).context[
+            'page_obj']
+        self.assertEqual(list(page), list(reversed(posts)))
+
+    def test_comment_queue_writes_to_post_shard(self):
+        """Комментарий из очереди записывается на шард поста."""
+        post = Post.objects.create(text='Пост', author=self.odd)
+        queue_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, queue_dir, ignore_errors=True)
+        with mock.patch('posts.comment_queue.COMMENT_QUEUE_DIR', queue_dir):
+            enqueue_comment(post.id, self.even.id, 'Из очереди')
+            self.assertEqual(flush_comments(), 1)
+        self.assertEqual(
+            Comment.objects.using(SHARD).get(post_id=post.id).text,
+            'Из очереди')
@@ -0,0 +1,103 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class SitemapTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора и группу."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug'
+        )
+
+    def setUp(self):
+        """Создаем клиента и пост."""
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            text='Тестовый пост',
+            author=self.author,
+            group=self.group
+        )
+
+    def _get_shard(self, section: str, shard: int = 0) -> str:
+        """Возвращает содержимое части карты сайта."""
+        response = self.guest_client.get(
+            reverse('posts:sitemap_shard', args=[section, shard]))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        if response.streaming:
+            return b''.join(response.streaming_content).decode()
+        return response.content.decode()
+
+    def test_index_lists_all_sections(self):
+        """Индекс карты сайта ссылается на части всех разделов."""
+        response = self.guest_client.get(reverse('posts:sitemap'))
+        for section in ('posts', 'profiles', 'groups'):
+            with self.subTest(section=section):
+                self.assertContains(
+                    response,
+                    reverse('posts:sitemap_shard', args=[section, 0])
+                )
+
+    def test_shards_contain_urls(self):
+        """Части карты сайта содержат адреса постов, авторов и групп."""
+        sections = {
+            'posts': reverse('posts:post_detail', args=[self.post.id]),
+            'profiles': reverse('posts:profile',
+                                args=[self.author.username]),
+            'groups': reverse('posts:group_list', args=[self.group.slug]),
+        }
+        for section, address in sections.items():
+            with self.subTest(section=section):
+                self.assertIn(address, self._get_shard(section))
+
+    def test_shard_cached_until_posts_change(self):
+        """Часть карты сайта берется из кеша, пока в ней не изменились
+        посты.
+        """
+        self._get_shard('posts')
+        Post.objects.filter(id=self.post.id).update(text='Новый текст')
+        response = self.guest_client.get(
+            reverse('posts:sitemap_shard', args=['posts', 0]))
+        self.assertFalse(response.streaming)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertIn(
+            reverse('posts:post_detail', args=[new_post.id]),
+            self._get_shard('posts')
+        )
+
+    def test_shard_changed_while_streaming_not_cached(self):
+        """Часть, область которой изменилась во время генерации,
+        не попадает в кеш.
+        """
+        address = reverse('posts:sitemap_shard', args=['posts', 0])
+        with mock.patch('posts.sitemaps.cache', wraps=cache) as shard_cache:
+            chunks = iter(self.guest_client.get(address).streaming_content)
+            next(chunks)
+            Post.objects.create(text='Новый пост', author=self.author)
+            list(chunks)
+        shard_cache.set.assert_not_called()
+
+    @mock.patch('posts.sitemaps.SITEMAP_SHARD_SIZE', 1)
+    def test_posts_split_into_shards(self):
+        """Посты распределяются по частям по диапазонам id."""
+        content = self._get_shard('posts', self.post.id)
+        self.assertIn(
+            reverse('posts:post_detail', args=[self.post.id]), content)
+        self.assertEqual(content.count('<url>'), 1)
+
+    def test_unknown_section(self):
+        """Неизвестный раздел возвращает 404."""
+        response = self.guest_client.get(
+            reverse('posts:sitemap_shard', args=['unknown', 0]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
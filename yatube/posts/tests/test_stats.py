@@ -0,0 +1,119 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import (Comment, DailyActiveAuthor, DailyGroupPosts,
+                          DailyPostComments, Group, Post, RollupCursor, User)
+from posts.stats import NO_GROUP, update_rollups
+from yatube.settings import POST_SHARDS
+
+
+class RollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создаем группу, двух авторов, три поста и комментарий."""
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.staff = User.objects.create_user(username='staff',
+                                             is_staff=True)
+        cls.posts = [
+            Post.objects.create(text='Пост', author=cls.author,
+                                group=cls.group),
+            Post.objects.create(text='Пост', author=cls.author,
+                                group=cls.group),
+            Post.objects.create(text='Пост', author=cls.author),
+        ]
+        Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                               text='Комментарий')
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def test_rollups_process_only_new_rows(self):
+        """Повторный запуск учитывает только новые строки."""
+        self.assertEqual(update_rollups(batch_size=2), 4)
+        self.assertEqual(update_rollups(), 0)
+        Post.objects.create(text='Пост', author=self.reader)
+        out = StringIO()
+        call_command('update_rollups', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(
+            dict(DailyGroupPosts.objects.values_list('group_id', 'posts')),
+            {self.group.id: 2, NO_GROUP: 2})
+        self.assertEqual(
+            list(DailyPostComments.objects.values_list(
+                'day', 'post_id', 'comments')),
+            [(self.today, self.posts[0].id, 1)])
+        self.assertEqual(DailyActiveAuthor.objects.count(), 2)
+
+    def test_moved_cursor_skips_batch(self):
+        """Если курсор сдвинул одновременный запуск, пачка не
+        учитывается второй раз.
+        """
+        name = f'post:{POST_SHARDS[0]}'
+        last_id = self.posts[-1].id
+
+        def concurrent_run(value):
+            RollupCursor.objects.update_or_create(
+                name=name, defaults={'last_id': last_id})
+            return timezone.localdate(value)
+
+        with mock.patch('posts.stats.timezone') as stats_timezone:
+            stats_timezone.localdate.side_effect = concurrent_run
+            self.assertEqual(update_rollups(), 1)
+        self.assertFalse(DailyGroupPosts.objects.exists())
+        self.assertEqual(RollupCursor.objects.get(name=name).last_id,
+                         last_id)
+
+    def test_stats_page_reads_only_rollups(self):
+        """Страница статистики доступна персоналу и не читает посты
+        и комментарии.
+        """
+        update_rollups()
+        reader = Client()
+        reader.force_login(self.reader)
+        response = reader.get(reverse('posts:stats'))
+        self.assertEqual(response.status_code, 302)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:stats'))
+        self.assertEqual(
+            response.context['days'],
+            [{'day': self.today, 'posts': 3, 'comments': 1, 'authors': 2}])
+        self.assertEqual(response.context['groups'][0]['title'], 'Группа')
+        for table in ('posts_post"', 'posts_comment"'):
+            with self.subTest(table=table):
+                self.assertFalse(any(table in query['sql']
+                                     for query in queries))
+
+    def test_csv_export(self):
+        """Выгрузка отдает строки статистики в CSV."""
+        update_rollups()
+        response = self.client.get(reverse('posts:stats_export'),
+                                   {'kind': 'groups'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines, [
+            'day,group_id,posts',
+            f'{self.today},{NO_GROUP},1',
+            f'{self.today},{self.group.id},2',
+        ])
+        response = self.client.get(reverse('posts:stats_export'),
+                                   {'kind': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_huge_period_clamped(self):
+        """Период длиннее календаря не роняет страницы статистики."""
+        for days in ('1000000', '99999999999'):
+            for name in ('posts:stats', 'posts:stats_export'):
+                response = self.client.get(reverse(name), {'days': days})
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,135 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.follows import follow
+from posts.models import Follow, Suggestions, User
+from posts.suggestions import (build_suggestions, get_suggestions,
+                               mark_stale, score_user)
+
+
+class SuggestionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создаем читателя, похожего на него читателя и авторов:
+        оба читают first, похожий читатель еще и second, а third
+        читают только другие.
+        """
+        cls.reader = User.objects.create_user(username='reader')
+        cls.similar = User.objects.create_user(username='similar')
+        cls.other = User.objects.create_user(username='other')
+        cls.first, cls.second, cls.third = (
+            User.objects.create_user(username=name)
+            for name in ('first', 'second', 'third'))
+        Follow.objects.bulk_create([
+            Follow(user=cls.reader, author=cls.first),
+            Follow(user=cls.similar, author=cls.first),
+            Follow(user=cls.similar, author=cls.second),
+            Follow(user=cls.other, author=cls.third),
+            Follow(user=cls.similar, author=cls.third),
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def _authors(self, user: User) -> list:
+        return json.loads(Suggestions.objects.get(user=user).authors)
+
+    def test_co_follows_ranked_first(self):
+        """Авторы похожих читателей идут первыми, подписки читателя
+        и он сам в список не попадают.
+        """
+        self.assertEqual(build_suggestions(), 3)
+        authors = self._authors(self.reader)
+        self.assertEqual(authors[:2], [self.second.id, self.third.id])
+        self.assertNotIn(self.first.id, authors)
+        self.assertNotIn(self.reader.id, authors)
+        self.assertEqual(get_suggestions(self.reader.id), authors)
+
+    def test_only_changed_users_rebuilt(self):
+        """Повторный пересчет обновляет только пользователей, у которых
+        изменились подписки, и подписчиков новых авторов; с --full
+        обновляются все.
+        """
+        build_suggestions()
+        self.assertEqual(build_suggestions(), 0)
+        follow(self.reader.id, self.second.id)
+        self.assertEqual(
+            set(Suggestions.objects.filter(stale=True).values_list(
+                'user_id', flat=True)),
+            {self.reader.id, self.similar.id})
+        self.assertEqual(build_suggestions(), 2)
+        self.assertNotIn(self.second.id, self._authors(self.reader))
+        self.assertFalse(Suggestions.objects.filter(stale=True).exists())
+        out = StringIO()
+        call_command('build_suggestions', full=True, stdout=out)
+        self.assertIn('3', out.getvalue())
+
+    def test_rebuild_reads_neighbourhood(self):
+        """Пересчет без full читает подписки только по отобранным id,
+        а не весь граф.
+        """
+        build_suggestions()
+        mark_stale([self.other.id])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(build_suggestions(), 1)
+        follow_reads = [
+            query['sql'] for query in queries
+            if 'FROM "posts_follow"' in query['sql']
+            and 'GROUP BY' not in query['sql']]
+        self.assertTrue(follow_reads)
+        for sql in follow_reads:
+            with self.subTest(sql=sql):
+                self.assertIn(' IN (', sql)
+
+    def test_stale_cleared_after_commit(self):
+        """Флаг stale остается, если новые списки не записались
+        или если пользователя отметили во время пересчета.
+        """
+        build_suggestions()
+        mark_stale([self.reader.id, self.similar.id])
+        with mock.patch.object(Suggestions.objects, 'bulk_update',
+                               side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                build_suggestions()
+        self.assertEqual(Suggestions.objects.filter(stale=True).count(), 2)
+
+        def score_and_mark(user_id, *args):
+            if user_id == self.reader.id:
+                mark_stale([user_id])
+            return score_user(user_id, *args)
+
+        with mock.patch('posts.suggestions.score_user',
+                        side_effect=score_and_mark):
+            self.assertEqual(build_suggestions(), 2)
+        self.assertEqual(
+            list(Suggestions.objects.filter(stale=True).values_list(
+                'user_id', flat=True)),
+            [self.reader.id])
+
+    def test_pages_show_suggestions(self):
+        """Рекомендации выводятся в ленте подписок и в профиле без
+        авторов, на которых читатель уже подписан.
+        """
+        build_suggestions()
+        Follow.objects.create(user=self.reader, author=self.third)
+        for address in (reverse('posts:follow_index'),
+                        reverse('posts:profile', args=['first'])):
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertContains(
+                    response, reverse('posts:profile_follow',
+                                      args=['second']))
+                self.assertNotContains(
+                    response, reverse('posts:profile_follow',
+                                      args=['third']))
@@ -0,0 +1,113 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.deletion import run_deletions, schedule_deletion
+from posts.models import Comment, Group, Post, TrendingScore, User
+from posts.trending import get_trending, record_comments
+from yatube.settings import TRENDING_HALF_LIFE, TRENDING_WINDOW
+
+
+class TrendingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создаем автора, группу и три поста, один из них в группе."""
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.posts = [Post.objects.create(text=f'Пост {number}',
+                                         author=cls.author)
+                     for number in range(2)]
+        cls.group_post = Post.objects.create(text='Пост группы',
+                                             author=cls.author,
+                                             group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def _comment(self, post: Post) -> Comment:
+        return Comment.objects.create(post=post, author=self.author,
+                                      text='Комментарий')
+
+    def test_recent_comments_outweigh_old(self):
+        """Один свежий комментарий весит больше трех, оставленных
+        четыре периода полураспада назад.
+        """
+        old = timezone.now() - timedelta(seconds=TRENDING_HALF_LIFE * 4)
+        record_comments(Comment(post_id=self.posts[0].id, created=old)
+                        for _ in range(3))
+        record_comments([Comment(post_id=self.posts[1].id,
+                                 created=timezone.now())])
+        self.assertEqual(get_trending(),
+                         [self.posts[1].id, self.posts[0].id])
+
+    def test_top_cached_until_expiry(self):
+        """Новые комментарии не сбрасывают списки в кеше: те читаются
+        без запросов, пока не истечет срок, а затем один раз
+        перечитываются по индексу.
+        """
+        self._comment(self.posts[0])
+        get_trending()
+        get_trending(self.group.id)
+        for post in (self.group_post, self.group_post):
+            self._comment(post)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_trending(), [self.posts[0].id])
+            self.assertEqual(get_trending(self.group.id), [])
+        cache.clear()
+        with self.assertNumQueries(2):
+            self.assertEqual(get_trending(),
+                             [self.group_post.id, self.posts[0].id])
+            self.assertEqual(get_trending(self.group.id),
+                             [self.group_post.id])
+
+    def test_old_scores_pruned(self):
+        """Оценки, вышедшие из окна, удаляются, свежие остаются."""
+        old = timezone.now() - timedelta(seconds=TRENDING_WINDOW * 2)
+        record_comments([Comment(post_id=self.posts[0].id, created=old)])
+        self._comment(self.posts[1])
+        out = StringIO()
+        call_command('prune_trending', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(
+            list(TrendingScore.objects.values_list('post_id', flat=True)),
+            [self.posts[1].id])
+
+    def test_scores_dropped_on_archive_and_deletion(self):
+        """Архивация и фоновое удаление автора убирают оценки постов."""
+        for post in (self.posts[0], self.group_post):
+            self._comment(post)
+        Post.objects.filter(pk=self.posts[0].id).update(
+            created=timezone.now() - timedelta(days=400))
+        call_command('archive_posts', days=365, stdout=StringIO())
+        self.assertEqual(get_trending(), [self.group_post.id])
+        schedule_deletion(self.author)
+        run_deletions()
+        self.assertFalse(TrendingScore.objects.exists())
+        self.assertEqual(get_trending(), [])
+
+    def test_pages_and_deleted_post(self):
+        """Страницы выводят обсуждаемые посты сайта и группы; удаленный
+        пост из оценок пропадает.
+        """
+        for post in (self.posts[0], self.group_post):
+            self._comment(post)
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(len(response.context['page_obj']), 2)
+        response = self.client.get(
+            reverse('posts:group_trending', args=[self.group.slug]))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.group_post])
+        Post.objects.filter(pk=self.posts[0].id).delete()
+        self.assertFalse(
+            TrendingScore.objects.filter(post_id=self.posts[0].id).exists())
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.group_post])
@@ -0,0 +1,127 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+
+class NewPostsViewTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Создаем двух авторов, подписчика и группу."""
+        super().setUpClass()
+        cls.author_1 = User.objects.create_user(username='author_1')
+        cls.author_2 = User.objects.create_user(username='author_2')
+        cls.user = User.objects.create_user(username='user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author_1)
+
+    def setUp(self):
+        """Создаем клиентов и пост, на который указывает курсор."""
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.old_post = Post.objects.create(
+            text='Старый пост',
+            author=self.author_1
+        )
+        self.post_1 = Post.objects.create(
+            text='Пост в группе',
+            author=self.author_1,
+            group=self.group
+        )
+        self.post_2 = Post.objects.create(
+            text='Пост второго автора',
+            author=self.author_2
+        )
+
+    def _get_ids(self, client: Client, address: str) -> list:
+        """Возвращает id новых постов из ответа."""
+        response = client.get(address, {'cursor': self.old_post.id})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return [post['id'] for post in response.json()['posts']]
+
+    def test_returns_only_newer_posts_by_scope(self):
+        """Возвращаются только посты новее курсора из выбранной ленты."""
+        scopes = {
+            reverse('posts:new_posts'): [self.post_1.id, self.post_2.id],
+            reverse('posts:new_group_posts',
+                    args=[self.group.slug]): [self.post_1.id],
+            reverse('posts:new_profile_posts',
+                    args=[self.author_2.username]): [self.post_2.id],
+            reverse('posts:new_follow_posts'): [self.post_1.id],
+        }
+        for address, expected in scopes.items():
+            with self.subTest(address=address):
+                self.assertEqual(
+                    self._get_ids(self.authorized_client, address), expected)
+
+    def test_empty_when_nothing_new(self):
+        """Если новых постов нет, возвращается пустой список и тот же
+        курсор.
+        """
+        response = self.guest_client.get(
+            reverse('posts:new_posts'), {'cursor': self.post_2.id})
+        self.assertEqual(response.json()['posts'], [])
+        self.assertEqual(response.json()['cursor'], self.post_2.id)
+
+    def test_not_modified_when_nothing_new(self):
+        """Повторный опрос без новых постов получает 304."""
+        address = reverse('posts:new_posts')
+        etag = self.guest_client.get(
+            address, {'cursor': self.post_2.id})['ETag']
+        response = self.guest_client.get(
+            address, {'cursor': self.post_2.id}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_html_format_renders_post_cards(self):
+        """В формате html возвращаются карточки новых постов."""
+        response = self.guest_client.get(
+            reverse('posts:new_posts'),
+            {'cursor': self.post_1.id, 'format': 'html'}
+        )
+        self.assertTemplateUsed(response, 'posts/includes/post_card.html')
+        self.assertContains(response, self.post_2.text)
+        self.assertEqual(response['X-Cursor'], str(self.post_2.id))
+
+    def test_follow_feed_requires_login(self):
+        """Лента подписок недоступна анониму."""
+        response = self.guest_client.get(reverse('posts:new_follow_posts'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_invalid_cursor(self):
+        """Некорректный курсор возвращает 400."""
+        for cursor in ('abc', '-1', '99999999999999999999'):
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(
+                    reverse('posts:new_posts'), {'cursor': cursor})
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.BAD_REQUEST)
+
+    def test_etag_depends_on_cursor(self):
+        """ETag ответа с одним курсором не подходит другому курсору."""
+        address = reverse('posts:new_posts')
+        etag = self.guest_client.get(
+            address, {'cursor': self.post_2.id})['ETag']
+        response = self.guest_client.get(
+            address, {'cursor': self.old_post.id}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.json()['posts']), 2)
+
+    def test_missing_group_or_author(self):
+        """Лента несуществующей группы или автора возвращает 404."""
+        addresses = (
+            reverse('posts:new_group_posts', args=['missing']),
+            reverse('posts:new_profile_posts', args=['missing']),
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
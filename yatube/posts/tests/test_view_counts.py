@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import view_counts
+from posts.models import Post, PostViews, User
+from posts.view_counts import flush_views
+
+
+class ViewCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создаем автора и два поста."""
+        cls.author = User.objects.create_user(username='author')
+        cls.posts = [Post.objects.create(text=f'Пост {number}',
+                                         author=cls.author)
+                     for number in range(2)]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        view_counts._take_counts()
+
+    def _views(self) -> dict:
+        return dict(PostViews.objects.values_list('post_id', 'views'))
+
+    @mock.patch('posts.view_counts.start_flusher')
+    @mock.patch('posts.view_counts.VIEW_BUFFER_ENABLED', True)
+    def test_views_buffered_and_flushed_in_one_statement(self, _):
+        """Просмотры, в том числе из кеша страницы, копятся в памяти
+        и записываются одним запросом.
+        """
+        for post in (self.posts[0], self.posts[0], self.posts[1]):
+            response = self.client.get(
+                reverse('posts:post_detail', args=[post.id]))
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._views(), {})
+        with self.assertNumQueries(1):
+            self.assertEqual(flush_views(), 3)
+        self.assertEqual(self._views(),
+                         {self.posts[0].id: 2, self.posts[1].id: 1})
+        self.assertEqual(flush_views(), 0)
+
+    @mock.patch('posts.view_counts.start_flusher')
+    @mock.patch('posts.view_counts.VIEW_BUFFER_ENABLED', True)
+    def test_failed_flush_keeps_views(self, _):
+        """Если запись не удалась, просмотры остаются в буфере."""
+        view_counts.record_view(self.posts[0].id)
+        with mock.patch('posts.view_counts.write_views',
+                        side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                flush_views()
+        self.assertEqual(flush_views(), 1)
+        self.assertEqual(self._views(), {self.posts[0].id: 1})
+
+    @mock.patch('posts.view_counts.VIEW_BUFFER_ENABLED', False)
+    def test_unbuffered_get_writes_nothing(self):
+        """Без буфера страница поста не пишет в базу."""
+        address = reverse('posts:post_detail', args=[self.posts[0].id])
+        self.client.get(address)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(address)
+        self.assertEqual(response.status_code, 200)
+        writes = [query['sql'] for query in queries
+                  if not query['sql'].startswith('SELECT')]
+        self.assertEqual(writes, [])
+        self.assertEqual(self._views(), {})
+
+    @mock.patch('posts.view_counts.VIEW_FLUSH_SECONDS', 0)
+    def test_flusher_survives_failed_flush(self):
+        """Поток записи логирует ошибку и продолжает работу."""
+        class Stop(BaseException):
+            pass
+
+        flush = mock.Mock(side_effect=[RuntimeError('database is locked'),
+                                       Stop])
+        with mock.patch('posts.view_counts.flush_views', flush), \
+                self.assertLogs('posts.view_counts', 'ERROR'):
+            with self.assertRaises(Stop):
+                view_counts._flusher_loop()
+        self.assertEqual(flush.call_count, 2)
+
+    @mock.patch('posts.view_counts.start_flusher')
+    @mock.patch('posts.view_counts.VIEW_BUFFER_ENABLED', True)
+    def test_most_viewed_page(self, _):
+        """Популярные посты выводятся по убыванию просмотров."""
+        PostViews.objects.bulk_create([
+            PostViews(post_id=self.posts[0].id, views=5),
+            PostViews(post_id=self.posts[1].id, views=10),
+        ])
+        response = self.client.get(reverse('posts:most_viewed'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.posts[1], self.posts[0]])
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.posts[1].id]))
+        self.assertEqual(response.context['views'], 10)
+        flush_views()
+        self.assertEqual(self._views()[self.posts[1].id], 11)
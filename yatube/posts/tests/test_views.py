@@ -114,8 +114,8 @@ class PostViewTests(TestCase):
 
     def test_home_page_is_cached(self):
         """Домашняя страница закеширована."""
-        response_one = self.authorized_client_2.get(reverse('posts:index'))
-        self.post_3.delete()
+        response_one = self.authorized_client_1.get(reverse('posts:index'))
+        Post.objects.filter(id=self.post_3.id).update(text='Новый текст')
         response_two = self.authorized_client_1.get(reverse('posts:index'))
         self.assertEqual(response_one.content, response_two.content,
                          'Главная страница не закеширована.'
@@ -124,6 +124,24 @@ class PostViewTests(TestCase):
         response_tree = self.authorized_client_1.get(reverse('posts:index'))
         self.assertNotEqual(response_tree.content, response_one.content)
 
+    def test_cached_page_is_shared_between_users(self):
+        """Закешированная страница общая для всех пользователей,
+        а меню в ней подставляется для каждого пользователя.
+        """
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.filter(id=self.post_3.id).update(text='Новый текст')
+        response = self.authorized_client_1.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Новый текст')
+        self.assertContains(response, self.author_1.username)
+        self.assertContains(response, reverse('posts:follow_index'))
+
+    def test_cached_page_updated_after_new_post(self):
+        """После создания поста закешированная страница обновляется."""
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.create(text='Новый пост', author=self.author_2)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый пост')
+
     def test_group_list_page_show_correct_context(self):
         """Шаблон group_list сформирован с правильным контекстом."""
         response = self.authorized_client_1.get(
@@ -426,3 +444,18 @@ class FollowViewTests(TestCase):
         self.assertNotEqual(response.context.get('page_obj')[0], new_post,
                             'Новый пост отображается у тех, кто не подписался!'
                             )
+
+    def test_follow_button_on_cached_profile(self):
+        """Кнопка подписки на закешированной странице автора
+        соответствует пользователю.
+        """
+        address = reverse('posts:profile', args=[self.author_1.username])
+        self.authorized_client_2.get(address)
+        self.assertContains(
+            self.authorized_client_1.get(address),
+            reverse('posts:profile_unfollow', args=[self.author_1.username])
+        )
+        self.assertContains(
+            self.authorized_client_2.get(address),
+            reverse('posts:profile_follow', args=[self.author_1.username])
+        )
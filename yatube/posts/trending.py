@@ -0,0 +1,179 @@
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.http import HttpRequest
+from django.utils import timezone
+
+from core.jobs import register
+
+from posts.models import Comment, Post, TrendingScore
+from posts.services import get_identity_map, hydrate_posts
+from posts.sharding import attach_related, is_sharded
+from yatube.settings import (POST_SHARDS, TRENDING_CACHE_SECONDS,
+                             TRENDING_HALF_LIFE, TRENDING_SIZE,
+                             TRENDING_WINDOW)
+
+TRENDING_KEY = 'trending:{group_id}'
+TRENDING_EPOCH = 1577836800
+UPDATE_ATTEMPTS = 5
+
+
+def comment_weight(created: datetime) -> float:
+    """Логарифм веса комментария: вес удваивается каждые
+    TRENDING_HALF_LIFE секунд, так что через это время свежий
+    комментарий весит вдвое больше нынешнего.
+    """
+    return (created.timestamp() - TRENDING_EPOCH) / TRENDING_HALF_LIFE
+
+
+def add_weights(first: float, second: float) -> float:
+    """Логарифм суммы двух весов по их логарифмам."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def _top_key(group_id: Optional[int]) -> str:
+    return TRENDING_KEY.format(group_id=group_id or 'all')
+
+
+def _post_groups(post_ids: Set[int]) -> Dict[int, Optional[int]]:
+    """Группы постов со всех шардов. Удаленных постов в ответе нет."""
+    groups = {}
+    for alias in POST_SHARDS:
+        groups.update(Post.objects.using(alias).filter(
+            pk__in=post_ids).values_list('id', 'group_id'))
+    return groups
+
+
+def _add_score(post_id: int, weight: float,
+               current: Optional[Tuple[float, Optional[int]]],
+               groups: Dict[int, Optional[int]]) -> Optional[float]:
+    """Добавляет вес к оценке поста условным UPDATE по прежней оценке,
+    так что одновременные комментарии не теряют вес друг друга.
+    Возвращает новую оценку или None, если пост удален.
+    """
+    for _ in range(UPDATE_ATTEMPTS):
+        if current is not None:
+            old, _ = current
+            score = add_weights(old, weight)
+            if TrendingScore.objects.filter(
+                    post_id=post_id, score=old).update(score=score):
+                return score
+        elif post_id in groups:
+            try:
+                with transaction.atomic():
+                    TrendingScore.objects.create(
+                        post_id=post_id, group_id=groups[post_id],
+                        score=weight)
+                return weight
+            except IntegrityError:
+                pass
+        else:
+            return None
+        current = TrendingScore.objects.filter(post_id=post_id).values_list(
+            'score', 'group_id').first()
+    return None
+
+
+def record_comments(comments: Iterable[Comment]) -> None:
+    """Учитывает новые комментарии в оценках постов: веса комментариев
+    поста складываются, и оценка каждого поста обновляется одним
+    запросом. Списки лучших постов в кеше не трогаются и перечитываются
+    по индексу, когда истечет TRENDING_CACHE_SECONDS: сброс на каждый
+    комментарий заставлял бы перечитывать их почти на каждом запросе.
+    """
+    weights: Dict[int, float] = {}
+    for comment in comments:
+        weight = comment_weight(comment.created)
+        if comment.post_id in weights:
+            weight = add_weights(weights[comment.post_id], weight)
+        weights[comment.post_id] = weight
+    if not weights:
+        return
+    current = {
+        post_id: (score, group_id)
+        for post_id, score, group_id in TrendingScore.objects.filter(
+            post_id__in=weights).values_list('post_id', 'score', 'group_id')
+    }
+    groups = _post_groups(weights.keys() - current.keys())
+    for post_id, weight in weights.items():
+        _add_score(post_id, weight, current.get(post_id), groups)
+
+
+def _forget_tops(group_ids: Iterable[Optional[int]]) -> None:
+    """Удаляет из кеша список сайта и списки групп."""
+    cache.delete_many(
+        [_top_key(group_id) for group_id in {None, *group_ids}])
+
+
+def get_trending(group_id: Optional[int] = None) -> List[int]:
+    """Id самых обсуждаемых постов сайта или группы, по убыванию
+    оценки. Список читается из кеша, а если его там нет - по индексу
+    оценок.
+    """
+    key = _top_key(group_id)
+    top = cache.get(key)
+    if top is None:
+        scores = TrendingScore.objects.order_by('-score')
+        if group_id is not None:
+            scores = scores.filter(group_id=group_id)
+        top = list(scores.values_list('post_id', 'score')[:TRENDING_SIZE])
+        cache.set(key, top, TRENDING_CACHE_SECONDS)
+    return [post_id for post_id, _ in top]
+
+
+def forget_trending(post_id: int, *group_ids: int) -> None:
+    """Удаляет пост из оценок и списки, в которых он мог быть."""
+    TrendingScore.objects.filter(post_id=post_id).delete()
+    _forget_tops(group_ids)
+
+
+def forget_scores(post_ids: List[int]) -> None:
+    """Удаляет оценки постов, которые удалены или перенесены в архив
+    мимо сигналов, и списки, в которых они могли быть.
+    """
+    scores = TrendingScore.objects.filter(post_id__in=post_ids)
+    group_ids = set(scores.values_list('group_id', flat=True))
+    if group_ids:
+        scores.delete()
+        _forget_tops(group_ids)
+
+
+@register('posts.prune_trending')
+def prune_trending() -> int:
+    """Удаляет оценки постов, которые весят меньше одного комментария,
+    оставленного TRENDING_WINDOW назад: в списки лучших они уже
+    не попадут, а таблица и индексы оценок не растут бесконечно.
+    Списки в кеше обновятся сами по истечении срока. Возвращает число
+    удаленных оценок.
+    """
+    floor = comment_weight(
+        timezone.now() - timedelta(seconds=TRENDING_WINDOW))
+    deleted, _ = TrendingScore.objects.filter(score__lt=floor).delete()
+    return deleted
+
+
+def move_trending(post_id: int, old_group_id: Optional[int],
+                  group_id: Optional[int]) -> None:
+    """Переносит оценку поста в новую группу."""
+    TrendingScore.objects.filter(post_id=post_id).update(group_id=group_id)
+    cache.delete_many([_top_key(old_group_id), _top_key(group_id)])
+
+
+def load_posts(request: HttpRequest, post_ids: List[int]) -> List[Post]:
+    """Посты по списку id с авторами и группами в порядке списка.
+    Удаленных и перенесенных в архив постов в ответе нет.
+    """
+    identity_map = get_identity_map(request)
+    if not is_sharded():
+        return hydrate_posts(Post.objects, post_ids, identity_map)
+    found = {}
+    for alias in POST_SHARDS:
+        found.update(Post.objects.using(alias).in_bulk(
+            [post_id for post_id in post_ids if post_id not in found]))
+    return attach_related(
+        [found[post_id] for post_id in post_ids if post_id in found],
+        identity_map)
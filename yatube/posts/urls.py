@@ -1,12 +1,18 @@
 from django.urls import path
 
-from posts import views
+from posts import api, feeds, sitemaps, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('trending/', views.trending, name='trending'),
+    path('popular/', views.most_viewed, name='most_viewed'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/trending/',
+         views.trending,
+         name='group_trending'
+         ),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
@@ -16,6 +22,22 @@ urlpatterns = [
          name='add_comment'
          ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('notifications/', views.notifications, name='notifications'),
+    path('stats/', views.stats, name='stats'),
+    path('stats/export.csv', views.stats_export, name='stats_export'),
+    path('updates/', views.new_posts, name='new_posts'),
+    path('updates/group/<slug:slug>/',
+         views.new_posts,
+         name='new_group_posts'
+         ),
+    path('updates/profile/<str:username>/',
+         views.new_posts,
+         name='new_profile_posts'
+         ),
+    path('updates/follow/',
+         views.new_follow_posts,
+         name='new_follow_posts'
+         ),
     path('profile/<str:username>/follow/',
          views.profile_follow,
          name='profile_follow'
@@ -23,5 +45,34 @@ urlpatterns = [
     path('profile/<str:username>/unfollow/',
          views.profile_unfollow,
          name='profile_unfollow'
-         )
+         ),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/group/<slug:slug>/', api.group_posts, name='api_group_list'),
+    path('api/profile/<str:username>/', api.profile, name='api_profile'),
+    path('api/follow/', api.follow_index, name='api_follow_index'),
+    path('api/posts/<int:post_id>/', api.post_detail, name='api_post_detail'),
+    path('api/posts/<int:post_id>/comments/',
+         api.comments,
+         name='api_comments'
+         ),
+    path('feeds/rss/', feeds.latest_rss, name='feed_rss'),
+    path('feeds/atom/', feeds.latest_atom, name='feed_atom'),
+    path('group/<slug:slug>/rss/', feeds.group_rss, name='group_feed_rss'),
+    path('group/<slug:slug>/atom/',
+         feeds.group_atom,
+         name='group_feed_atom'
+         ),
+    path('profile/<str:username>/rss/',
+         feeds.author_rss,
+         name='profile_feed_rss'
+         ),
+    path('profile/<str:username>/atom/',
+         feeds.author_atom,
+         name='profile_feed_atom'
+         ),
+    path('sitemap.xml', sitemaps.sitemap_index, name='sitemap'),
+    path('sitemap-<slug:section>-<int:shard>.xml',
+         sitemaps.sitemap_shard,
+         name='sitemap_shard'
+         ),
 ]
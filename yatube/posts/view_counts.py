@@ -0,0 +1,143 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.http import HttpRequest, HttpResponse
+
+from core.db import add_counts
+from posts.models import PostViews
+from yatube.settings import (PAGE_CACHE_SECONDS, TRENDING_SIZE,
+                             VIEW_BUFFER_ENABLED, VIEW_FLUSH_HITS,
+                             VIEW_FLUSH_SECONDS)
+
+MOST_VIEWED_KEY = 'most_viewed'
+
+logger = logging.getLogger(__name__)
+
+_counts: Counter = Counter()
+_hits = 0
+_counts_lock = threading.Lock()
+_flush_now = threading.Event()
+_flusher: Optional[threading.Thread] = None
+_flusher_lock = threading.Lock()
+
+
+def write_views(counts: Dict[int, int]) -> None:
+    """Прибавляет просмотры к счетчикам постов пачками запросов
+    INSERT ... ON CONFLICT DO UPDATE. Прибавление идет в базе, поэтому
+    процессы могут писать свои счетчики одновременно.
+    """
+    add_counts(PostViews, ['post_id'], 'views',
+               {(post_id,): views for post_id, views in counts.items()})
+
+
+def _take_counts() -> Counter:
+    """Забирает накопленные просмотры, оставляя пустой буфер."""
+    global _counts, _hits
+    with _counts_lock:
+        counts, _counts, _hits = _counts, Counter(), 0
+    return counts
+
+
+def flush_views() -> int:
+    """Записывает накопленные в процессе просмотры. Если запись
+    не удалась, просмотры возвращаются в буфер до следующей попытки.
+    Возвращает число записанных просмотров.
+    """
+    counts = _take_counts()
+    if not counts:
+        return 0
+    try:
+        write_views(counts)
+    except Exception:
+        with _counts_lock:
+            _counts.update(counts)
+        raise
+    return sum(counts.values())
+
+
+def _flusher_loop() -> None:
+    """Записывает просмотры раз в VIEW_FLUSH_SECONDS или раньше, когда
+    их набралось VIEW_FLUSH_HITS. Неудачная запись записывается в лог,
+    а просмотры остаются в буфере до следующей попытки.
+    """
+    while True:
+        _flush_now.wait(VIEW_FLUSH_SECONDS)
+        _flush_now.clear()
+        try:
+            flush_views()
+        except Exception:
+            logger.exception('Failed to flush post views')
+        finally:
+            close_old_connections()
+
+
+def start_flusher() -> None:
+    """Запускает фоновый поток записи просмотров, если он еще
+    не запущен в этом процессе.
+    """
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(
+                target=_flusher_loop, name='view-flusher', daemon=True)
+            _flusher.start()
+
+
+def record_view(post_id: int) -> None:
+    """Учитывает просмотр поста. Просмотр только прибавляется к счетчику
+    в памяти процесса, и при падении процесса теряются просмотры
+    не больше чем за VIEW_FLUSH_SECONDS. Без VIEW_BUFFER_ENABLED
+    просмотры не учитываются: запись на каждый GET упиралась бы
+    в единственного писателя SQLite.
+    """
+    global _hits
+    if not VIEW_BUFFER_ENABLED:
+        return
+    with _counts_lock:
+        _counts[post_id] += 1
+        _hits += 1
+        full = _hits >= VIEW_FLUSH_HITS
+    start_flusher()
+    if full:
+        _flush_now.set()
+
+
+def counted_view(view: Callable) -> Callable:
+    """Декоратор для страницы поста, который учитывает просмотр. Стоит
+    над кешем страницы, поэтому учитываются и ответы из кеша, и ответы
+    304.
+    """
+    @wraps(view)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            record_view(kwargs['post_id'])
+        return response
+    return wrapper
+
+
+def get_views(post_id: int) -> int:
+    """Записанное число просмотров поста."""
+    return PostViews.objects.filter(post_id=post_id).values_list(
+        'views', flat=True).first() or 0
+
+
+def get_most_viewed() -> List[int]:
+    """Id самых просматриваемых постов. Список читается по индексу
+    и хранится в кеше PAGE_CACHE_SECONDS.
+    """
+    post_ids = cache.get(MOST_VIEWED_KEY)
+    if post_ids is None:
+        post_ids = list(PostViews.objects.order_by('-views').values_list(
+            'post_id', flat=True)[:TRENDING_SIZE])
+        cache.set(MOST_VIEWED_KEY, post_ids, PAGE_CACHE_SECONDS)
+    return post_ids
+
+
+atexit.register(flush_views)
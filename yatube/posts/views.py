@@ -1,36 +1,73 @@
-from typing import Tuple
+import csv
+import json
+from datetime import date, timedelta
+from itertools import chain
+from typing import Iterator, Optional, Tuple
 
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.db.models import QuerySet
-from django.http import HttpRequest, HttpResponse
-from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.http import (Http404, HttpRequest, HttpResponse,
+                         HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
+from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
 
+from core.cache import cache_shell
+from core.db import serialized_write
+from core.jobs import enqueue
+from core.routers import stick_to_primary
+from posts.cache import INDEX_SCOPE, group_scope, profile_scope
+from posts.comment_queue import enqueue_comment, start_writer
+from posts.conditional import (UPDATES_PARAMS, feed_condition, group_scopes,
+                               index_scopes, post_scopes, profile_scopes,
+                               read_replica, updates_scopes, versions_key)
+from posts.follows import follow, followed_posts, unfollow
 from posts.forms import PostForm, CommentForm
-from posts.models import Group, Post, Follow
-from posts.services import get_paginator
+from posts.lookups import get_cached_or_404
+from posts.models import (ArchivedPost, DailyGroupPosts, DailyPostComments,
+                          Digest, Group, Post)
+from posts.services import (across_shards, format_cursor, get_author_feed,
+                            get_comment_page, get_feed, get_keyset_page,
+                            get_new_posts, get_paginator, get_post_bundle,
+                            parse_cursor)
+from posts.sharding import get_post_or_404
+from posts.stats import daily_summary, group_totals, top_posts
+from posts.trending import get_trending, load_posts
+from posts.view_counts import counted_view, get_most_viewed, get_views
+from yatube.settings import (COMMENT_QUEUE_ENABLED, PAGE_CACHE_SECONDS,
+                             STATS_DAYS, STATS_TOP_POSTS)
 
 User = get_user_model()
 
 
-@cache_page(20)
+@feed_condition(index_scopes)
+@cache_shell(PAGE_CACHE_SECONDS, versions_key(index_scopes))
+@read_replica(index_scopes)
 def index(request: HttpRequest) -> HttpResponse:
     """Возвращает главную страницу сайта со всеми постами."""
-    post_list = Post.objects.select_related('author', 'group')
-    page_obj = get_paginator(request, post_list)
+    post_list = get_feed(
+        request, INDEX_SCOPE, Post.objects.select_related('author', 'group'))
+    page_obj = get_paginator(request, post_list, INDEX_SCOPE)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@feed_condition(group_scopes)
+@cache_shell(PAGE_CACHE_SECONDS, versions_key(group_scopes))
+@read_replica(group_scopes)
 def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
     """Возвращает страницу с постами для выбранной группы."""
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author')
-    page_obj = get_paginator(request, post_list)
+    group = get_cached_or_404(Group, slug=slug)
+    post_list = get_feed(
+        request, group_scope(slug), group.posts.select_related('author'))
+    page_obj = get_paginator(request, post_list, group_scope(slug))
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -38,39 +75,77 @@ def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
     return render(request, 'posts/group_list.html', context)
 
 
+def trending(request: HttpRequest,
+             slug: Optional[str] = None) -> HttpResponse:
+    """Возвращает самые обсуждаемые посты сайта или группы: чем больше
+    свежих комментариев, тем выше пост.
+    """
+    group = None if slug is None else get_cached_or_404(Group, slug=slug)
+    post_ids = get_trending(None if group is None else group.id)
+    page_obj = get_paginator(request, post_ids)
+    page_obj.object_list = load_posts(request, list(page_obj.object_list))
+    context = {
+        'group': group,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+def most_viewed(request: HttpRequest) -> HttpResponse:
+    """Возвращает самые просматриваемые посты."""
+    page_obj = get_paginator(request, get_most_viewed())
+    page_obj.object_list = load_posts(request, list(page_obj.object_list))
+    return render(request, 'posts/most_viewed.html', {'page_obj': page_obj})
+
+
+@feed_condition(profile_scopes)
+@cache_shell(PAGE_CACHE_SECONDS, versions_key(profile_scopes))
+@read_replica(profile_scopes)
 def profile(request: HttpRequest, username: str) -> HttpResponse:
     """Возвращает страницу автора, его посты и ссылки на группы,
     к которым они относятся.
     """
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('group')
-    page_obj = get_paginator(request, post_list)
-    following = request.user.is_authenticated and author.following.filter(
-        user_id=request.user.id).exists()
+    author = get_cached_or_404(User, username=username)
+    post_list = get_author_feed(request, author)
+    page_obj = get_paginator(request, post_list, profile_scope(username))
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following
     }
     return render(request, 'posts/profile.html', context)
 
 
+@counted_view
+@feed_condition(post_scopes)
+@cache_shell(PAGE_CACHE_SECONDS, versions_key(post_scopes))
+@read_replica(post_scopes)
 def post_detail(request: HttpRequest, post_id: int) -> HttpResponse:
-    """Возвращает страницу с подробной информацией о посте."""
-    post = get_object_or_404(Post.objects.select_related('group'), id=post_id)
-    number_posts_author = Post.objects.filter(author=post.author).count()
-    comments = post.comments.select_related('author')
+    """Возвращает страницу с подробной информацией о посте
+    и страницей комментариев. Архивный пост выводится без формы
+    комментария. Число просмотров обновляется вместе с кешем страницы.
+    Старый адрес поста, перенесенного на другой шард, ведет на новый.
+    """
+    bundle = get_post_bundle(post_id)
+    if bundle is None:
+        raise Http404
+    if bundle['post'].pk != post_id:
+        return redirect('posts:post_detail', post_id=bundle['post'].pk,
+                        permanent=True)
     comments_form = CommentForm()
     context = {
-        'post': post,
-        'number_posts_author': number_posts_author,
-        'comments': comments,
+        'post': bundle['post'],
+        'is_archived': isinstance(bundle['post'], ArchivedPost),
+        'number_posts_author': bundle['count'],
+        'views': get_views(post_id),
+        'comments': get_comment_page(request, bundle),
         'form': comments_form
     }
     return render(request, 'posts/post_detail.html', context)
 
 
 @login_required()
+@stick_to_primary('POST')
+@serialized_write('POST')
 def post_create(request: HttpRequest) -> HttpResponse:
     """Возвращает страницу c формой создания поста."""
     if request.method != 'POST':
@@ -84,13 +159,16 @@ def post_create(request: HttpRequest) -> HttpResponse:
     new_post = form.save(commit=False)
     new_post.author_id = request.user.id
     new_post.save()
+    if new_post.image:
+        enqueue('posts.make_thumbnail', optional=True, post_id=new_post.pk)
     return redirect('posts:profile', username=request.user.username)
 
 
 @login_required()
+@stick_to_primary('POST')
 def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
     """Возвращает страницу c формой редактирования выбранного поста."""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_post_or_404(post_id)
     if request.user.id != post.author_id:
         raise PermissionDenied()
     if request.method != 'POST':
@@ -100,15 +178,24 @@ def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
     form = PostForm(request.POST, files=request.FILES, instance=post)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data and post.image:
+            enqueue('posts.make_thumbnail', optional=True, post_id=post.pk)
         return redirect('posts:post_detail', post_id=post_id)
     return render(request, 'posts/create_post.html',
                   context={'form': form, 'is_edit': True})
 
 
 @login_required()
+@stick_to_primary('POST')
+@serialized_write('POST')
 def add_comment(request: HttpRequest, post_id: int) -> HttpResponse:
-    """Добавление комментария к посту."""
-    post = Post.objects.get(id=post_id)
+    """Добавление комментария к посту. Если включена очередь
+    комментариев, проверенный комментарий записывается в базу позже
+    фоновым писателем.
+    """
+    if COMMENT_QUEUE_ENABLED:
+        return _enqueue_comment(request, post_id)
+    post = get_post_or_404(post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -118,15 +205,26 @@ def add_comment(request: HttpRequest, post_id: int) -> HttpResponse:
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def _enqueue_comment(request: HttpRequest, post_id: int) -> HttpResponse:
+    """Проверяет комментарий и кладет его в очередь комментариев."""
+    bundle = get_post_bundle(post_id)
+    if bundle is None or isinstance(bundle['post'], ArchivedPost):
+        raise Http404
+    form = CommentForm(request.POST or None)
+    if form.is_valid():
+        enqueue_comment(post_id, request.user.id, form.cleaned_data['text'])
+        start_writer()
+    return redirect('posts:post_detail', post_id=post_id)
+
+
 @login_required
+@read_replica(index_scopes)
 def follow_index(request: HttpRequest) -> HttpResponse:
     """Возвращает страницу с постами авторов, на которых подписан
     пользователь.
     """
-    authors_id = Follow.objects.filter(
-        user_id=request.user.id).values('author_id')
-    post_list = Post.objects.filter(
-        author__in=authors_id).select_related('author', 'group')
+    post_list = across_shards(
+        request, followed_posts(request).select_related('author', 'group'))
     page_obj = get_paginator(request, post_list)
     context = {
         'page_obj': page_obj
@@ -135,26 +233,174 @@ def follow_index(request: HttpRequest) -> HttpResponse:
 
 
 @login_required
+@stick_to_primary('GET', 'POST')
+@serialized_write('GET', 'POST')
 def profile_follow(request: HttpRequest, username: str) -> HttpResponse:
     """Добавление подписки на автора."""
-    author, user, following = _get_follow_info(request, username)
-    author.following.create(user_id=user.id)
+    author, user = _get_follow_info(request, username)
+    follow(user.id, author.id)
     return redirect('posts:follow_index')
 
 
 @login_required
+@stick_to_primary('GET', 'POST')
 def profile_unfollow(request: HttpRequest, username: str) -> HttpResponse:
     """Удаление автора из пописок."""
-    _, _, following = _get_follow_info(request, username)
-    following.delete()
+    author, user = _get_follow_info(request, username)
+    unfollow(user.id, author.id)
     return redirect('posts:follow_index')
 
 
+@feed_condition(updates_scopes, UPDATES_PARAMS)
+def new_posts(request: HttpRequest, slug: Optional[str] = None,
+              username: Optional[str] = None) -> HttpResponse:
+    """Возвращает посты, опубликованные после курсора: в общей ленте,
+    в группе или у автора.
+    """
+    post_list = Post.objects.all()
+    if slug is not None:
+        group = get_cached_or_404(Group, slug=slug)
+        post_list = post_list.filter(group_id=group.id)
+    if username is not None:
+        author = get_cached_or_404(User, username=username)
+        post_list = post_list.filter(author_id=author.id)
+    return _new_posts_response(request, post_list)
+
+
+@login_required
+@feed_condition(index_scopes, UPDATES_PARAMS)
+def new_follow_posts(request: HttpRequest) -> HttpResponse:
+    """Возвращает новые посты авторов, на которых подписан пользователь."""
+    return _new_posts_response(request, followed_posts(request))
+
+
+def _new_posts_response(request: HttpRequest,
+                        post_list: QuerySet) -> HttpResponse:
+    """Отдает новые посты в json или готовыми карточками постов,
+    если передан параметр format=html.
+    """
+    try:
+        cursor = parse_cursor(request.GET.get('cursor', 0))
+    except ValueError:
+        return HttpResponseBadRequest()
+    posts, has_more, cursor = get_new_posts(post_list, cursor)
+    cursor = format_cursor(cursor)
+    if request.GET.get('format') == 'html':
+        response = HttpResponse(render_to_string(
+            'posts/includes/new_posts.html', {'posts': posts}, request))
+    else:
+        response = JsonResponse({
+            'cursor': cursor,
+            'has_more': has_more,
+            'posts': [{
+                'id': post.id,
+                'text': post.text,
+                'created': post.created.isoformat(),
+                'author': post.author.username,
+                'group': post.group.slug if post.group else None,
+                'url': reverse('posts:post_detail', args=[post.id]),
+            } for post in posts]
+        })
+    response['X-Cursor'] = cursor
+    return response
+
+
 def _get_follow_info(request: HttpRequest,
-                     username: str
-                     ) -> Tuple[User, User, QuerySet]:
-    """Возвращает словарь с автором, пользователем и его подписками."""
-    author = get_object_or_404(User, username=username)
-    user = request.user
-    following = author.following.filter(user_id=user.id)
-    return author, user, following
+                     username: str) -> Tuple[User, User]:
+    """Возвращает автора и пользователя. Запись подписки не опирается
+    на набор подписок в кеше: устаревший набор не должен мешать
+    подписаться или отписаться.
+    """
+    author = get_cached_or_404(User, username=username)
+    return author, request.user
+
+
+@login_required
+def notifications(request: HttpRequest) -> HttpResponse:
+    """Возвращает дайджесты новых постов авторов, на которых подписан
+    пользователь, постранично по ключу, новые сверху.
+    """
+    rows = Digest.objects.filter(
+        recipient_id=request.user.id).values('id', 'created', 'posts')
+    try:
+        digests, next_cursor = get_keyset_page(request, rows)
+    except ValueError:
+        return HttpResponseBadRequest()
+    for digest in digests:
+        digest['posts'] = json.loads(digest['posts'])
+    context = {
+        'digests': digests,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/notifications.html', context)
+
+
+def _stats_since(request: HttpRequest) -> date:
+    """Первый день периода статистики: последние days дней. Период
+    длиннее календаря ограничивается первым днем date.min.
+    """
+    days = int(request.GET.get('days', STATS_DAYS))
+    if days < 1:
+        raise ValueError(days)
+    today = timezone.localdate()
+    days = min(days, (today - date.min).days + 1)
+    return today - timedelta(days=days - 1)
+
+
+@staff_member_required
+def stats(request: HttpRequest) -> HttpResponse:
+    """Возвращает статистику активности за последние дни. Читаются
+    только таблицы статистики, а не посты и комментарии.
+    """
+    try:
+        since = _stats_since(request)
+    except ValueError:
+        return HttpResponseBadRequest()
+    context = {
+        'since': since,
+        'days': daily_summary(since),
+        'groups': group_totals(since),
+        'top_posts': top_posts(since, STATS_TOP_POSTS),
+    }
+    return render(request, 'posts/stats.html', context)
+
+
+class _Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+@staff_member_required
+def stats_export(request: HttpRequest) -> HttpResponse:
+    """Отдает статистику в CSV: kind=days - итоги по дням, groups -
+    посты по дням и группам, posts - комментарии по дням и постам.
+    Строки читаются из таблиц статистики и отдаются потоком.
+    """
+    try:
+        since = _stats_since(request)
+    except ValueError:
+        return HttpResponseBadRequest()
+    kind = request.GET.get('kind', 'days')
+    if kind == 'days':
+        header = ['day', 'posts', 'comments', 'authors']
+        rows: Iterator = (
+            [row[name] for name in header] for row in daily_summary(since))
+    elif kind == 'groups':
+        header = ['day', 'group_id', 'posts']
+        rows = DailyGroupPosts.objects.filter(day__gte=since).order_by(
+            'day', 'group_id').values_list(*header).iterator()
+    elif kind == 'posts':
+        header = ['day', 'post_id', 'comments']
+        rows = DailyPostComments.objects.filter(day__gte=since).order_by(
+            'day', 'post_id').values_list(*header).iterator()
+    else:
+        return HttpResponseBadRequest()
+    writer = csv.writer(_Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in chain([header], rows)),
+        content_type='text/csv')
+    response['Content-Disposition'] = (
+        f'attachment; filename="stats-{kind}-{since}.csv"')
+    return response
@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
+
+from core.jobs import enqueue
 
 User = get_user_model()
 
@@ -9,3 +11,20 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Форма сброса пароля, которая не ждет отправки письма: в очередь
+    ставится только id пользователя и шаблоны, а письмо с токеном
+    готовит и отправляет фоновая задача.
+    """
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        enqueue('users.send_password_reset', priority=10,
+                user_id=context['user'].pk,
+                subject_template_name=subject_template_name,
+                email_template_name=email_template_name,
+                domain=context['domain'], site_name=context['site_name'],
+                protocol=context['protocol'], from_email=from_email,
+                html_email_template_name=html_email_template_name)
@@ -0,0 +1,47 @@
+from typing import Optional
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMultiAlternatives
+from django.template import loader
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.jobs import register
+
+User = get_user_model()
+
+
+@register('users.send_password_reset')
+def send_password_reset(user_id: int, subject_template_name: str,
+                        email_template_name: str, domain: str,
+                        site_name: str, protocol: str,
+                        from_email: Optional[str] = None,
+                        html_email_template_name: Optional[str] = None
+                        ) -> None:
+    """Отправляет письмо сброса пароля. Ссылка со свежим токеном
+    создается здесь, поэтому в очереди токен не хранится. Письмо
+    не отправляется, если пользователь удален или отключен.
+    """
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None:
+        return
+    context = {
+        'email': getattr(user, User.get_email_field_name()),
+        'domain': domain,
+        'site_name': site_name,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'user': user,
+        'token': default_token_generator.make_token(user),
+        'protocol': protocol,
+    }
+    subject = loader.render_to_string(subject_template_name, context)
+    subject = ''.join(subject.splitlines())
+    body = loader.render_to_string(email_template_name, context)
+    message = EmailMultiAlternatives(
+        subject, body, from_email, [context['email']])
+    if html_email_template_name is not None:
+        message.attach_alternative(
+            loader.render_to_string(html_email_template_name, context),
+            'text/html')
+    message.send()
@@ -7,6 +7,7 @@ from django.contrib.auth.views import (LoginView, LogoutView,
                                        PasswordResetView)
 from django.urls import path
 
+from users.forms import QueuedPasswordResetForm
 from users.views import SignUp
 
 app_name = 'users'
@@ -35,7 +36,8 @@ urlpatterns = [
          ),
     path('password_reset/',
          PasswordResetView.as_view(
-             template_name='users/password_reset_form.html'),
+             template_name='users/password_reset_form.html',
+             form_class=QueuedPasswordResetForm),
          name='password_reset'
          ),
     path('password_reset/done/',
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -54,6 +55,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.FragmentMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware'
@@ -91,6 +93,61 @@ DATABASES = {
     }
 }
 
+# Рабочий режим SQLite: WAL и настройки соединений, постоянные
+# соединения и один писатель для представлений, которые пишут в базу.
+SQLITE_PRODUCTION = False
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+}
+
+SQLITE_WRITE_LOCK = os.path.join(BASE_DIR, 'db.write.lock')
+
+if SQLITE_PRODUCTION:
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+
+# Реплики только для чтения. Локально это копия основной базы,
+# которую обновляет manage.py refresh_replica.
+READ_REPLICAS_ENABLED = False
+
+if READ_REPLICAS_ENABLED:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+    }
+
+READ_REPLICAS = ['replica'] if READ_REPLICAS_ENABLED else []
+
+# Шарды постов и комментариев по id автора. Первый шард - основная
+# база, остальные - отдельные файлы SQLite. Посты на шарде с номером n
+# получают id, начиная с n * SHARD_ID_SPAN, поэтому id не пересекаются.
+POST_SHARD_COUNT = 1
+
+for number in range(1, POST_SHARD_COUNT):
+    DATABASES[f'shard_{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.shard_{number}.sqlite3'),
+    }
+
+POST_SHARDS = ['default'] + [
+    f'shard_{number}' for number in range(1, POST_SHARD_COUNT)
+]
+
+SHARD_ID_SPAN = 10 ** 12
+
+DATABASE_ROUTERS = [
+    'posts.sharding.ShardRouter',
+    'core.routers.ReplicaRouter',
+]
+
+REPLICA_STICKY_SECONDS = 10
+
+REPLICA_REFRESH_SECONDS = 30
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -135,8 +192,16 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_OUTBOX_ENABLED = False
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = ('core.mail.OutboxEmailBackend' if EMAIL_OUTBOX_ENABLED
+                 else EMAIL_DELIVERY_BACKEND)
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_SECONDS = 30
+OUTBOX_LEASE_SECONDS = 5 * 60
+OUTBOX_POLL_SECONDS = 1
 
 INTERNAL_IPS = [
     "127.0.0.1",
@@ -144,13 +209,113 @@ INTERNAL_IPS = [
 
 POSTS_PER_PAGE = 10
 
+COMMENTS_PER_PAGE = 20
+
+EXACT_COUNT_LIMIT = 10000
+
+COUNT_CACHE_SECONDS = 60 * 60
+
+# Версия области кеша живет ограниченное время: даже если сброс версии
+# не дошел до кеша, устаревшие страницы выводятся не дольше суток.
+VERSION_CACHE_SECONDS = 60 * 60 * 24
+
+SNAPSHOT_PAGES = 5
+
+SNAPSHOT_CACHE_SECONDS = 60 * 60
+
+ARCHIVE_AFTER_DAYS = 365
+
+ARCHIVE_CHUNK_SIZE = 500
+
+DELETION_BATCH_SIZE = 1000
+
+DELETION_POLL_SECONDS = 5
+
+JOB_QUEUE_ENABLED = False
+
+JOB_MAX_ATTEMPTS = 5
+
+JOB_RETRY_SECONDS = 10
+
+JOB_TIMEOUT_SECONDS = 5 * 60
+
+JOB_POLL_SECONDS = 1
+
+JOB_WORKER_PROCESSES = 1
+
+JOB_WORKER_THREADS = 4
+
+NOTIFY_CHUNK_SIZE = 1000
+
+DIGEST_SECONDS = 15 * 60
+
+DIGEST_BATCH_SIZE = 500
+
+OBJECT_CACHE_SECONDS = 60 * 60
+
+MISSING_CACHE_SECONDS = 60
+
+FOLLOWED_CACHE_SECONDS = 60 * 60 * 24
+
+FOLLOW_BATCH_SIZE = 500
+
+SUGGESTIONS_COUNT = 10
+
+SUGGESTIONS_SHOWN = 5
+
+SUGGESTIONS_CACHE_SECONDS = 60 * 60
+
+SUGGEST_BATCH_SIZE = 500
+
+TRENDING_SIZE = 100
+
+TRENDING_HALF_LIFE = 60 * 60 * 6
+
+TRENDING_CACHE_SECONDS = 60 * 5
+
+TRENDING_WINDOW = 60 * 60 * 24 * 7
+
+VIEW_BUFFER_ENABLED = False
+
+VIEW_FLUSH_SECONDS = 5
+
+VIEW_FLUSH_HITS = 1000
+
+ROLLUP_BATCH_SIZE = 5000
+
+STATS_DAYS = 30
+
+STATS_TOP_POSTS = 10
+
+COMMENT_QUEUE_ENABLED = False
+
+COMMENT_QUEUE_DIR = os.path.join(BASE_DIR, 'comment_queue')
+
+COMMENT_BATCH_SIZE = 100
+
+COMMENT_FLUSH_SECONDS = 1
+
+PAGE_CACHE_SECONDS = 60 * 5
+
+NEW_POSTS_LIMIT = 50
+
+SITEMAP_SHARD_SIZE = 50000
+
+SITEMAP_CACHE_SECONDS = 60 * 60 * 24
+
+FEED_ITEMS_COUNT = 20
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кеш общий для всех процессов сайта: версии областей кеша, наборы
+# подписок и списки обсуждаемых постов сбрасываются в одном процессе,
+# а читаются во всех. Кеш в памяти процесса для этого не годится.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'yatube_cache'),
     }
 }